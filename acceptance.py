@@ -0,0 +1,182 @@
+import argparse
+import bisect
+import json
+import math
+import os
+import time
+
+from map_core import MIN_INNER_CELLS, generate_map, generate_map_numpy, seed_generators, validate_map
+
+# Table of the acceptance rates shipped with the project, rebuilt with: python acceptance.py build
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "acceptance_table.json")
+
+# Below this acceptance rate (more than 1000 attempts per valid map on average), parameters are infeasible
+INFEASIBLE_RATE = 1e-3
+
+# Axes of the table: side of a square map, coin and wall percentages
+TABLE_SIZES = (5, 8, 12, 20, 30, 45, 70, 100, 150)
+TABLE_COIN_RATES = (0, 1, 5, 10, 20, 40, 70, 100)
+TABLE_WALL_RATES = (0, 5, 10, 15, 20, 25, 30, 35, 40, 45, 50, 55, 60, 65, 70, 75, 80, 85, 90, 95, 99)
+
+_table = None
+
+# ======================================================================================================================
+# ESTIMATE THE ACCEPTANCE RATE
+# ======================================================================================================================
+
+def load_table(path=TABLE_PATH):
+    """Load the table of acceptance rates once. Returns None if there is no table."""
+    global _table
+    if _table is None or _table.get("path") != path:
+        try:
+            with open(path, encoding="utf-8") as file:
+                _table = json.load(file)
+        except OSError:
+            return None
+        _table["path"] = path
+    return _table
+
+def _bracket(axis, value):
+    """Indexes of the two points of an axis around value and the weight of the second one (the end points outside the axis)."""
+    if value <= axis[0]:
+        return 0, 0, 0.0
+    if value >= axis[-1]:
+        return len(axis) - 1, len(axis) - 1, 0.0
+    high = bisect.bisect_right(axis, value)
+    low = high - 1
+    return low, high, (value - axis[low]) / (axis[high] - axis[low])
+
+def acceptance_rate(width, height, coin_rate, wall_rate, algorithm="random", table=None):
+    """
+    Estimate the probability that a generated map is valid, interpolated from the table built by
+    build_table. Maps are compared by area (a width x height map is read as a square of the same
+    area), the sizes are interpolated on a logarithmic scale, the rates linearly.
+    Args:
+        width (int): The width of the map.
+        height (int): The height of the map.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+        algorithm (str): The name of the generation algorithm in ALGORITHMS.
+        table (dict): The table of acceptance rates (default: the one shipped with the project).
+    Returns:
+        float: The estimated acceptance rate, or None if there is no table. 0 for maps too small to
+            hold a player, an exit and a coin, whatever the table says. The table ends at 150x150 and
+            larger maps are read as 150x150 ones: the rate only falls as maps grow, so it is then an
+            upper bound, enough to tell infeasible parameters but not how many attempts a map takes.
+    """
+    # The table starts at 5x5, smaller maps would be read as 5x5 ones
+    if max(0, int(width) - 2) * max(0, int(height) - 2) < MIN_INNER_CELLS:
+        return 0.0
+    if algorithm == "constructive":
+        return 1.0
+    table = table or load_table()
+    if table is None:
+        return None
+    rates = table["rates"]
+    sizes = [math.log(size) for size in table["sizes"]]
+    s0, s1, ws = _bracket(sizes, math.log(math.sqrt(int(width) * int(height))))
+    c0, c1, wc = _bracket(table["coin_rates"], int(coin_rate))
+    w0, w1, ww = _bracket(table["wall_rates"], int(wall_rate))
+    rate = 0.0
+    for s, fs in ((s0, 1 - ws), (s1, ws)):
+        for c, fc in ((c0, 1 - wc), (c1, wc)):
+            for w, fw in ((w0, 1 - ww), (w1, ww)):
+                rate += fs * fc * fw * rates[s][c][w]
+    return rate
+
+def expected_attempts(rate):
+    """Average number of attempts to get a valid map at an acceptance rate."""
+    return 1 / rate if rate > 0 else math.inf
+
+# ======================================================================================================================
+# BUILD THE TABLE
+# ======================================================================================================================
+
+def measure_rate(size, coin_rate, wall_rate, min_accepted=50, max_samples=1000):
+    """
+    Measure the acceptance rate of square maps by sampling, until min_accepted maps were valid or
+    max_samples maps were generated. Returns the rate and the number of samples.
+    """
+    # The numpy algorithm draws the same maps as generate_map, faster
+    try:
+        import numpy  # noqa: F401
+        generate = generate_map_numpy
+    except ImportError:
+        generate = generate_map
+    accepted = samples = 0
+    while accepted < min_accepted and samples < max_samples:
+        samples += 1
+        accepted += validate_map(generate(size, size, str(coin_rate), str(wall_rate)))
+    return accepted / samples, samples
+
+def _measure_row(job):
+    size, coin_rate, wall_rates, min_accepted, max_samples = job
+    row = []
+    for wall_rate in wall_rates:
+        # More walls never make a map easier to solve: once no map was valid, the rest of the row is 0
+        if row and row[-1] == 0:
+            row.append(0.0)
+            continue
+        rate, _ = measure_rate(size, coin_rate, wall_rate, min_accepted, max_samples)
+        row.append(rate)
+    return row
+
+def build_table(sizes=TABLE_SIZES, coin_rates=TABLE_COIN_RATES, wall_rates=TABLE_WALL_RATES, min_accepted=50, max_samples=1000, jobs=None):
+    """
+    Build the table of acceptance rates with a sampling sweep over sizes, coin and wall rates,
+    one row of wall rates per (size, coin rate) over a pool of processes.
+    Returns:
+        dict: The table, as saved to acceptance_table.json.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    tasks = [(size, coin_rate, wall_rates, min_accepted, max_samples) for size in sizes for coin_rate in coin_rates]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1:
+        rows = list(map(_measure_row, tasks))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs, initializer=seed_generators) as pool:
+            rows = list(pool.map(_measure_row, tasks))
+    return {
+        "algorithm": "random",
+        "min_accepted": min_accepted,
+        "max_samples": max_samples,
+        "sizes": list(sizes),
+        "coin_rates": list(coin_rates),
+        "wall_rates": list(wall_rates),
+        "rates": [[rows[s * len(coin_rates) + c] for c in range(len(coin_rates))] for s in range(len(sizes))],
+    }
+
+def save_table(table, path=TABLE_PATH):
+    table = {key: value for key, value in table.items() if key != "path"}
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(table, file, separators=(",", ":"))
+        file.write("\n")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Acceptance rate of the random generation (probability that a generated map is valid).")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Rebuild the table with a sampling sweep")
+    build.add_argument("-o", "--output", type=str, default=TABLE_PATH, help="Path of the table (default: acceptance_table.json)")
+    build.add_argument("--min-accepted", type=int, default=50, help="Valid maps after which a point stops being sampled (default: 50)")
+    build.add_argument("--max-samples", type=int, default=1000, help="Maximum number of maps generated per point (default: 1000)")
+    build.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: number of CPUs)")
+    estimate = commands.add_parser("estimate", help="Estimate the acceptance rate of parameters")
+    estimate.add_argument("-W", "--width", type=int, default=20, help="Width of the map (default: 20)")
+    estimate.add_argument("-H", "--height", type=int, default=10, help="Height of the map (default: 10)")
+    estimate.add_argument("-c", "--coins", type=int, default=10, help="Percentage of coins (default: 10)")
+    estimate.add_argument("-w", "--walls", type=int, default=10, help="Percentage of walls (default: 10)")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        start = time.perf_counter()
+        table = build_table(min_accepted=args.min_accepted, max_samples=args.max_samples, jobs=args.jobs)
+        save_table(table, args.output)
+        print(f"Table saved to {args.output} in {time.perf_counter() - start:.1f}s")
+    else:
+        rate = acceptance_rate(args.width, args.height, args.coins, args.walls)
+        if rate is None:
+            print(f"No table found at {TABLE_PATH}, build it with: python acceptance.py build")
+            raise SystemExit(1)
+        attempts = f"about {expected_attempts(rate):.0f} attempts per valid map" if rate > 0 else "almost no map is valid"
+        print(f"Estimated acceptance rate: {rate:.4%}, {attempts}" + (" (infeasible)" if rate < INFEASIBLE_RATE else ""))
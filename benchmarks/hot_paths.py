@@ -0,0 +1,201 @@
+"""
+Benchmarks the hot paths of the map generator over a matrix of map sizes, coin and wall rates.
+
+    python benchmarks/hot_paths.py [--quick] [--ops generate_map,validate_map] [--json results.json] [--compare baseline.json]
+
+Each operation is timed call by call and reported as latency percentiles (p50, p90, p99) in
+milliseconds. "accepted_map" is the time to get one valid map with generate_map, including the
+rejected attempts, which is what a user actually waits for. Results can be saved as JSON and
+compared against a previous run: operations whose p50 got slower than the tolerance are flagged
+and the command exits with status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from acceptance import INFEASIBLE_RATE, acceptance_rate  # noqa: E402
+from map_core import flood_fill, generate_map, load_map_from_file, save_map_to_file, seed_generators, validate_map  # noqa: E402
+from map_render import render_map  # noqa: E402
+
+SIZES = ((10, 10), (20, 20), (50, 50), (100, 100), (150, 150), (500, 500))
+QUICK_SIZES = ((10, 10), (50, 50), (150, 150))
+RATES = ((10, 10), (10, 30))  # (coin rate, wall rate)
+
+# Each operation runs for at least MIN_SECONDS and MIN_CALLS calls, at most MAX_CALLS calls
+MIN_SECONDS = 0.2
+MIN_CALLS = 5
+MAX_CALLS = 2000
+
+# A p50 slower than the baseline by more than the tolerance and by more than the noise floor is a regression
+DEFAULT_TOLERANCE = 0.2
+NOISE_FLOOR_MS = 0.01
+
+OPERATIONS = ("generate_map", "validate_map", "flood_fill", "save_map_to_file", "load_map_from_file", "render_map", "accepted_map")
+
+# ======================================================================================================================
+# MEASURE
+# ======================================================================================================================
+
+def time_calls(function, setup=None, min_seconds=MIN_SECONDS, min_calls=MIN_CALLS, max_calls=MAX_CALLS):
+    """
+    Times function call by call (setup, if given, is run before each call and not timed, its
+    result is passed to the function). Returns the duration of each call in seconds.
+    """
+    durations = []
+    total = 0.0
+    while len(durations) < max_calls and (len(durations) < min_calls or total < min_seconds):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        elapsed = time.perf_counter() - start
+        durations.append(elapsed)
+        total += elapsed
+    return durations
+
+def time_accepted_maps(width, height, coin_rate, wall_rate, min_seconds=MIN_SECONDS, min_maps=MIN_CALLS, max_attempts=100000):
+    """Times the generate/validate loop map by map. Returns the duration of each valid map and the attempts."""
+    durations = []
+    attempts = 0
+    total = 0.0
+    while (len(durations) < min_maps or total < min_seconds) and attempts < max_attempts:
+        start = time.perf_counter()
+        while attempts < max_attempts:
+            attempts += 1
+            if validate_map(generate_map(width, height, coin_rate, wall_rate)):
+                elapsed = time.perf_counter() - start
+                durations.append(elapsed)
+                total += elapsed
+                break
+    return durations, attempts
+
+def summarize(durations):
+    """Latency percentiles of a list of durations, in milliseconds."""
+    ms = sorted(d * 1000 for d in durations)
+
+    def percentile(p):
+        return ms[min(len(ms) - 1, round(p / 100 * (len(ms) - 1)))]
+
+    return {
+        "calls": len(ms),
+        "mean_ms": statistics.fmean(ms),
+        "p50_ms": percentile(50),
+        "p90_ms": percentile(90),
+        "p99_ms": percentile(99),
+    }
+
+def benchmark_case(width, height, coin_rate, wall_rate, operations, directory):
+    """Runs the operations on one (size, coin rate, wall rate). Returns {operation: summary}."""
+    coin_rate, wall_rate = str(coin_rate), str(wall_rate)
+    seed_generators(0)
+    results = {}
+
+    # The other operations run on one representative map, valid if the parameters allow it
+    map_data = generate_map(width, height, coin_rate, wall_rate)
+    for _ in range(100):
+        if validate_map(map_data):
+            break
+        map_data = generate_map(width, height, coin_rate, wall_rate)
+    path = os.path.join(directory, f"bench_{width}x{height}.ber")
+    save_map_to_file(map_data, path)
+    player_x, player_y = map_data.player
+
+    cases = {
+        "generate_map": (lambda: generate_map(width, height, coin_rate, wall_rate), None),
+        "validate_map": (lambda: validate_map(map_data), None),
+        "flood_fill": (lambda visited: flood_fill(map_data, player_x, player_y, visited, "C"), lambda: bytearray(len(map_data.cells))),
+        "save_map_to_file": (lambda: save_map_to_file(map_data, path), None),
+        "load_map_from_file": (lambda: load_map_from_file(path), None),
+        "render_map": (lambda: render_map(map_data, 4), None),
+    }
+    for operation in operations:
+        if operation in cases:
+            function, setup = cases[operation]
+            results[operation] = summarize(time_calls(function, setup))
+
+    if "accepted_map" in operations:
+        rate = acceptance_rate(width, height, coin_rate, wall_rate)
+        if rate is not None and rate < INFEASIBLE_RATE:
+            # Almost no map is valid (beyond 150x150 the rate is an upper bound, so this stays true), see acceptance.py
+            results["accepted_map"] = None
+        else:
+            durations, attempts = time_accepted_maps(width, height, coin_rate, wall_rate)
+            if durations:
+                results["accepted_map"] = dict(summarize(durations), attempts_per_map=attempts / len(durations))
+            else:
+                results["accepted_map"] = None
+    return results
+
+def run(sizes, rates, operations):
+    """Runs the whole matrix and prints one line per operation. Returns the results keyed by case."""
+    results = {}
+    print(f"{'operation':<20} {'size':>9} {'coins':>5} {'walls':>5} {'calls':>6} {'p50 ms':>10} {'p90 ms':>10} {'p99 ms':>10}")
+    with tempfile.TemporaryDirectory() as directory:
+        for width, height in sizes:
+            for coin_rate, wall_rate in rates:
+                case = benchmark_case(width, height, coin_rate, wall_rate, operations, directory)
+                for operation, summary in case.items():
+                    key = f"{operation}/{width}x{height}/c{coin_rate}/w{wall_rate}"
+                    results[key] = summary
+                    if summary is None:
+                        print(f"{operation:<20} {f'{width}x{height}':>9} {coin_rate:>5} {wall_rate:>5}   (infeasible, skipped)")
+                        continue
+                    extra = f"  {summary['attempts_per_map']:.1f} attempts/map" if "attempts_per_map" in summary else ""
+                    print(f"{operation:<20} {f'{width}x{height}':>9} {coin_rate:>5} {wall_rate:>5} {summary['calls']:>6} "
+                          f"{summary['p50_ms']:>10.3f} {summary['p90_ms']:>10.3f} {summary['p99_ms']:>10.3f}{extra}")
+    return results
+
+# ======================================================================================================================
+# COMPARE
+# ======================================================================================================================
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compares the p50 of each operation with a baseline run.
+    Returns:
+        list: (key, baseline p50, new p50) of the regressions.
+    """
+    regressions = []
+    for key, summary in results.items():
+        old = baseline.get(key)
+        if not summary or not old:
+            continue
+        before, after = old["p50_ms"], summary["p50_ms"]
+        if after > before * (1 + tolerance) and after - before > NOISE_FLOOR_MS:
+            regressions.append((key, before, after))
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the generation, validation, IO and rendering hot paths.")
+    parser.add_argument("--quick", action="store_true", help="Fewer map sizes")
+    parser.add_argument("--ops", type=str, default=",".join(OPERATIONS), help=f"Comma-separated operations (default: {','.join(OPERATIONS)})")
+    parser.add_argument("--json", type=str, default=None, help="Save the results to a JSON file")
+    parser.add_argument("--compare", type=str, default=None, help="JSON file of a previous run to compare with")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help=f"Slowdown of the p50 flagged as a regression (default: {DEFAULT_TOLERANCE})")
+    args = parser.parse_args()
+
+    operations = [op for op in args.ops.split(",") if op]
+    unknown = set(operations) - set(OPERATIONS)
+    if unknown:
+        parser.error(f"unknown operation(s): {', '.join(sorted(unknown))}")
+
+    results = run(QUICK_SIZES if args.quick else SIZES, RATES, operations)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results}, file, indent=1)
+        print(f"Results saved to {args.json}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(results, baseline, args.tolerance)
+        for key, before, after in regressions:
+            print(f"REGRESSION {key}: p50 {before:.3f} ms -> {after:.3f} ms ({after / before - 1:+.0%})")
+        print(f"{len(regressions)} regression(s) against {args.compare}")
+        raise SystemExit(1 if regressions else 0)
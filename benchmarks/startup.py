@@ -0,0 +1,72 @@
+"""
+Measures the cold start of the map generator: the time from launching Python to the first valid map.
+
+    python benchmarks/startup.py [-r RUNS]
+
+Each run is a fresh interpreter, so the numbers include the imports. The CLI is run as a user would
+run it, the GUI module is imported and generates its first map the same way as its Generate button,
+without opening a window (no display is needed). The modules that were loaded are reported, numpy,
+PIL and ttkbootstrap should only appear once they are really used.
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that are slow to import and are not needed to generate a map
+HEAVY_MODULES = ("numpy", "PIL", "ttkbootstrap", "map_editor", "concurrent.futures")
+
+# Run in a fresh interpreter: generate a first map through the GUI module, then list the heavy modules loaded
+GUI_FIRST_MAP = """
+import sys
+import map_generator_gui as gui
+from map_core import validate_map
+while True:
+    map_data = gui.ALGORITHMS["random"](20, 10, "10", "10")
+    if validate_map(map_data):
+        break
+print("loaded:" + ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+# Appended to the CLI run through runpy so the loaded modules can be listed after the map is saved
+CLI_FIRST_MAP = """
+import runpy, sys
+sys.argv = ["map_generator_cli.py", "-p", {path!r}]
+runpy.run_path("map_generator_cli.py", run_name="__main__")
+print("loaded:" + ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+def time_run(code):
+    """Runs code in a fresh interpreter. Returns the elapsed seconds and the heavy modules it reported."""
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    loaded = [line for line in result.stdout.splitlines() if line.startswith("loaded:")]
+    return elapsed, loaded[-1][len("loaded:"):] if loaded else ""
+
+def measure(name, code, runs):
+    times = []
+    loaded = ""
+    time_run(code)  # warm up the file system cache and the bytecode of the modules
+    for _ in range(runs):
+        elapsed, loaded = time_run(code)
+        times.append(elapsed)
+    print(f"{name:<5} median {statistics.median(times) * 1000:7.1f} ms   min {min(times) * 1000:7.1f} ms   "
+          f"heavy modules loaded: {loaded or 'none'}")
+
+def main(runs=20):
+    with tempfile.TemporaryDirectory() as tmp:
+        measure("cli", CLI_FIRST_MAP.format(path=os.path.join(tmp, "map.ber"), heavy=HEAVY_MODULES), runs)
+    measure("gui", GUI_FIRST_MAP.format(heavy=HEAVY_MODULES), runs)
+    measure("none", "print()", runs)  # the interpreter alone, for reference
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-to-first-map time of the CLI and the GUI.")
+    parser.add_argument("-r", "--runs", type=int, default=20, help="Number of runs of each measurement (default: 20)")
+    args = parser.parse_args()
+    main(args.runs)
@@ -0,0 +1,140 @@
+import hashlib
+import json
+import os
+import shutil
+
+# Part of every cache key: bump it when a change to a generator changes the maps produced from a seed
+CACHE_VERSION = 1
+
+# Default location and size of the cache
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "so_long_maps")
+DEFAULT_CACHE_SIZE = 256 * 1024 * 1024
+
+# Eviction brings the cache down to this fraction of its maximum size, so that it does not run again at every
+# write once the cache is full
+EVICT_TARGET = 0.9
+
+# Estimated size of each cache (by directory and suffix) in this process: the size found by its last scan plus what
+# this process wrote since. Kept here rather than on the cache, which is copied to the worker processes with each task.
+_sizes = {}
+
+# ======================================================================================================================
+# On-disk cache of seeded maps
+# ======================================================================================================================
+
+class MapCache:
+    """
+    Stores the maps accepted for a (algorithm, width, height, coin_rate, wall_rate, seed) configuration.
+    A seeded generation always produces the same map, so it only has to run once per configuration.
+    Each map is a .ber file named after the hash of its configuration. Reading a map refreshes its
+    modification time, and the least recently used maps are deleted when the cache grows over max_bytes.
+    The directory is only scanned when the size of the cache, kept up to date with every write, goes
+    over max_bytes, and eviction then leaves some room (EVICT_TARGET), so writing n maps does not
+    scan the directory n times. Each process keeps its own count: while several processes write,
+    the cache can go over max_bytes by what the others wrote since the last scan.
+    The cache only holds file names and a size, so it can be sent to worker processes.
+    Other data derived from maps can be kept with read and write, in a directory of its own and with
+    its own suffix (the distance matrices of map_solver.py, for example).
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_SIZE, suffix=".ber"):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.suffix = suffix
+
+    @staticmethod
+    def key(algorithm, width, height, coin_rate, wall_rate, seed):
+        """Returns the hash identifying a configuration, the rates are normalized so "10" and 10 match."""
+        config = [CACHE_VERSION, algorithm, int(width), int(height), int(coin_rate), int(wall_rate), int(seed)]
+        return hashlib.sha256(json.dumps(config).encode()).hexdigest()
+
+    def path(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def fetch(self, key, destination):
+        """
+        Copies the cached map of key to destination.
+        Returns:
+            bool: True on a cache hit, False if the map is not in the cache.
+        """
+        source = self.path(key)
+        try:
+            os.utime(source)
+        except FileNotFoundError:
+            return False
+        directory = os.path.dirname(destination)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        try:
+            shutil.copyfile(source, destination)
+        except FileNotFoundError:  # evicted by another process in the meantime
+            return False
+        return True
+
+    def read(self, key):
+        """Returns the content cached under key (bytes), or None if it is not in the cache."""
+        path = self.path(key)
+        try:
+            os.utime(path)
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return None
+
+    def write(self, key, data):
+        """Caches data (bytes) under key, then evicts the least recently used entries."""
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f"{self.path(key)}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+        os.replace(temporary, self.path(key))
+        self._added(len(data))
+
+    def store(self, key, source):
+        """Adds the map file source to the cache under key, then evicts the least recently used maps."""
+        os.makedirs(self.directory, exist_ok=True)
+        # Written under a temporary name then renamed, so other processes never read a partial map
+        temporary = f"{self.path(key)}.{os.getpid()}.tmp"
+        shutil.copyfile(source, temporary)
+        size = os.path.getsize(temporary)
+        os.replace(temporary, self.path(key))
+        self._added(size)
+
+    def _added(self, size):
+        # Scans the directory on the first write of the process, then only when the count goes over max_bytes
+        total = _sizes.get((self.directory, self.suffix))
+        if total is None or total + size > self.max_bytes:
+            self.evict()
+        else:
+            _sizes[(self.directory, self.suffix)] = total + size
+
+    def evict(self):
+        """
+        Deletes the least recently used entries when the cache holds more than max_bytes, down to
+        EVICT_TARGET of max_bytes.
+        """
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+        if total > self.max_bytes:
+            target = self.max_bytes * EVICT_TARGET
+            entries.sort()
+            for _, size, path in entries:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:  # already deleted by another process
+                    pass
+                total -= size
+                if total <= target:
+                    break
+        _sizes[(self.directory, self.suffix)] = total
+
@@ -0,0 +1,1408 @@
+import csv
+import itertools
+import json
+import random
+from array import array
+from collections import deque
+import os
+import time
+
+# numpy is only needed by the "numpy" algorithm and is slow to import, _import_numpy loads it on first use
+np = None
+
+# Tiles of a so_long map
+WALL = '1'
+EMPTY = '0'
+COIN = 'C'
+PLAYER = 'P'
+EXIT = 'E'
+
+# The tiles of the game, as bytes (the editor lets users add their own tiles)
+TILES = (WALL + EMPTY + COIN + PLAYER + EXIT).encode()
+
+# ======================================================================================================================
+# GRID: a map held in one byte buffer
+# ======================================================================================================================
+
+class Grid:
+    """
+    A so_long map held in one bytearray, one byte per tile, row after row: the tile (x, y) is
+    cells[y * width + x]. The number of each tile and the position of the player and the exit are
+    cached, and kept up to date as long as tiles are changed through the grid (grid[x, y] = tile).
+    """
+    __slots__ = ("width", "height", "cells", "_counts", "_positions")
+
+    def __init__(self, width, height, cells=None):
+        """
+        Args:
+            width (int): The width of the map.
+            height (int): The height of the map.
+            cells (bytes-like): The width * height tiles of the map (default: only walls).
+        Raises:
+            ValueError: If the number of tiles does not match the dimensions.
+        """
+        if cells is None:
+            cells = bytearray(WALL.encode()) * (width * height)
+        elif len(cells) != width * height:
+            raise ValueError(f"A {width}x{height} map needs {width * height} tiles, got {len(cells)}.")
+        self.width = width
+        self.height = height
+        self.cells = cells if isinstance(cells, bytearray) else bytearray(cells)
+        # Tile byte -> number of tiles, and tile byte -> index of one such tile (-1 if none),
+        # both filled on first use
+        self._counts = {}
+        self._positions = {}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a grid from rows of tiles, such as lines of a .ber file or lists of characters.
+        Raises:
+            ValueError: If the map is empty or the rows do not all have the same length.
+        """
+        rows = ["".join(row) for row in rows]
+        if not rows or not rows[0]:
+            raise ValueError("The map is empty.")
+        width = len(rows[0])
+        if any(len(row) != width for row in rows):
+            raise ValueError("All rows must have the same number of columns.")
+        return cls(width, len(rows), "".join(rows).encode("latin-1"))
+
+    def __repr__(self):
+        return f"Grid({self.width}x{self.height})"
+
+    def __getitem__(self, position):
+        x, y = position
+        return chr(self.cells[y * self.width + x])
+
+    def __setitem__(self, position, tile):
+        x, y = position
+        self.set_index(y * self.width + x, tile)
+
+    def set_index(self, index, tile):
+        """Set the tile at a flat index and update the cached counts and positions."""
+        new = ord(tile)
+        old = self.cells[index]
+        if new == old:
+            return
+        self.cells[index] = new
+        counts = self._counts
+        if old in counts:
+            counts[old] -= 1
+        if new in counts:
+            counts[new] += 1
+        positions = self._positions
+        if positions.get(old) == index:
+            del positions[old]
+        if positions.get(new) == -1:
+            positions[new] = index
+
+    def count(self, tile):
+        """Number of tiles of a kind, counted once then kept up to date."""
+        tile = ord(tile)
+        count = self._counts.get(tile)
+        if count is None:
+            count = self._counts[tile] = self.cells.count(tile)
+        return count
+
+    def find(self, tile):
+        """Flat index of a tile of this kind (the only one for the player and the exit), or -1."""
+        tile = ord(tile)
+        index = self._positions.get(tile)
+        if index is None:
+            index = self._positions[tile] = self.cells.find(tile)
+        return index
+
+    def position(self, tile):
+        """(x, y) position of a tile of this kind, or None if there is none."""
+        index = self.find(tile)
+        return None if index < 0 else (index % self.width, index // self.width)
+
+    @property
+    def player(self):
+        return self.position(PLAYER)
+
+    @property
+    def exit(self):
+        return self.position(EXIT)
+
+    def tiles(self):
+        """The set of tile characters used in the map."""
+        return {chr(tile) for tile in set(self.cells)}
+
+    def lines(self):
+        """The rows of the map as strings, as written in a .ber file."""
+        cells, width = self.cells, self.width
+        return [cells[row:row + width].decode("latin-1") for row in range(0, len(cells), width)]
+
+    def to_rows(self):
+        """The map as a list of lists of characters."""
+        return [list(line) for line in self.lines()]
+
+    def copy(self):
+        grid = Grid(self.width, self.height, bytearray(self.cells))
+        grid._counts = dict(self._counts)
+        grid._positions = dict(self._positions)
+        return grid
+
+    def invalidate(self):
+        """Forget the cached counts and positions, after writing to cells directly."""
+        self._counts.clear()
+        self._positions.clear()
+
+# ======================================================================================================================
+# Generate a valid map for the so_long game
+# ======================================================================================================================
+
+# A valid map holds at least a player, an exit and a coin inside its border
+MIN_INNER_CELLS = 3
+
+def check_map_size(width, height):
+    """
+    Raises ValueError if a width x height map is too small to ever be valid: no generated map could
+    hold a player, an exit and a coin inside its border (and generate_map would never end placing
+    the player and the exit on fewer than two cells).
+    """
+    if max(0, int(width) - 2) * max(0, int(height) - 2) < MIN_INNER_CELLS:
+        raise ValueError(f"A {width}x{height} map is too small to hold a player, an exit and a coin inside its walls.")
+
+# Fonction pour générer une carte valide
+def generate_map(width, height, coin_rate, wall_rate):
+    """
+    Generates a 2D map for a game with specified dimensions and rates for coins and walls.
+    Args:
+        width (int): The width of the map.
+        height (int): The height of the map.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+    Returns:
+        Grid: The generated map, where:
+            '1' represents a wall,
+            '0' represents an empty space,
+            'E' represents the exit,
+            'P' represents the player start position,
+            'C' represents a coin.
+    Raises:
+        ValueError: If the map is too small to ever be valid, see check_map_size.
+    """
+    check_map_size(width, height)
+    grid = Grid(width, height)
+    cells = grid.cells
+    inner = [y * width + x for y in range(1, height - 1) for x in range(1, width - 1)]
+
+    for i in inner:
+        cells[i] = ord(EMPTY)
+
+    # Place exit and player randomly on the map
+    exit_placed = False
+    player_placed = False
+
+    while not exit_placed or not player_placed:
+        for i in inner:
+            if cells[i] == ord(EMPTY):
+                if not exit_placed and random.random() < 0.05:
+                    cells[i] = ord(EXIT)
+                    exit_placed = True
+                elif not player_placed and random.random() < 0.05:
+                    cells[i] = ord(PLAYER)
+                    player_placed = True
+
+    # Place coins randomly based on coin_rate
+    coin_rate = int(coin_rate) / 100
+    for i in inner:
+        if cells[i] == ord(EMPTY) and random.random() < coin_rate:
+            cells[i] = ord(COIN)
+
+    # If coins haven't already taken all the space
+    # Place walls randomly based on wall_rate
+    wall_rate = int(wall_rate) / 100
+    for i in inner:
+        if cells[i] == ord(EMPTY) and random.random() < wall_rate:
+            cells[i] = ord(WALL)
+
+    return grid
+
+# ======================================================================================================================
+# Constructive generation: every generated map is valid
+# ======================================================================================================================
+
+# Maximum number of cells explored when checking that a wall does not split the map
+_CONNECTIVITY_SEARCH_LIMIT = 64
+
+def _wall_keeps_connectivity(cells, width, i):
+    """
+    Check if turning the open cell i into a wall keeps the open region connected.
+    Args:
+        cells (bytearray): The tiles of the map, whose open cells form a single connected region.
+        width (int): The width of the map.
+        i (int): The flat index of the candidate wall.
+    Returns:
+        bool: True if the open region surely stays connected once the wall is placed.
+    """
+    wall = ord(WALL)
+    # The 8 cells around i: odd indexes are the orthogonal neighbours, even indexes the corners
+    ring = (i - width - 1, i - width, i - width + 1, i + 1, i + width + 1, i + width, i + width - 1, i - 1)
+    is_open = [cells[r] != wall for r in ring]
+    neighbours = [k for k in (1, 3, 5, 7) if is_open[k]]
+    if len(neighbours) <= 1:
+        return True
+
+    # Fast path: two consecutive neighbours are linked by the corner between them,
+    # if all the neighbours are linked that way the wall cannot split the region
+    links = sum(1 for k in neighbours if is_open[(k + 1) % 8] and is_open[(k + 2) % 8])
+    if links >= len(neighbours) - 1:
+        return True
+
+    # Otherwise look for a short path between the neighbours that goes around i. The search is
+    # bounded, so a wall that would close a large loop is refused: refusing a wall is always safe.
+    targets = {ring[k] for k in neighbours[1:]}
+    start = ring[neighbours[0]]
+    visited = {i, start}
+    queue = deque([start])
+    while queue and len(visited) < _CONNECTIVITY_SEARCH_LIMIT:
+        c = queue.popleft()
+        for n in (c + 1, c - 1, c + width, c - width):
+            if n in visited or cells[n] == wall:
+                continue
+            targets.discard(n)
+            if not targets:
+                return True
+            visited.add(n)
+            queue.append(n)
+    return False
+
+def generate_map_constructive(width, height, coin_rate, wall_rate):
+    """
+    Generates a map that is valid by construction, with the same coin and wall rates as generate_map.
+    Walls are only placed on cells that keep the open cells connected, so the exit and every coin
+    stay reachable from the player and the map never has to be thrown away. Past roughly 55% of
+    walls the map cannot stay connected, so very high wall rates give fewer walls than requested.
+    Args:
+        width (int): The width of the map.
+        height (int): The height of the map.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+    Returns:
+        Grid: The generated map, with the same tiles as generate_map.
+    Raises:
+        ValueError: If the map is too small to hold a player, an exit and a coin, see check_map_size.
+    """
+    check_map_size(width, height)
+    inner = [y * width + x for y in range(1, height - 1) for x in range(1, width - 1)]
+
+    grid = Grid(width, height)
+    cells = grid.cells
+    for i in inner:
+        cells[i] = ord(EMPTY)
+
+    # Place exit and player uniformly on the map
+    random.shuffle(inner)
+    cells[inner[0]] = ord(PLAYER)
+    cells[inner[1]] = ord(EXIT)
+
+    # Place coins randomly based on coin_rate, with at least one coin
+    coin_rate = int(coin_rate) / 100
+    empty = []
+    for i in inner[2:]:
+        if random.random() < coin_rate:
+            cells[i] = ord(COIN)
+        else:
+            empty.append(i)
+    if len(empty) == len(inner) - 2:
+        cells[empty.pop()] = ord(COIN)
+
+    # Draw the number of walls as generate_map does, then place them in random order on the cells
+    # that keep the map connected. Refused cells get a second chance once the others have been tried.
+    wall_rate = int(wall_rate) / 100
+    walls_left = sum(1 for _ in empty if random.random() < wall_rate)
+    for _ in range(2):
+        refused = []
+        for i in empty:
+            if not walls_left:
+                break
+            if _wall_keeps_connectivity(cells, width, i):
+                cells[i] = ord(WALL)
+                walls_left -= 1
+            else:
+                refused.append(i)
+        empty = refused
+
+    return grid
+
+# ======================================================================================================================
+# NumPy generation: the map is built as an array of bytes
+# ======================================================================================================================
+
+# Created on first use from _numpy_seed, reset by seed_generators
+_numpy_rng = None
+_numpy_seed = None
+
+# Tile written for each number of masks a cell falls in: neither, wall only, coin (and wall)
+_ARRAY_TILES = None
+
+def _import_numpy():
+    """Imports numpy on first use so that the other algorithms and the GUI start without it."""
+    global np, _ARRAY_TILES
+    if np is None:
+        try:
+            import numpy
+        except ImportError:
+            raise ImportError("The numpy algorithm requires numpy: pip install numpy") from None
+        _ARRAY_TILES = numpy.frombuffer(b"01C", dtype=numpy.uint8)
+        np = numpy
+    return np
+
+def generate_map_array(width, height, coin_rate, wall_rate, rng=None):
+    """
+    Generates the same maps as generate_map, as a 2D numpy array of tile bytes (b'1', b'0', b'C', b'P', b'E').
+    Each mask is drawn with one vectorized call and the player and exit are picked uniformly among
+    the inner cells, so the cost no longer depends on Python loops over the cells.
+    Args:
+        width (int): The width of the map.
+        height (int): The height of the map.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+        rng (numpy.random.Generator): The random generator to use (default: a module-wide one).
+    Returns:
+        numpy.ndarray: A (height, width) uint8 array holding the ASCII code of each tile.
+    """
+    global _numpy_rng
+    _import_numpy()
+    if rng is None:
+        if _numpy_rng is None:
+            _numpy_rng = np.random.default_rng(_numpy_seed)
+        rng = _numpy_rng
+
+    map_array = np.full((height, width), ord(WALL), dtype=np.uint8)
+    inner = map_array[1:-1, 1:-1]
+
+    # One 16-bit draw per cell gives both masks: a coin with probability coin_rate, otherwise
+    # a wall with probability wall_rate, as the two passes of generate_map. The number of masks
+    # a cell falls in (0, 1 or 2) indexes the tile to write.
+    coin_rate = int(coin_rate) / 100
+    wall_rate = int(wall_rate) / 100
+    draw = rng.integers(0, 1 << 16, size=inner.shape, dtype=np.uint16)
+    tile_index = (draw < round((coin_rate + (1 - coin_rate) * wall_rate) * (1 << 16))).view(np.uint8)
+    tile_index += (draw < round(coin_rate * (1 << 16))).view(np.uint8)
+    np.take(_ARRAY_TILES, tile_index, out=inner)
+
+    # Place exit and player on two distinct inner cells, whatever was drawn there
+    if inner.size >= 2:
+        exit_index = rng.integers(inner.size)
+        player_index = rng.integers(inner.size - 1)
+        if player_index >= exit_index:
+            player_index += 1
+        inner.flat[exit_index] = ord(EXIT)
+        inner.flat[player_index] = ord(PLAYER)
+
+    return map_array
+
+def generate_map_numpy(width, height, coin_rate, wall_rate):
+    """Same as generate_map, built with generate_map_array (and the same ValueError on maps that are too small)."""
+    check_map_size(width, height)
+    return Grid(width, height, generate_map_array(width, height, coin_rate, wall_rate).tobytes())
+
+# ======================================================================================================================
+# Byte generation: large maps without numpy
+# ======================================================================================================================
+
+# Number of cells drawn at once when filling a large map, keeps the random bytes small
+_BUFFER_CHUNK = 1 << 20
+
+def generate_map_buffer(width, height, coin_rate, wall_rate):
+    """
+    Generates a map with one random byte per cell, translated into a tile by a 256-entry table.
+    The whole map is drawn by C loops, so it also works for very large maps, but the coin and
+    wall rates are rounded to 1/256.
+    Args:
+        width (int): The width of the map.
+        height (int): The height of the map.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+    Returns:
+        Grid: The generated map.
+    Raises:
+        ValueError: If the map is too small to hold a player and an exit.
+    """
+    if (width - 2) * (height - 2) < 2:
+        raise ValueError("The map is too small to hold a player and an exit.")
+    coin_rate = int(coin_rate) / 100
+    wall_rate = int(wall_rate) / 100
+    coin_limit = round(coin_rate * 256)
+    wall_limit = round((coin_rate + (1 - coin_rate) * wall_rate) * 256)
+    table = bytes(ord(COIN) if b < coin_limit else ord(WALL) if b < wall_limit else ord(EMPTY) for b in range(256))
+
+    size = width * height
+    cells = bytearray(size)
+    for start in range(0, size, _BUFFER_CHUNK):
+        end = min(start + _BUFFER_CHUNK, size)
+        cells[start:end] = random.randbytes(end - start).translate(table)
+
+    # Surround the map with walls
+    cells[:width] = WALL.encode() * width
+    cells[-width:] = WALL.encode() * width
+    cells[::width] = WALL.encode() * height
+    cells[width - 1::width] = WALL.encode() * height
+
+    # Place exit and player on two distinct inner cells
+    exit_index = player_index = random.randint(1, height - 2) * width + random.randint(1, width - 2)
+    while player_index == exit_index:
+        player_index = random.randint(1, height - 2) * width + random.randint(1, width - 2)
+    cells[exit_index] = ord(EXIT)
+    cells[player_index] = ord(PLAYER)
+
+    return Grid(width, height, cells)
+
+# Generation algorithms selectable from the interfaces
+ALGORITHMS = {
+    "random": generate_map,
+    "constructive": generate_map_constructive,
+    "numpy": generate_map_numpy,
+}
+
+def seed_generators(seed=None):
+    """Seed the random generators used by all the algorithms (default: fresh entropy)."""
+    global _numpy_rng, _numpy_seed
+    random.seed(seed)
+    # The numpy generator is recreated from the seed on its next use, numpy may not be imported yet
+    _numpy_rng = None
+    _numpy_seed = seed
+
+# ======================================================================================================================
+# Validate a map
+# ======================================================================================================================
+
+# Outcomes of validate_map_reason: VALID, or the first check a map fails, in the order they are checked
+VALID = "valid"
+REJECT_TOO_SMALL = "too_small"
+REJECT_BORDER = "border_not_walls"
+REJECT_PLAYER_COUNT = "player_count"
+REJECT_EXIT_COUNT = "exit_count"
+REJECT_NO_COINS = "no_coins"
+REJECT_UNREACHABLE_EXIT = "unreachable_exit"
+REJECT_UNREACHABLE_COINS = "unreachable_coins"
+REJECTION_REASONS = (REJECT_TOO_SMALL, REJECT_BORDER, REJECT_PLAYER_COUNT, REJECT_EXIT_COUNT, REJECT_NO_COINS,
+                     REJECT_UNREACHABLE_EXIT, REJECT_UNREACHABLE_COINS)
+
+# Byte translation table marking walls with 1 and every other tile with 0
+_BLOCKED_TILES = bytes(1 if c == ord(WALL) else 0 for c in range(256))
+
+def flood_fill(map_data, x, y, visited, target):
+    """
+    Perform a flood fill algorithm to count the number of target cells in a 2D map.
+    Args:
+        map_data (Grid): The map.
+        x (int): The starting x-coordinate for the flood fill.
+        y (int): The starting y-coordinate for the flood fill.
+        visited (bytearray): One byte per cell (index y * width + x) to keep track of visited cells.
+        target (str): The target character to count in the map.
+    Returns:
+        int: The count of target cells found in the map.
+    """
+    cells, width, height = map_data.cells, map_data.width, map_data.height
+    wall, target = ord(WALL), ord(target)
+    start = y * width + x
+    if visited[start] or cells[start] == wall:
+        return 0
+
+    visited[start] = 1
+    stack = [start]
+    count = 0
+
+    while stack:
+        i = stack.pop()
+        if cells[i] == target:
+            count += 1
+
+        # Cells are marked when pushed, so each cell is pushed once and never out of bounds
+        cx = i % width
+        for n, inside in ((i + 1, cx < width - 1), (i - 1, cx > 0), (i + width, i + width < len(cells)), (i - width, i >= width)):
+            if inside and not visited[n] and cells[n] != wall:
+                visited[n] = 1
+                stack.append(n)
+
+    return count
+
+# Above this number of cells, maps are always explored run by run to keep the stack small
+_CELL_EXPLORE_LIMIT = 1 << 20
+
+def _explore(grid, blocked, stop_early):
+    """
+    Flood fill of the area reachable from the player, counting collectibles and the exit on the way.
+    Open maps are explored run by run, maps with many walls (short runs) cell by cell.
+    Args:
+        grid (Grid): The map, surrounded by walls, with exactly one player and one exit.
+        blocked (bytearray): 1 for walls, 0 elsewhere. Reached cells are set to 1.
+        stop_early (bool): Stop as soon as the exit and all the collectibles have been reached.
+    Returns:
+        tuple: The number of reached collectibles, whether the exit was reached, and the index of
+            up to two reached empty cells.
+    """
+    if len(grid.cells) > _CELL_EXPLORE_LIMIT or grid.count(WALL) * 5 < len(grid.cells):
+        return _explore_runs(grid, blocked, stop_early)
+    return _explore_cells(grid, blocked, stop_early)
+
+def _explore_runs(grid, blocked, stop_early):
+    """
+    Scanline version of _explore: each horizontal run of open cells is found, marked and counted
+    with byte-level searches, so the Python loop runs once per run instead of once per cell.
+    """
+    cells, width = grid.cells, grid.width
+    exit_index = grid.find(EXIT)
+    collectible_count = grid.count(COIN)
+    coin = COIN.encode()
+    empty_tile = EMPTY.encode()
+    visited = b'\x01' * width
+    reached_collectibles = 0
+    exit_found = False
+    empty_cells = []
+    # Cells left to explore, as 8-byte integers rather than Python ints to keep large maps compact
+    stack = array('q', [grid.find(PLAYER)])
+
+    while stack:
+        i = stack.pop()
+        if blocked[i]:
+            continue
+        # The border is made of walls, so the run always ends inside its row
+        row = i - i % width
+        left = blocked.rfind(1, row, i) + 1
+        right = blocked.find(1, i, row + width)
+        blocked[left:right] = visited[:right - left]
+
+        reached_collectibles += cells.count(coin, left, right)
+        if left <= exit_index < right:
+            exit_found = True
+        if len(empty_cells) < 2:
+            empty = cells.find(empty_tile, left, right)
+            if empty >= 0:
+                empty_cells.append(empty)
+        if stop_early and exit_found and reached_collectibles == collectible_count:
+            break
+
+        # Push one cell of every open run touching this one in the rows above and below
+        for j in (left - width, left + width):
+            end = j + right - left
+            while j < end:
+                j = blocked.find(0, j, end)
+                if j < 0:
+                    break
+                stack.append(j)
+                j = blocked.find(1, j, end)
+                if j < 0:
+                    break
+
+    return reached_collectibles, exit_found, empty_cells
+
+def _explore_cells(grid, blocked, stop_early):
+    """Cell by cell version of _explore, faster than _explore_runs when runs of open cells are short."""
+    cells, width = grid.cells, grid.width
+    coin, exit_tile, empty_tile = ord(COIN), ord(EXIT), ord(EMPTY)
+    collectible_count = grid.count(COIN)
+    reached_collectibles = 0
+    exit_found = False
+    empty_cells = []
+    start = grid.find(PLAYER)
+    blocked[start] = 1
+    stack = [start]
+
+    while stack:
+        i = stack.pop()
+        tile = cells[i]
+        if tile == coin:
+            reached_collectibles += 1
+        elif tile == exit_tile:
+            exit_found = True
+        elif tile == empty_tile and len(empty_cells) < 2:
+            empty_cells.append(i)
+        if stop_early and exit_found and reached_collectibles == collectible_count:
+            break
+
+        # The border is made of walls, so the neighbours of an open cell are inside the map
+        for n in (i + 1, i - 1, i + width, i - width):
+            if not blocked[n]:
+                blocked[n] = 1
+                stack.append(n)
+
+    return reached_collectibles, exit_found, empty_cells
+
+def _check_layout(grid):
+    """Check the size and border of a map and its number of players and exits. Returns VALID or the reason it fails."""
+    cells, width, height = grid.cells, grid.width, grid.height
+    wall = ord(WALL)
+    if width < 3 or height < 3:
+        return REJECT_TOO_SMALL
+    if cells.count(wall, 0, width) != width or cells.count(wall, len(cells) - width) != width:
+        return REJECT_BORDER
+    if cells[::width].count(wall) != height or cells[width - 1::width].count(wall) != height:
+        return REJECT_BORDER
+    if grid.count(PLAYER) != 1:
+        return REJECT_PLAYER_COUNT
+    if grid.count(EXIT) != 1:
+        return REJECT_EXIT_COUNT
+    return VALID
+
+def validate_map_reason(map_data):
+    """
+    Validates a game map like validate_map, and tells why an invalid map was rejected.
+    Args:
+        map_data (Grid): The game map.
+    Returns:
+        str: VALID, or the first check the map fails (one of REJECTION_REASONS). When both the exit
+            and some collectibles are out of reach, the reason is REJECT_UNREACHABLE_EXIT.
+    """
+    reason = _check_layout(map_data)
+    if reason != VALID:
+        return reason
+    if map_data.count(COIN) < 1:
+        return REJECT_NO_COINS
+
+    # Walk the player's reachable area once, counting collectibles and the exit on the way and
+    # stopping as soon as everything has been found
+    blocked = map_data.cells.translate(_BLOCKED_TILES)
+    reached, exit_found, _ = _explore(map_data, blocked, stop_early=True)
+    if not exit_found:
+        return REJECT_UNREACHABLE_EXIT
+    if reached != map_data.count(COIN):
+        return REJECT_UNREACHABLE_COINS
+    return VALID
+
+def validate_map(map_data):
+    """
+    Validates a game map to ensure it meets specific criteria.
+    Args:
+        map_data (Grid): The game map.
+    Returns:
+        bool: True if the map is valid, False otherwise.
+    The validation checks include:
+    - The map must be surrounded by walls ('1').
+    - The map must contain exactly one player ('P'), one exit ('E'), and at least one collectible ('C').
+    - All collectibles must be reachable from the player's starting position.
+    - The exit must be reachable from the player's starting position.
+    """
+    return validate_map_reason(map_data) == VALID
+
+def repair_map(map_data):
+    """
+    Makes a map valid in place instead of generating a new one: unreachable collectibles are
+    removed, and the exit (or a collectible if none is left) is moved to an empty cell reachable
+    from the player. A valid map is left unchanged.
+    Args:
+        map_data (Grid): The map, modified in place.
+    Returns:
+        bool: True if the map is now valid, False if the player has no room to reach anything.
+    """
+    if _check_layout(map_data) != VALID:
+        return False
+    cells, width = map_data.cells, map_data.width
+    blocked = cells.translate(_BLOCKED_TILES)
+    reached, exit_found, empty_cells = _explore(map_data, blocked, stop_early=False)
+
+    # Rows are compared as big integers: a collectible whose cell was not reached becomes empty
+    if reached < map_data.count(COIN):
+        coin_mask = bytes(1 if b == ord(COIN) else 0 for b in range(256))
+        unreached_mask = bytes(1 if b == 0 else 0 for b in range(256))
+        for row in range(0, len(cells), width):
+            coins = int.from_bytes(cells[row:row + width].translate(coin_mask), "big")
+            if not coins:
+                continue
+            lost = coins & int.from_bytes(blocked[row:row + width].translate(unreached_mask), "big")
+            if lost:
+                lost = lost.to_bytes(width, "big")
+                x = lost.find(1)
+                while x >= 0:
+                    map_data.set_index(row + x, EMPTY)
+                    x = lost.find(1, x + 1)
+
+    if not exit_found:
+        if not empty_cells:
+            return False
+        map_data.set_index(map_data.find(EXIT), EMPTY)
+        map_data.set_index(empty_cells.pop(), EXIT)
+    if not reached:
+        if not empty_cells:
+            return False
+        map_data.set_index(empty_cells.pop(), COIN)
+    return True
+
+def generate_attempts(width, height, coin_rate, wall_rate, algorithm="random", max_attempts=100, max_seconds=None, stats=None,
+                      call=None, on_attempt=None):
+    """
+    Generates maps until one is valid, for at most max_attempts attempts or max_seconds seconds, so
+    a long search can be run in short chunks that can be stopped between two chunks. This is the
+    loop behind every interface (CLI, batches, streams, server and GUI).
+    Args:
+        algorithm (str): The name of the generation algorithm in ALGORITHMS.
+        max_attempts (int): The maximum number of maps to generate (None: no limit).
+        max_seconds (float): The time after which no new attempt is started (default: no limit).
+        stats (RejectionStats): Records the outcome and the time of every attempt (default: not recorded).
+        call (callable): Runs the 'generate' and 'validate' phases of every attempt as
+            call(phase, function, *args), to time them (default: called directly).
+        on_attempt (callable): Called with the number and the validate_map_reason outcome of every attempt.
+    Returns:
+        tuple: The number of attempts and the valid map (Grid), or None if no map was valid.
+    Raises:
+        ValueError: If the map is too small to ever be valid.
+    """
+    check_map_size(width, height)
+    generate = ALGORITHMS[algorithm]
+    deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+    for attempt in range(1, max_attempts + 1) if max_attempts is not None else itertools.count(1):
+        start = time.perf_counter()
+        if call is None:
+            map_data = generate(width, height, coin_rate, wall_rate)
+            reason = validate_map_reason(map_data)
+        else:
+            map_data = call("generate", generate, width, height, coin_rate, wall_rate)
+            reason = call("validate", validate_map_reason, map_data)
+        if stats is not None:
+            stats.add(reason, time.perf_counter() - start)
+        if on_attempt is not None:
+            on_attempt(attempt, reason)
+        if reason == VALID:
+            return attempt, map_data
+        if deadline is not None and time.perf_counter() >= deadline:
+            return attempt, None
+    return max_attempts, None
+
+# ======================================================================================================================
+# Rejection statistics: why the generated maps were rejected over a run
+# ======================================================================================================================
+
+class RejectionStats:
+    """
+    Histogram of the outcomes of validate_map_reason over a run: the number of attempts that ended
+    with each reason (VALID included) and the time they took, generation and validation together.
+    The reason with the most time is the stage of the generator worth optimizing. Plain dicts, so
+    the statistics of worker processes can be sent back and merged.
+    """
+
+    def __init__(self):
+        self.counts = {}
+        self.seconds = {}
+
+    def add(self, reason, seconds=0.0):
+        self.counts[reason] = self.counts.get(reason, 0) + 1
+        self.seconds[reason] = self.seconds.get(reason, 0.0) + seconds
+
+    def merge(self, other):
+        """Adds the counts and times of other (RejectionStats) to these."""
+        for reason, count in other.counts.items():
+            self.counts[reason] = self.counts.get(reason, 0) + count
+            self.seconds[reason] = self.seconds.get(reason, 0.0) + other.seconds.get(reason, 0.0)
+
+    @property
+    def attempts(self):
+        return sum(self.counts.values())
+
+    @property
+    def rejected(self):
+        return self.attempts - self.counts.get(VALID, 0)
+
+    def rows(self):
+        """(reason, count, share of the attempts, seconds, mean milliseconds), most frequent first."""
+        attempts = self.attempts
+        return [(reason, count, count / attempts, self.seconds[reason], self.seconds[reason] / count * 1000)
+                for reason, count in sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))]
+
+    def as_dict(self):
+        return {
+            "attempts": self.attempts,
+            "rejected": self.rejected,
+            "reasons": {reason: {"count": count, "share": share, "seconds": seconds, "mean_ms": mean_ms}
+                        for reason, count, share, seconds, mean_ms in self.rows()},
+        }
+
+    def report(self):
+        """The histogram as text, one line per reason."""
+        lines = [f"{self.attempts} attempt(s), {self.rejected} rejected"]
+        for reason, count, share, seconds, mean_ms in self.rows():
+            lines.append(f"  {reason:<18} {count:>8} {share:>7.1%} {seconds:>9.3f}s {mean_ms:>9.3f} ms/attempt")
+        return "\n".join(lines)
+
+    def save(self, path):
+        """Exports the histogram as CSV if path ends with .csv, as JSON otherwise."""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            if path.lower().endswith(".csv"):
+                writer = csv.writer(file)
+                writer.writerow(("reason", "count", "share", "seconds", "mean_ms"))
+                writer.writerows(self.rows())
+            else:
+                json.dump(self.as_dict(), file, indent=1)
+                file.write("\n")
+
+# ======================================================================================================================
+# Incremental reachability: kept up to date while a map is edited one tile at a time
+# ======================================================================================================================
+
+class Reachability:
+    """
+    The cells the player can reach on a map being edited, kept up to date as tiles are changed with
+    set_tile, so the validity of the map is known after every change without exploring the whole
+    map again. Unlike validate_map, it does not rely on the border being made of walls.
+    Opening a wall next to the reached area only explores the area it opens. Closing a reached cell
+    explores its reached neighbours in turn until all but one are known to still lead to the player,
+    so the cost depends on the size of the part that is cut off rather than on the size of the map.
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self.reached = bytearray(len(grid.cells))
+        self.reached_coins = 0
+        self.reached_exits = 0
+        self.player = -1
+        self.recompute()
+
+    def recompute(self):
+        """Explores the whole reachable area again, used when the player is added, moved or removed."""
+        grid = self.grid
+        self.reached = bytearray(len(grid.cells))
+        self.reached_coins = 0
+        self.reached_exits = 0
+        self.player = grid.find(PLAYER) if grid.count(PLAYER) == 1 else -1
+        if self.player != -1:
+            self._mark(self.player)
+            self._flood([self.player])
+
+    def set_tile(self, index, tile):
+        """
+        Sets a tile of the grid and updates the reachable area.
+        Args:
+            index (int): The flat index of the cell (y * width + x).
+            tile (str): The new tile.
+        Returns:
+            list: The indexes of the cells whose reachability changed, or None if the whole
+            reachable area was explored again.
+        """
+        grid = self.grid
+        old = chr(grid.cells[index])
+        if old == tile:
+            return []
+        if PLAYER in (old, tile):
+            grid.set_index(index, tile)
+            self.recompute()
+            return None
+        if self.player == -1:
+            grid.set_index(index, tile)
+            return []
+
+        reached = self.reached
+        changed = []
+        if old == WALL:
+            grid.set_index(index, tile)
+            if any(reached[n] for n in self._neighbours(index)):
+                self._mark(index)
+                changed.append(index)
+                changed += self._flood([index])
+        elif tile == WALL:
+            if reached[index]:
+                self._unmark(index)
+                changed.append(index)
+                grid.set_index(index, tile)
+                changed += self._cut([n for n in self._neighbours(index) if reached[n]])
+            else:
+                grid.set_index(index, tile)
+        else:
+            # An open cell stays open: only the counts of the reached tiles change
+            if reached[index]:
+                self._unmark(index)
+                grid.set_index(index, tile)
+                self._mark(index)
+            else:
+                grid.set_index(index, tile)
+        return changed
+
+    def status(self):
+        """
+        Checks the map like validate_map, with a message explaining what is wrong.
+        Returns:
+            tuple: True if the map is valid, False otherwise, and the message.
+        """
+        grid = self.grid
+        cells, width, height = grid.cells, grid.width, grid.height
+        wall = ord(WALL)
+        if (cells.count(wall, 0, width) != width or cells.count(wall, len(cells) - width) != width
+                or cells[::width].count(wall) != height or cells[width - 1::width].count(wall) != height):
+            return False, "The map must be surrounded by walls."
+        if grid.count(PLAYER) != 1:
+            return False, "There must be exactly one player."
+        if grid.count(EXIT) != 1:
+            return False, "There must be exactly one exit."
+        if grid.count(COIN) < 1:
+            return False, "There must be at least one coin."
+        if self.reached_exits != 1:
+            return False, "The player cannot reach the exit."
+        missing = grid.count(COIN) - self.reached_coins
+        if missing:
+            return False, f"The player cannot reach {missing} coin(s)."
+        return True, "The map is valid."
+
+    def _neighbours(self, index):
+        width = self.grid.width
+        x = index % width
+        neighbours = []
+        if x > 0:
+            neighbours.append(index - 1)
+        if x < width - 1:
+            neighbours.append(index + 1)
+        if index >= width:
+            neighbours.append(index - width)
+        if index + width < len(self.reached):
+            neighbours.append(index + width)
+        return neighbours
+
+    def _mark(self, index):
+        self.reached[index] = 1
+        tile = self.grid.cells[index]
+        if tile == ord(COIN):
+            self.reached_coins += 1
+        elif tile == ord(EXIT):
+            self.reached_exits += 1
+
+    def _unmark(self, index):
+        self.reached[index] = 0
+        tile = self.grid.cells[index]
+        if tile == ord(COIN):
+            self.reached_coins -= 1
+        elif tile == ord(EXIT):
+            self.reached_exits -= 1
+
+    def _flood(self, stack):
+        """Marks the open cells that can be reached from the (already marked) cells of stack."""
+        cells, reached, wall = self.grid.cells, self.reached, ord(WALL)
+        marked = []
+        while stack:
+            for n in self._neighbours(stack.pop()):
+                if not reached[n] and cells[n] != wall:
+                    self._mark(n)
+                    marked.append(n)
+                    stack.append(n)
+        return marked
+
+    def _cut(self, seeds):
+        """
+        Unmarks the reached cells that no longer lead to the player after a reached cell was closed.
+        One search is run from each reached neighbour of the closed cell, one cell at a time each.
+        Searches that meet are merged, a search that finds the player is connected, and a search
+        that runs out of cells is cut off. The player can still reach at least one of the seeds, so
+        when a single search is left and none found the player, it is the connected one.
+        """
+        reached, player = self.reached, self.player
+        count = len(seeds)
+        group = list(range(count))
+        stacks = [[seed] for seed in seeds]
+        visited = [[seed] for seed in seeds]
+        owner = {seed: i for i, seed in enumerate(seeds)}
+        connected = set(i for i, seed in enumerate(seeds) if seed == player)
+
+        def root(i):
+            while group[i] != i:
+                i = group[i]
+            return i
+
+        active = [i for i in range(count) if i not in connected]
+        while active:
+            if not connected and len({root(i) for i in active}) == 1:
+                connected.add(root(active[0]))
+                break
+            for i in list(active):
+                r = root(i)
+                if r in connected or not stacks[i]:
+                    active.remove(i)
+                    continue
+                for n in self._neighbours(stacks[i].pop()):
+                    if not reached[n]:
+                        continue
+                    other = owner.get(n)
+                    if other is None:
+                        owner[n] = i
+                        visited[i].append(n)
+                        stacks[i].append(n)
+                        if n == player:
+                            connected.add(r)
+                    elif root(other) != r:
+                        other = root(other)
+                        group[other] = r
+                        if other in connected:
+                            connected.add(r)
+
+        cut = []
+        for i in range(count):
+            if root(i) not in connected:
+                for index in visited[i]:
+                    self._unmark(index)
+                cut += visited[i]
+        return cut
+
+# ======================================================================================================================
+# Distances and difficulty: how far the player has to walk on a valid map
+# ======================================================================================================================
+
+# Measures of measure_difficulty, usable as generation targets
+DIFFICULTY_MEASURES = ("exit_distance", "route_length")
+
+def distance_field(grid, start, blocked=None):
+    """
+    Breadth-first distances from a cell to every cell reachable from it, walls block the way.
+    Args:
+        grid (Grid): The map, surrounded by walls.
+        start (int): The flat index of the start cell.
+        blocked (bytearray): The walls of the map marked with 1, to share between searches (default: computed).
+    Returns:
+        array: The number of steps to each cell by flat index, -1 for walls and cells out of reach.
+    """
+    width = grid.width
+    blocked = bytearray(blocked) if blocked is not None else grid.cells.translate(_BLOCKED_TILES)
+    distances = array('i', [-1]) * len(blocked)
+    distances[start] = 0
+    blocked[start] = 1
+    frontier = [start]
+    distance = 0
+    # One level at a time, so every cell of a level gets the same distance without storing it in the queue
+    while frontier:
+        distance += 1
+        next_frontier = []
+        for i in frontier:
+            for n in (i + 1, i - 1, i + width, i - width):
+                if not blocked[n]:
+                    blocked[n] = 1
+                    distances[n] = distance
+                    next_frontier.append(n)
+        frontier = next_frontier
+    return distances
+
+def _nearest(grid, start, targets, blocked):
+    """
+    Breadth-first search from start that stops at the level of the nearest cells of targets (a set
+    of flat indexes). Returns the first of them in reading order and its distance, or -1, -1.
+    """
+    if start in targets:
+        return start, 0
+    width = grid.width
+    blocked = bytearray(blocked)
+    blocked[start] = 1
+    frontier = [start]
+    distance = 0
+    while frontier:
+        distance += 1
+        next_frontier = []
+        for i in frontier:
+            for n in (i + 1, i - 1, i + width, i - width):
+                if not blocked[n]:
+                    blocked[n] = 1
+                    next_frontier.append(n)
+        found = targets.intersection(next_frontier)
+        if found:
+            return min(found), distance
+        frontier = next_frontier
+    return -1, -1
+
+# Sorts cells out of reach after every reachable cell
+_UNREACHABLE = 1 << 62
+
+def _field_after(grid, field, i):
+    """
+    The distance field once cell i was walled or opened (the grid is already changed), if no other
+    cell gets a different distance, else None. Only the neighbours of i need to be looked at:
+    a wall changes nothing when every cell one step behind it has another way at the same distance,
+    an opening changes nothing when it connects no cell out of reach and shortens no path.
+    """
+    width, cells, wall = grid.width, grid.cells, ord(WALL)
+    distance = field[i]
+    if cells[i] == wall:
+        if distance < 0:
+            return field
+        for n in (i + 1, i - 1, i + width, i - width):
+            if field[n] == distance + 1 and not any(m != i and field[m] == distance for m in (n + 1, n - 1, n + width, n - width)):
+                return None
+        field = array('i', field)
+        field[i] = -1
+        return field
+    if distance >= 0:
+        return field  # the cell was already open, other tiles do not block the way
+    neighbours = [n for n in (i + 1, i - 1, i + width, i - width) if cells[n] != wall]
+    reached = [field[n] for n in neighbours if field[n] >= 0]
+    if not reached:
+        return field
+    distance = min(reached) + 1
+    if any(field[n] < 0 or field[n] > distance + 1 for n in neighbours):
+        return None
+    field = array('i', field)
+    field[i] = distance
+    return field
+
+class DistanceFields:
+    """
+    The distance fields of a map, each computed on first use from its source cell and then shared by
+    every measure that needs it (the map must not change while it is used, see after).
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self._fields = {}
+        self._blocked = None
+
+    def blocked(self):
+        """The walls of the map marked with 1, computed once for every search on the map."""
+        if self._blocked is None:
+            self._blocked = self.grid.cells.translate(_BLOCKED_TILES)
+        return self._blocked
+
+    def field(self, start):
+        """The distance field from the flat index start, see distance_field."""
+        field = self._fields.get(start)
+        if field is None:
+            field = self._fields[start] = distance_field(self.grid, start, self.blocked())
+        return field
+
+    def after(self, changes):
+        """
+        The fields of the map once the tiles at the flat indexes changes were changed (the grid is
+        already changed): each field the changes leave as it was is carried over, the others are
+        computed again when they are next needed.
+        """
+        grid = self.grid
+        fields = DistanceFields(grid)
+        for start, field in self._fields.items():
+            if chr(grid.cells[start]) not in (PLAYER, COIN, EXIT):
+                continue  # a coin that moved away, its field is no longer used
+            for i in changes:
+                field = _field_after(grid, field, i)
+                if field is None:
+                    break
+            else:
+                fields._fields[start] = field
+        return fields
+
+    def exit_distance(self):
+        """Length of the shortest path from the player to the exit, -1 if the exit is out of reach."""
+        return self.field(self.grid.find(PLAYER))[self.grid.find(EXIT)]
+
+    def route_length(self):
+        """
+        Length of a route from the player through every coin to the exit, always walking to the
+        nearest coin left (an upper bound of the shortest route, see map_solver.py for the shortest).
+        Each step reads the field of its cell when it is known (always for the player), otherwise a
+        search stops at the nearest coins: computing a whole field from every coin costs more than
+        these short searches, even when the fields are kept across the steps of search_difficulty.
+        Ties go to the first coin in reading order either way. Returns -1 if a coin or the exit is
+        out of reach.
+        """
+        grid = self.grid
+        coin = ord(COIN)
+        left = {i for i, tile in enumerate(grid.cells) if tile == coin}
+        position, length = grid.find(PLAYER), 0
+        self.field(position)
+        while left:
+            field = self._fields.get(position)
+            if field is not None:
+                distance, position = min((field[i] if field[i] >= 0 else _UNREACHABLE, i) for i in left)
+                if distance == _UNREACHABLE:
+                    return -1
+            else:
+                position, distance = _nearest(grid, position, left, self.blocked())
+                if distance < 0:
+                    return -1
+            left.discard(position)
+            length += distance
+        last = self.field(grid.find(EXIT))[position]
+        return -1 if last < 0 else length + last
+
+def measure_difficulty(grid, measures=DIFFICULTY_MEASURES, fields=None):
+    """
+    Measures how far the player has to walk on a valid map.
+    Args:
+        grid (Grid): The map.
+        measures (tuple): The measures to compute, among DIFFICULTY_MEASURES.
+        fields (DistanceFields): Distance fields of the map to reuse (default: new ones).
+    Returns:
+        dict: exit_distance (shortest path from the player to the exit) and route_length (length of
+            a route collecting every coin before the exit), as requested, -1 when out of reach.
+    """
+    fields = fields or DistanceFields(grid)
+    return {measure: getattr(fields, measure)() for measure in measures}
+
+def _difficulty_score(values, targets):
+    # Progress towards the targets: 1 per target met, a fraction for the others
+    return sum(min(values[measure], target) / target for measure, target in targets.items())
+
+def search_difficulty(grid, targets, max_steps=5000, max_seconds=None):
+    """
+    Makes a valid map harder until it meets targets, by local search instead of generating new maps:
+    at each step a wall is added or removed, or the exit or a coin is moved to a cell far from the
+    player, and the change is kept if the map stays valid and does not get easier.
+    Args:
+        grid (Grid): A valid map, modified in place (it stays valid).
+        targets (dict): Minimum values of measures of measure_difficulty, e.g. {"exit_distance": 40}.
+        max_steps (int): The maximum number of changes tried.
+        max_seconds (float): The time after which the search stops (default: no limit).
+    Returns:
+        tuple: Whether the targets are met, the measures of the map (dict) and the number of steps.
+    """
+    targets = {measure: target for measure, target in targets.items() if target > 0}
+    measures = tuple(targets)
+    # The fields of the map as it stands: a refused change is undone, so they stay valid, and a kept
+    # change only recomputes the fields it touches (see DistanceFields.after)
+    fields = DistanceFields(grid)
+    values = measure_difficulty(grid, measures, fields)
+    score, goal = _difficulty_score(values, targets), len(targets)
+    width, height = grid.width, grid.height
+    deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+    empty, wall, coin = ord(EMPTY), ord(WALL), ord(COIN)
+    step = 0
+    while score < goal and step < max_steps:
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+        step += 1
+        move = random.random()
+        if move < 0.2:
+            # Move the exit, or a coin, to one of the reachable empty cells farthest from the player
+            tile = EXIT if move < 0.1 else COIN
+            field = fields.field(grid.find(PLAYER))
+            candidates = [i for i, t in enumerate(grid.cells) if t == empty and field[i] > 0]
+            if not candidates:
+                continue
+            candidates.sort(key=field.__getitem__)
+            target_cell = random.choice(candidates[-max(1, len(candidates) // 10):])
+            if tile == EXIT:
+                source = grid.find(EXIT)
+            else:
+                coins = [i for i, t in enumerate(grid.cells) if t == coin]
+                source = random.choice(coins)
+            changes = [(source, EMPTY), (target_cell, tile)]
+        else:
+            # Add or remove a wall inside the border
+            i = random.randrange(1, width - 1) + random.randrange(1, height - 1) * width
+            if grid.cells[i] == empty:
+                changes = [(i, WALL)]
+            elif grid.cells[i] == wall:
+                changes = [(i, EMPTY)]
+            else:
+                continue
+        undo = [(i, chr(grid.cells[i])) for i, _ in changes]
+        for i, tile in changes:
+            grid.set_index(i, tile)
+        if validate_map(grid):
+            new_fields = fields.after([i for i, _ in changes])
+            new_values = measure_difficulty(grid, measures, new_fields)
+            new_score = _difficulty_score(new_values, targets)
+            if new_score >= score:
+                values, score, fields = new_values, new_score, new_fields
+                continue
+        for i, tile in reversed(undo):
+            grid.set_index(i, tile)
+    return score >= goal, values, step
+
+# ======================================================================================================================
+# SAVE AND LOAD MAPS
+# ======================================================================================================================
+
+def save_map_to_file(map_data, filename="maps/map.ber"):
+    """
+    Save a map to a .ber file, one row at a time without copying the map.
+    Args:
+        map_data (Grid): The map.
+        filename (str): The path of the file to write, its directory is created if needed.
+    """
+    path = os.path.dirname(filename)
+    if path:
+        os.makedirs(path, exist_ok=True)
+
+    cells, width = memoryview(map_data.cells), map_data.width
+    with open(filename, "wb") as file:
+        for row in range(0, len(cells), width):
+            file.write(cells[row:row + width])
+            file.write(b"\n")
+
+class MapFormatError(ValueError):
+    """A .ber file that is not a rectangle of tiles, with the line and column (from 1) of the first problem."""
+
+    def __init__(self, message, line=None, column=None, tile=None):
+        location = f"line {line}, column {column}: " if column is not None else f"line {line}: " if line is not None else ""
+        super().__init__(location + message)
+        self.line = line
+        self.column = column
+        # The unknown character, when the problem is a tile that is not allowed
+        self.tile = tile
+
+# Ignored at the end of each row of a .ber file
+_TRAILING_SPACE = b" \t\r"
+
+def _parse_rows(lines):
+    """
+    Checks the lines of a map that is not a plain rectangle row by row, raising MapFormatError at
+    the first row that does not fit. Returns the rows and the line number of the first one.
+    """
+    # Leading and trailing blank lines and trailing spaces are tolerated, like the previous text loader did
+    rows = [(number, line.rstrip(_TRAILING_SPACE)) for number, line in enumerate(lines, 1)]
+    while rows and not rows[-1][1]:
+        rows.pop()
+    while rows and not rows[0][1]:
+        rows.pop(0)
+    if not rows:
+        raise MapFormatError("The map is empty.")
+    width = len(rows[0][1])
+    for number, row in rows:
+        if not row:
+            raise MapFormatError("Empty line inside the map.", number)
+        if len(row) != width:
+            raise MapFormatError(f"The row has {len(row)} columns, the first row has {width}.", number, min(len(row), width) + 1)
+    return [row for _, row in rows], rows[0][0]
+
+def parse_map(data, tiles=None):
+    """
+    Parse the content of a .ber file at the byte level. A well-formed file (rows of equal length
+    without trailing spaces, LF, CRLF or CR line ends, trailing new lines) is checked and turned
+    into a grid with a few byte-level operations, whatever its size; other files are checked row by
+    row, with the same tolerance for blank lines and trailing spaces, to report the first problem.
+    Args:
+        data (bytes): The content of the file.
+        tiles (bytes): The allowed tiles (default: any byte, see TILES for the tiles of the game).
+    Returns:
+        Grid: The map.
+    Raises:
+        MapFormatError: If the map is empty, its rows do not have the same length, or it holds a tile not in tiles.
+    """
+    if b"\r" in data:
+        data = data.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+    data = data.rstrip(b"\n")
+    width = data.find(b"\n")
+    if width < 0:
+        width = len(data)
+    height = data.count(b"\n") + 1
+    # A rectangle: every (width + 1)-th byte is a line end, there is no other line end, and no row
+    # ends with a space that _parse_rows would strip
+    first_line = 1
+    if (width and len(data) == height * (width + 1) - 1 and data[width::width + 1] == b"\n" * (height - 1)
+            and len(data[width - 1::width + 1].translate(None, _TRAILING_SPACE)) == height):
+        cells = data.replace(b"\n", b"")
+    else:
+        rows, first_line = _parse_rows(data.split(b"\n"))
+        width, height = len(rows[0]), len(rows)
+        cells = b"".join(rows)
+    if tiles is not None:
+        unknown = cells.translate(None, tiles)
+        if unknown:
+            index = cells.find(unknown[:1])
+            row, column = divmod(index, width)
+            tile = unknown[:1].decode("latin-1")
+            raise MapFormatError(f"Unknown tile {tile!r}.", first_line + row, column + 1, tile)
+    return Grid(width, height, cells)
+
+def load_map_from_file(file_path, tiles=None):
+    """
+    Load a map from a .ber file, read in one piece and parsed at the byte level (see parse_map).
+    Args:
+        file_path (str): The path of the file to read.
+        tiles (bytes): The allowed tiles (default: any byte, see TILES for the tiles of the game).
+    Returns:
+        Grid: The map.
+    Raises:
+        OSError: If the file cannot be read.
+        MapFormatError: A ValueError, if the file is empty, its rows do not all have the same length
+            or it holds a tile not in tiles, with the line and column of the problem.
+    """
+    with open(file_path, "rb") as file:
+        return parse_map(file.read(), tiles)
@@ -1,15 +1,14 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, colorchooser
-import ttkbootstrap as ttkb
 import random
-from PIL import Image, ImageTk
+import map_core
+
+# ttkbootstrap and PIL are slow to import, they are imported by the functions that open windows
 
 def load_map_from_file(file_path):
     """Load map data from a file."""
     try:
-        with open(file_path, "r") as file:
-            map_data = [list(line.strip()) for line in file.readlines()]
-        return map_data
+        return map_core.load_map_from_file(file_path)
     except Exception as e:
         messagebox.showerror("Error", f"Failed to load map: {e}")
         return None
@@ -17,68 +16,50 @@ def load_map_from_file(file_path):
 def save_map_to_file(map_data, file_path):
     """Save map data to a file."""
     try:
-        with open(file_path, "w") as file:
-            for row in map_data:
-                file.write("".join(row) + "\n")
+        map_core.save_map_to_file(map_data, file_path)
     except Exception as e:
         messagebox.showerror("Error", f"Failed to save map: {e}")
 
 def validate_map_data(map_data):
-    """Validate the map data."""
-    rows = len(map_data)
-    cols = len(map_data[0])
-    player_count = 0
-    exit_count = 0
-    coin_count = 0
-
-    for y, row in enumerate(map_data):
-        if len(row) != cols:
-            return False, "All rows must have the same number of columns."
-        for x, cell in enumerate(row):
-            if y == 0 or y == rows - 1 or x == 0 or x == cols - 1:
-                if cell != '1':
-                    return False, "The map must be surrounded by walls."
-            if cell == 'P':
-                player_count += 1
-            elif cell == 'E':
-                exit_count += 1
-            elif cell == 'C':
-                coin_count += 1
-
-    if player_count != 1:
-        return False, "There must be exactly one player."
-    if exit_count != 1:
-        return False, "There must be exactly one exit."
-    if coin_count < 1:
-        return False, "There must be at least one coin."
-
-    return True, "The map is valid."
+    """Validate the map data, including that the player can reach the exit and every coin."""
+    return map_core.Reachability(map_data).status()
 
 def open_map_editor(map_data, file_path=None, root=None):
     """Open the map editor window."""
+    import ttkbootstrap as ttkb
+
     if map_data is None:
         messagebox.showerror("Error", "No map data to edit!")
         return
 
-    # Check if the map is not too large for the editor
-    if len(map_data) > 50 or len(map_data[0]) > 50:
-        messagebox.showerror("Error", "Map is too large for the editor!")
-        return
-
     editor_window = tk.Toplevel()
     editor_window.title("Map Editor")
 
-    cell_size = 30
     selected_tile = tk.StringVar(value='0')
 
     # Colors for different tiles
     color_map = {'P': 'midnightblue', 'E': 'firebrick', 'C': 'gold', '1': 'darkgray', '0': 'darkslategray'}
     tile_types = {'Player': 'P', 'Exit': 'E', 'Empty': '0', 'Coin': 'C', 'Wall': '1'}
 
-    # Canvas for map
-    canvas = tk.Canvas(editor_window, width=len(map_data[0]) * cell_size, height=len(map_data) * cell_size)
-    canvas.grid(row=0, column=1, rowspan=5, padx=10, pady=10)
-
+    # Zoom levels in pixels per cell. The canvas is at most max_view_size pixels and scrolls over the rest of the map.
+    zoom_levels = (8, 12, 16, 20, 30, 40)
+    cell_size = 30
+    max_view_size = (900, 700)
+
+    # Canvas for map, with scrollbars
+    canvas_frame = ttkb.Frame(editor_window)
+    canvas_frame.grid(row=0, column=1, rowspan=5, padx=10, pady=10, sticky="nsew")
+    canvas = tk.Canvas(canvas_frame, width=min(map_data.width * cell_size, max_view_size[0]),
+                       height=min(map_data.height * cell_size, max_view_size[1]), highlightthickness=0)
+    canvas.grid(row=0, column=0, sticky="nsew")
+    x_scrollbar = ttkb.Scrollbar(canvas_frame, orient=tk.HORIZONTAL, command=canvas.xview)
+    x_scrollbar.grid(row=1, column=0, sticky="ew")
+    y_scrollbar = ttkb.Scrollbar(canvas_frame, orient=tk.VERTICAL, command=canvas.yview)
+    y_scrollbar.grid(row=0, column=1, sticky="ns")
+    canvas_frame.rowconfigure(0, weight=1)
+    canvas_frame.columnconfigure(0, weight=1)
+    editor_window.columnconfigure(1, weight=1)
+    editor_window.rowconfigure(4, weight=1)
 
     def on_close_editor():
         """Handle closing the editor window."""
@@ -87,22 +68,201 @@ def open_map_editor(map_data, file_path=None, root=None):
 
     editor_window.protocol("WM_DELETE_WINDOW", on_close_editor)
 
+    # Canvas items only exist for the cells in view and a margin around them (cell index -> item).
+    # The rectangles of the cells scrolled out of view are hidden and reused for the cells scrolled
+    # into view, so the cost of scrolling and painting depends on the size of the view, not of the map.
+    # Each rectangle is tagged with its tile so all the cells of a tile can be recolored in one call,
+    # and tiles without a color get their character written over the cell.
+    view_margin = 2
+    view = [0, 0, 0, 0]  # x0, y0, x1, y1 of the cells that have items
+    cell_items = {}
+    free_items = []
+    text_items = {}
+    refresh_pending = False
+
+    # Cells the player can reach, updated at each painted cell. Coins and exit that cannot be
+    # reached are outlined in red, and the validity of the map is shown in the tools.
+    reachability = map_core.Reachability(map_data)
+    overlay_items = {}
+
+    def tile_tag(tile):
+        return f"tile{ord(tile)}"
+
+    def cell_bounds(index):
+        x, y = index % map_data.width, index // map_data.width
+        return x * cell_size, y * cell_size, (x + 1) * cell_size, (y + 1) * cell_size
+
+    def draw_cell_text(index):
+        """Write the character of a tile that has no color over its cell."""
+        if index not in text_items:
+            x0, y0, x1, y1 = cell_bounds(index)
+            text_items[index] = canvas.create_text(
+                (x0 + x1) / 2, (y0 + y1) / 2,
+                text=chr(map_data.cells[index]), fill='black', font=('Helvetica', max(6, cell_size // 3)), tags="label"
+            )
+
+    def show_cell(index):
+        """Give a cell that comes into view a rectangle, reusing a hidden one if possible."""
+        tile = chr(map_data.cells[index])
+        if free_items:
+            item = free_items.pop()
+            canvas.coords(item, *cell_bounds(index))
+            canvas.itemconfigure(item, fill=color_map.get(tile, 'white'), tags=tile_tag(tile), state=tk.NORMAL)
+        else:
+            item = canvas.create_rectangle(*cell_bounds(index), fill=color_map.get(tile, 'white'), outline="black", tags=tile_tag(tile))
+        cell_items[index] = item
+        if tile not in color_map:
+            draw_cell_text(index)
+        update_overlay_cell(index)
+
+    def hide_cell(index):
+        """Release the items of a cell that goes out of view."""
+        item = cell_items.pop(index)
+        canvas.itemconfigure(item, state=tk.HIDDEN, tags=())
+        free_items.append(item)
+        if index in text_items:
+            canvas.delete(text_items.pop(index))
+        if index in overlay_items:
+            canvas.delete(overlay_items.pop(index))
+
+    def refresh_view():
+        """Show the cells that came into view and release the ones that went out of view."""
+        nonlocal refresh_pending
+        refresh_pending = False
+        width, height = map_data.width, map_data.height
+        left, top = int(canvas.canvasx(0)), int(canvas.canvasy(0))
+        x0 = max(0, left // cell_size - view_margin)
+        y0 = max(0, top // cell_size - view_margin)
+        x1 = min(width, (left + canvas.winfo_width()) // cell_size + 1 + view_margin)
+        y1 = min(height, (top + canvas.winfo_height()) // cell_size + 1 + view_margin)
+        old_x0, old_y0, old_x1, old_y1 = view
+        if [x0, y0, x1, y1] == view:
+            return
+        for y in range(old_y0, old_y1):
+            for x in range(old_x0, old_x1):
+                if not (x0 <= x < x1 and y0 <= y < y1):
+                    hide_cell(y * width + x)
+        for y in range(y0, y1):
+            for x in range(x0, x1):
+                if not (old_x0 <= x < old_x1 and old_y0 <= y < old_y1):
+                    show_cell(y * width + x)
+        view[:] = x0, y0, x1, y1
+        # Reused rectangles may have been created after the texts and outlines
+        canvas.tag_raise("label")
+        canvas.tag_raise("unreachable")
+
+    def schedule_refresh(*args):
+        """Refresh the view once the pending scroll and resize events are handled."""
+        nonlocal refresh_pending
+        if not refresh_pending:
+            refresh_pending = True
+            canvas.after_idle(refresh_view)
+
+    def on_x_scroll(first, last):
+        x_scrollbar.set(first, last)
+        schedule_refresh()
+
+    def on_y_scroll(first, last):
+        y_scrollbar.set(first, last)
+        schedule_refresh()
+
+    canvas.configure(xscrollcommand=on_x_scroll, yscrollcommand=on_y_scroll)
+    canvas.bind("<Configure>", schedule_refresh)
+
     def draw_map():
-        """Draw the map on the canvas."""
+        """Draw the map on the canvas: all the items are dropped and created again for the cells in view."""
         canvas.delete("all")
-        for y, row in enumerate(map_data):
-            for x, cell in enumerate(row):
-                color = color_map.get(cell, 'white')
-                canvas.create_rectangle(
-                    x * cell_size, y * cell_size,
-                    (x + 1) * cell_size, (y + 1) * cell_size,
-                    fill=color, outline="black"
-                )
-                if color == 'white':
-                    canvas.create_text(
-                        x * cell_size + cell_size / 2, y * cell_size + cell_size / 2,
-                        text=cell, fill='black', font=('Helvetica', 10)
-                    )
+        cell_items.clear()
+        free_items.clear()
+        text_items.clear()
+        overlay_items.clear()
+        view[:] = 0, 0, 0, 0
+        canvas.configure(scrollregion=(0, 0, map_data.width * cell_size, map_data.height * cell_size),
+                         xscrollincrement=cell_size, yscrollincrement=cell_size)
+        refresh_view()
+        update_status()
+
+    def set_zoom(size):
+        """Change the size of the cells, keeping the cell at the center of the view in place."""
+        nonlocal cell_size
+        center_x = (canvas.canvasx(0) + canvas.winfo_width() / 2) / cell_size
+        center_y = (canvas.canvasy(0) + canvas.winfo_height() / 2) / cell_size
+        cell_size = size
+        draw_map()
+        canvas.xview_moveto(max(0, center_x * cell_size - canvas.winfo_width() / 2) / (map_data.width * cell_size))
+        canvas.yview_moveto(max(0, center_y * cell_size - canvas.winfo_height() / 2) / (map_data.height * cell_size))
+        zoom_label.configure(text=f"{cell_size} px")
+
+    def zoom(step):
+        """Go to the next (step=1) or previous (step=-1) zoom level."""
+        level = zoom_levels.index(cell_size) + step
+        if 0 <= level < len(zoom_levels):
+            set_zoom(zoom_levels[level])
+
+    def on_mouse_wheel(event):
+        """Scroll the map with the mouse wheel, horizontally with Shift, and zoom with Control."""
+        step = -1 if event.num == 4 or event.delta > 0 else 1
+        if event.state & 0x4:  # Control
+            zoom(-step)
+        elif event.state & 0x1:  # Shift
+            canvas.xview_scroll(step * 3, "units")
+        else:
+            canvas.yview_scroll(step * 3, "units")
+
+    canvas.bind("<MouseWheel>", on_mouse_wheel)  # Windows and macOS
+    canvas.bind("<Button-4>", on_mouse_wheel)  # Linux wheel up
+    canvas.bind("<Button-5>", on_mouse_wheel)  # Linux wheel down
+
+    def update_overlay_cell(index):
+        """Outline a coin or the exit in view if the player cannot reach it, remove the outline otherwise."""
+        unreachable = index in cell_items and map_data.cells[index] in (ord('C'), ord('E')) and not reachability.reached[index]
+        if unreachable and index not in overlay_items:
+            x0, y0, x1, y1 = cell_bounds(index)
+            inset = max(1, cell_size // 15)
+            overlay_items[index] = canvas.create_rectangle(
+                x0 + inset, y0 + inset, x1 - inset, y1 - inset,
+                outline="red", width=max(1, cell_size // 10), tags="unreachable"
+            )
+        elif not unreachable and index in overlay_items:
+            canvas.delete(overlay_items.pop(index))
+
+    def update_status():
+        is_valid, message = reachability.status()
+        status_label.configure(text=message, bootstyle="success" if is_valid else "danger")
+
+    def paint_cell(x, y, tile):
+        """Set a tile of the map and update the items of its cell only."""
+        if map_data[x, y] == tile:
+            return
+        index = y * map_data.width + x
+        changed = reachability.set_tile(index, tile)
+        item = cell_items.get(index)
+        if item is not None:
+            canvas.itemconfigure(item, fill=color_map.get(tile, 'white'), tags=tile_tag(tile))
+            if index in text_items:
+                canvas.delete(text_items.pop(index))
+            if tile not in color_map:
+                draw_cell_text(index)
+        # Only the outlines of the cells in view are updated, all of them if everything was explored again
+        if changed is None:
+            changed = list(cell_items)
+        else:
+            changed.append(index)
+        for index in changed:
+            update_overlay_cell(index)
+        update_status()
+
+    def redraw_tile(tile):
+        """Update the color of all the cells of a tile after its color was changed or removed."""
+        if tile in color_map:
+            canvas.itemconfigure(tile_tag(tile), fill=color_map[tile])
+            for index in [index for index in text_items if map_data.cells[index] == ord(tile)]:
+                canvas.delete(text_items.pop(index))
+        else:
+            canvas.itemconfigure(tile_tag(tile), fill='white')
+            for index in cell_items:
+                if map_data.cells[index] == ord(tile):
+                    draw_cell_text(index)
 
     # Global variable to track the dragging state left-click
     is_dragging_left = False
@@ -112,30 +272,27 @@ def open_map_editor(map_data, file_path=None, root=None):
     def on_canvas_click(event):
         """Handle clicks to change tile type."""
         global is_dragging_left, is_dragging_right
-        x, y = event.x // cell_size, event.y // cell_size
-        if is_locked.get() and (x == 0 or y == 0 or x == len(map_data[0]) - 1 or y == len(map_data) - 1):
+        x, y = int(canvas.canvasx(event.x)) // cell_size, int(canvas.canvasy(event.y)) // cell_size
+        if is_locked.get() and (x == 0 or y == 0 or x == map_data.width - 1 or y == map_data.height - 1):
             return  # Prevent editing of outer walls if locked
-        if 0 <= y < len(map_data) and 0 <= x < len(map_data[0]):
+        if 0 <= y < map_data.height and 0 <= x < map_data.width:
             if event.num == 1:  # Left click
-                map_data[y][x] = selected_tile.get()
+                paint_cell(x, y, selected_tile.get())
             elif event.num == 3:  # Right click
-                map_data[y][x] = '0'  # Set to EMPTY
-            draw_map()
+                paint_cell(x, y, '0')  # Set to EMPTY
             is_dragging_left = event.num == 1
             is_dragging_right = event.num == 3
 
     def on_canvas_motion(event):
         """Handle mouse movement to change tile type while dragging."""
         global is_dragging_left, is_dragging_right
-        x, y = event.x // cell_size, event.y // cell_size
-        if is_locked.get() and (x == 0 or y == 0 or x == len(map_data[0]) - 1 or y == len(map_data) - 1):
+        x, y = int(canvas.canvasx(event.x)) // cell_size, int(canvas.canvasy(event.y)) // cell_size
+        if is_locked.get() and (x == 0 or y == 0 or x == map_data.width - 1 or y == map_data.height - 1):
             return  # Prevent editing of outer walls if locked
-        if is_dragging_left and 0 <= y < len(map_data) and 0 <= x < len(map_data[0]):
-            map_data[y][x] = selected_tile.get()
-            draw_map()
-        elif is_dragging_right and 0 <= y < len(map_data) and 0 <= x < len(map_data[0]):
-            map_data[y][x] = '0'
-            draw_map()
+        if is_dragging_left and 0 <= y < map_data.height and 0 <= x < map_data.width:
+            paint_cell(x, y, selected_tile.get())
+        elif is_dragging_right and 0 <= y < map_data.height and 0 <= x < map_data.width:
+            paint_cell(x, y, '0')
 
     def on_canvas_release(event):
         """Stop the drag when mouse button is released."""
@@ -226,7 +383,7 @@ def open_map_editor(map_data, file_path=None, root=None):
                 editor_window.lift()
                 add_window.destroy()
                 update_tile_buttons_and_legend()
-                draw_map()
+                redraw_tile(char)
 
         # Window to add a new tile type
         add_window = tk.Toplevel(editor_window)
@@ -248,17 +405,16 @@ def open_map_editor(map_data, file_path=None, root=None):
         if color:
             color_map[type_name] = color
             update_tile_buttons_and_legend()
-            draw_map()
+            redraw_tile(type_name)
 
     def detect_unknown_tiles():
         """Detect unknown tiles in the map and add them dynamically."""
-        for row in map_data:
-            for cell in row:
-                if cell not in tile_types.values():
-                    # Add unknown character with a random color
-                    random_color = "#%06x" % random.randint(0, 0xFFFFFF)
-                    tile_types[f"Unknown ({cell})"] = cell
-                    color_map[cell] = random_color
+        for cell in sorted(map_data.tiles()):
+            if cell not in tile_types.values():
+                # Add unknown character with a random color
+                random_color = "#%06x" % random.randint(0, 0xFFFFFF)
+                tile_types[f"Unknown ({cell})"] = cell
+                color_map[cell] = random_color
         update_tile_buttons_and_legend()
 
     def delete_tile_type():
@@ -269,11 +425,12 @@ def open_map_editor(map_data, file_path=None, root=None):
                 del tile_types[label]
                 del color_map[value]
                 update_tile_buttons_and_legend()
+                redraw_tile(value)
                 return
 
     def validate_map():
         """Validate the current map."""
-        is_valid, message = validate_map_data(map_data)
+        is_valid, message = reachability.status()
         if is_valid:
             messagebox.showinfo("Validation", message)
         else:
@@ -287,14 +444,26 @@ def open_map_editor(map_data, file_path=None, root=None):
 
     ttkb.Label(tools_frame, text="Tools", font=("Helvetica", 12, "bold")).grid(row=0, column=2, padx=10, pady=5)
     ttkb.Button(tools_frame, text="Validate Map", command=validate_map, bootstyle="warning").grid(row=1, column=2, pady=5, padx=10)
+    status_label = ttkb.Label(tools_frame, text="", wraplength=150)
+    status_label.grid(row=2, column=2, pady=5, padx=10)
     ttkb.Button(tools_frame, text="Save Map", command=save_map, bootstyle="success").grid(row=3, column=2, pady=5, padx=10)
     ttkb.Button(tools_frame, text="Save Map As", command=save_map_as, bootstyle="success").grid(row=4, column=2, pady=5, padx=10)
 
+    # Zoom (also Control + mouse wheel)
+    zoom_frame = ttkb.Frame(tools_frame)
+    zoom_frame.grid(row=5, column=2, pady=5, padx=10)
+    ttkb.Button(zoom_frame, text="-", command=lambda: zoom(-1), bootstyle="secondary", width=2).grid(row=0, column=0)
+    zoom_label = ttkb.Label(zoom_frame, text=f"{cell_size} px", width=6, anchor="center")
+    zoom_label.grid(row=0, column=1, padx=5)
+    ttkb.Button(zoom_frame, text="+", command=lambda: zoom(1), bootstyle="secondary", width=2).grid(row=0, column=2)
+
     detect_unknown_tiles()
     draw_map()
 
 def help_button():
     """Open help window."""
+    from PIL import Image, ImageTk
+
     help_window = tk.Toplevel()
     help_window.title("Help")
 
@@ -315,6 +484,8 @@ def help_button():
 
 def main():
     """Main GUI application."""
+    import ttkbootstrap as ttkb
+
     root = ttkb.Window(themename="darkly")
     root.title("Map Editor")
     root.geometry("500x400")
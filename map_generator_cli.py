@@ -1,187 +1,454 @@
-import random
-from copy import deepcopy
 import argparse
+import json
 import os
+import sys
+import time
+
+from acceptance import INFEASIBLE_RATE, acceptance_rate, expected_attempts
+from map_cache import DEFAULT_CACHE_DIR, DEFAULT_CACHE_SIZE, MapCache
+from map_core import (ALGORITHMS, MIN_INNER_CELLS, VALID, RejectionStats, check_map_size, generate_attempts, generate_map_buffer,
+                      load_map_from_file, repair_map, save_map_to_file, search_difficulty, seed_generators)
 
 # ======================================================================================================================
-# Generate a valid map for the so_long game
+# FEASIBILITY AND BUDGET
 # ======================================================================================================================
 
-# Fonction pour générer une carte valide
-def generate_map(width, height, coin_rate, wall_rate):
+def choose_algorithm(width, height, coin_rate, wall_rate, algorithm="random", infeasible="fail"):
     """
-    Generates a 2D map for a game with specified dimensions and rates for coins and walls.
-    Args:
-        width (int): The width of the map.
-        height (int): The height of the map.
-        coin_rate (int): The percentage chance to place a coin in an empty space.
-        wall_rate (int): The percentage chance to place a wall in an empty space.
-    Returns:
-        list: A 2D list representing the generated map, where:
-            '1' represents a wall,
-            '0' represents an empty space,
-            'E' represents the exit,
-            'P' represents the player start position,
-            'C' represents a coin.
-    """
-    map_data = [['1' for _ in range(width)] for _ in range(height)]
-
-    for y in range(1, height - 1):
-        for x in range(1, width - 1):
-            map_data[y][x] = '0'
-
-    # Place exit and player randomly on the map
-    exit_placed = False
-    player_placed = False
-
-    while not exit_placed or not player_placed:
-        for y in range(1, height - 1):
-            for x in range(1, width - 1):
-                if map_data[y][x] == '0':
-                    if not exit_placed and random.random() < 0.05:
-                        map_data[y][x] = 'E'
-                        exit_placed = True
-                    elif not player_placed and random.random() < 0.05:
-                        map_data[y][x] = 'P'
-                        player_placed = True
-
-    # Place coins randomly based on coin_rate
-    coin_rate = int(coin_rate) / 100
-    for y in range(1, height - 1):
-        for x in range(1, width - 1):
-            if map_data[y][x] == '0' and random.random() < coin_rate:
-                map_data[y][x] = 'C'
-
-    # If coins haven't already taken all the space
-    # Place walls randomly based on wall_rate
-    wall_rate = int(wall_rate) / 100
-    for y in range(1, height - 1):
-        for x in range(1, width - 1):
-            if map_data[y][x] == '0' and random.random() < wall_rate:
-                map_data[y][x] = '1'
-
-    return map_data
-
-def flood_fill(map_data, x, y, visited, target):
-    """
-    Perform a flood fill algorithm to count the number of target cells in a 2D map.
+    Checks the estimated acceptance rate of the parameters before generating, so that parameters
+    for which almost no map is valid do not loop forever.
     Args:
-        map_data (list of list of str): The 2D map represented as a list of lists of strings.
-        x (int): The starting x-coordinate for the flood fill.
-        y (int): The starting y-coordinate for the flood fill.
-        visited (list of list of bool): A 2D list to keep track of visited cells.
-        target (str): The target character to count in the map.
+        algorithm (str): The requested algorithm.
+        infeasible (str): What to do with infeasible parameters: 'fail', 'constructive' (switch to the
+            constructive algorithm, always valid) or 'ignore' (generate anyway, see --max-attempts and --timeout).
     Returns:
-        int: The count of target cells found in the map.
+        str: The algorithm to use.
+    Raises:
+        ValueError: If the parameters are infeasible and infeasible is 'fail', or the map is too small to
+            ever be valid (whatever infeasible says, no algorithm can fill it).
     """
-    stack = [(x, y)]
-    count = 0
+    check_map_size(width, height)
+    rate = acceptance_rate(width, height, coin_rate, wall_rate, algorithm)
+    if rate is None or rate >= INFEASIBLE_RATE or infeasible == "ignore":
+        return algorithm
+    odds = f"about 1 map in {expected_attempts(rate):.0f} is valid" if rate > 0 else "almost no map is valid"
+    message = f"With a {width}x{height} map, {coin_rate}% coins and {wall_rate}% walls, {odds}"
+    if infeasible == "constructive":
+        print(f"Warning: {message}. Switching to the constructive algorithm.")
+        return "constructive"
+    raise ValueError(f"{message}, the generation would not end. Lower the wall percentage, use "
+                     f"'-a constructive' or '--infeasible constructive', or '--infeasible ignore' with --max-attempts or --timeout.")
 
-    while stack:
-        cx, cy = stack.pop()
-        if cx < 0 or cy < 0 or cy >= len(map_data) or cx >= len(map_data[0]):
-            continue
-        if visited[cy][cx] or map_data[cy][cx] == '1':
-            continue
+def budget_error(attempts, max_attempts=None, timeout=None):
+    """The TimeoutError raised once the attempts or the time allowed to find a valid map are used up."""
+    if max_attempts is not None and attempts >= max_attempts:
+        return TimeoutError(f"No valid map found in {attempts} attempts")
+    return TimeoutError(f"No valid map found in {timeout:g}s ({attempts} attempts)")
 
-        visited[cy][cx] = True
-        if map_data[cy][cx] == target:
-            count += 1
+# ======================================================================================================================
+# DIFFICULTY
+# ======================================================================================================================
 
-        stack.append((cx + 1, cy))
-        stack.append((cx - 1, cy))
-        stack.append((cx, cy + 1))
-        stack.append((cx, cy - 1))
+# Changes tried by search_difficulty on each map before giving up
+DEFAULT_SEARCH_STEPS = 5000
 
-    return count
+def difficulty_targets(min_exit_distance=0, min_route_length=0):
+    """The targets of search_difficulty set on the command line (an empty dict if there are none)."""
+    targets = {"exit_distance": min_exit_distance, "route_length": min_route_length}
+    return {measure: target for measure, target in targets.items() if target}
 
-def validate_map(map_data):
+def make_harder(map_data, targets, search_steps=DEFAULT_SEARCH_STEPS):
     """
-    Validates a game map to ensure it meets specific criteria.
-    Args:
-        map_data (list of list of str): The game map represented as a 2D list of strings.
+    Makes a valid map meet difficulty targets with search_difficulty.
     Returns:
-        bool: True if the map is valid, False otherwise.
-    The validation checks include:
-    - The map must be surrounded by walls ('1').
-    - The map must contain exactly one player ('P'), one exit ('E'), and at least one collectible ('C').
-    - All collectibles must be reachable from the player's starting position.
-    - The exit must be reachable from the player's starting position.
+        dict: The measures of the map.
+    Raises:
+        TimeoutError: If the targets were not met within search_steps changes.
     """
-    height = len(map_data)
-    width = len(map_data[0])
+    met, values, steps = search_difficulty(map_data, targets, search_steps)
+    if not met:
+        reached = ", ".join(f"{measure} {value}" for measure, value in values.items())
+        raise TimeoutError(f"The difficulty targets were not met in {steps} steps (reached {reached}), "
+                           f"lower them, use a larger map or more --search-steps")
+    return values
+
+def cache_label(algorithm, targets):
+    """The algorithm as written in cache keys: maps made harder are cached apart from the others."""
+    return algorithm + "".join(f"+{measure}={target}" for measure, target in sorted(targets.items())) if targets else algorithm
+
+# ======================================================================================================================
+# PROFILING
+# ======================================================================================================================
 
-    # Check if the map is surrounded by walls
-    if any(map_data[0][x] != '1' or map_data[-1][x] != '1' for x in range(width)):
-        return False
-    if any(row[0] != '1' or row[-1] != '1' for row in map_data):
-        return False
+class Profile:
+    """
+    Records where the time of a run goes: cumulative wall time and call count per phase (generate,
+    validate, save, ...), the attempts until a map was accepted, and the peak memory traced by
+    tracemalloc. tracemalloc slows down allocations, so the phase times of a profiled run are
+    higher than those of a normal run, but their proportions hold.
+    """
 
-    # Check for exactly one player, one exit, and at least one collectible
-    player_count = sum(row.count('P') for row in map_data)
-    exit_count = sum(row.count('E') for row in map_data)
-    collectible_count = sum(row.count('C') for row in map_data)
+    def __init__(self, trace_memory=True):
+        self.phases = {}
+        self.attempts = 0
+        self.accepted = False
+        self.rejections = RejectionStats()
+        self.trace_memory = trace_memory
+        self.peak_memory = None
+        self.start_time = self.end_time = None
 
-    if player_count != 1 or exit_count != 1 or collectible_count < 1:
-        return False
+    def start(self):
+        if self.trace_memory:
+            import tracemalloc
+            tracemalloc.start()
+        self.start_time = time.perf_counter()
 
-    # Check if all collectibles are reachable from the player's starting position
-    visited = [[False for _ in range(width)] for _ in range(height)]
-    player_pos = [(y, x) for y in range(height) for x in range(width) if map_data[y][x] == 'P'][0]
+    def stop(self):
+        self.end_time = time.perf_counter()
+        if self.trace_memory:
+            import tracemalloc
+            self.peak_memory = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
 
-    reachable_collectibles = flood_fill(deepcopy(map_data), player_pos[1], player_pos[0], visited, 'C')
-    if reachable_collectibles < collectible_count:
-        return False
+    def call(self, phase, function, *args):
+        """Calls function(*args) and adds its duration to phase. Returns what the function returns."""
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            record = self.phases.setdefault(phase, [0.0, 0])
+            record[0] += time.perf_counter() - start
+            record[1] += 1
 
-    # Check if the exit is reachable from the player's starting position
-    visited = [[False for _ in range(width)] for _ in range(height)]
-    exit_accessible = flood_fill(deepcopy(map_data), player_pos[1], player_pos[0], visited, 'E') > 0
+    def summary(self):
+        """The profile as a dict, as written by --profile-json."""
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        return {
+            "seconds": end - self.start_time,
+            "attempts": self.attempts,
+            "accepted": self.accepted,
+            "peak_memory_bytes": self.peak_memory,
+            "rejections": self.rejections.as_dict(),
+            "phases": {phase: {"seconds": seconds, "calls": calls, "mean_ms": seconds / calls * 1000}
+                       for phase, (seconds, calls) in self.phases.items()},
+        }
 
-    return exit_accessible
+    def report(self, file=sys.stdout):
+        """Prints the phases as a table, slowest first."""
+        summary = self.summary()
+        total = summary["seconds"]
+        print(f"Profile: {total:.3f}s, {self.attempts} attempt(s), " + ("map accepted" if self.accepted else "no map accepted")
+              + (f", peak traced memory {self.peak_memory / (1024 * 1024):.1f} MB" if self.peak_memory is not None else ""), file=file)
+        print(f"  {'phase':<10} {'calls':>8} {'total s':>10} {'mean ms':>10} {'share':>7}", file=file)
+        for phase, record in sorted(summary["phases"].items(), key=lambda item: -item[1]["seconds"]):
+            share = record["seconds"] / total if total > 0 else 0.0
+            print(f"  {phase:<10} {record['calls']:>8} {record['seconds']:>10.3f} {record['mean_ms']:>10.3f} {share:>7.1%}", file=file)
+
+def _call(phase, function, *args):
+    # Stands for Profile.call when the run is not profiled
+    return function(*args)
+
+def write_profile(profile, json_path=None):
+    """Prints the profile and writes its JSON summary to json_path ('-' for the standard output)."""
+    profile.report(sys.stderr if json_path == "-" else sys.stdout)
+    if json_path == "-":
+        print(json.dumps(profile.summary(), indent=1))
+    elif json_path:
+        with open(json_path, "w", encoding="utf-8") as file:
+            json.dump(profile.summary(), file, indent=1)
+            file.write("\n")
+        print(f"Profile saved to {json_path}")
+
+def write_rejections(rejections, path=None):
+    """Prints the rejection histogram and exports it to path (.csv or JSON)."""
+    print(f"Rejections: {rejections.report()}")
+    if path:
+        rejections.save(path)
+        print(f"Rejections saved to {path}")
 
 # ======================================================================================================================
-# SAVE MAP TO FILE
+# BATCH GENERATION
 # ======================================================================================================================
 
-def save_map_to_file(map_data, filename="maps/map.ber"):
-    # If path doesn't exist, create it
-    path = filename.split("/")[:-1]
-    path = "/".join(path)
-    if path:
-        os.makedirs(path, exist_ok=True)
+def generate_valid_map(width, height, coin_rate, wall_rate, algorithm="random", seed=None, max_attempts=None, timeout=None, stats=None,
+                       targets=None, search_steps=DEFAULT_SEARCH_STEPS, call=None, on_attempt=None):
+    """
+    Generates maps until one passes validate_map, with generate_attempts.
+    Args:
+        width (int): The width of the map.
+        height (int): The height of the map.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+        algorithm (str): The name of the generation algorithm in ALGORITHMS.
+        seed (int): Seed of the random generators, the same seed always gives the same map (default: random).
+        max_attempts (int): The maximum number of maps to generate (default: no limit).
+        timeout (float): The maximum time in seconds (default: no limit).
+        stats (RejectionStats): Records the outcome and the time of every attempt (default: not recorded).
+        targets (dict): Difficulty targets the valid map is then made to meet, see make_harder (default: none).
+        search_steps (int): The budget of make_harder.
+        call (callable), on_attempt (callable): Hooks run on every attempt, see generate_attempts.
+    Returns:
+        tuple: The valid map (Grid) and the number of attempts it took.
+    Raises:
+        TimeoutError: If no valid map was found within max_attempts or timeout, or the targets were not met.
+    """
+    if seed is not None:
+        seed_generators(seed)
+    attempts, map_data = generate_attempts(width, height, coin_rate, wall_rate, algorithm, max_attempts, timeout, stats, call, on_attempt)
+    if map_data is None:
+        raise budget_error(attempts, max_attempts, timeout)
+    if targets:
+        make_harder(map_data, targets, search_steps)
+    return map_data, attempts
 
-    with open(filename, "w") as file:
-        for row in map_data:
-            file.write("".join(row) + "\n")
+def batch_map_name(out_dir, index, count):
+    """Stable file name of the index-th map of a batch (map_0000.ber, map_0001.ber, ...)."""
+    digits = max(4, len(str(count - 1)))
+    return os.path.join(out_dir, f"map_{index:0{digits}d}.ber")
 
+def _seed_worker():
+    # Forked workers inherit the parent's random state, reseed so they don't produce the same maps
+    seed_generators()
+
+def save_valid_map(path, width, height, coin_rate, wall_rate, algorithm="random", seed=None, cache=None, max_attempts=None, timeout=None,
+                   stats=None, targets=None, search_steps=DEFAULT_SEARCH_STEPS):
+    """
+    Generates a valid map and saves it to path. A seeded map is copied from the cache when its
+    configuration was already generated, and added to the cache otherwise.
+    Args:
+        seed (int): Seed of the random generators (default: random, the cache is not used).
+        cache (MapCache): The cache of seeded maps (default: no cache).
+        max_attempts (int), timeout (float): The budget of the map, see generate_valid_map.
+        stats (RejectionStats): Records the outcome of every attempt (default: not recorded).
+        targets (dict), search_steps (int): The difficulty of the map, see generate_valid_map.
+    Returns:
+        tuple: The number of attempts it took (0 on a cache hit) and whether it was a cache hit.
+    """
+    key = cache.key(cache_label(algorithm, targets), width, height, coin_rate, wall_rate, seed) if cache and seed is not None else None
+    if key and cache.fetch(key, path):
+        return 0, True
+    map_data, attempts = generate_valid_map(width, height, coin_rate, wall_rate, algorithm, seed, max_attempts, timeout, stats,
+                                            targets, search_steps)
+    save_map_to_file(map_data, path)
+    if key:
+        cache.store(key, path)
+    return attempts, False
+
+def _batch_job(job):
+    (index, count, width, height, coin_rate, wall_rate, algorithm, out_dir, seed, cache, max_attempts, timeout, record,
+     targets, search_steps) = job
+    # Map i of a seeded batch is the map of seed + i, so any map of a batch can be regenerated alone
+    map_seed = seed + index if seed is not None else None
+    stats = RejectionStats() if record else None
+    if out_dir is None:
+        # Packed batch: the tiles go back to the parent, which appends them to the pack in order
+        map_data, attempts = generate_valid_map(width, height, coin_rate, wall_rate, algorithm, map_seed, max_attempts, timeout, stats,
+                                                targets, search_steps)
+        return attempts, False, stats, bytes(map_data.cells)
+    # The worker writes the map itself so only the attempt count (and the rejections) travel back to the parent
+    attempts, hit = save_valid_map(batch_map_name(out_dir, index, count), width, height, coin_rate, wall_rate, algorithm, map_seed,
+                                   cache, max_attempts, timeout, stats, targets, search_steps)
+    return attempts, hit, stats, None
+
+def batch_main(count, jobs=None, width=20, height=10, coin_rate="10", wall_rate="10", out_dir="maps", algorithm="random",
+               seed=None, cache=None, max_attempts=None, timeout=None, rejections=None, pack=None, append=False, targets=None,
+               search_steps=DEFAULT_SEARCH_STEPS):
+    """
+    Generates count valid maps over a pool of jobs processes and saves them in out_dir, or in a pack.
+    Args:
+        count (int): The number of maps to generate.
+        jobs (int): The number of worker processes (default: number of CPUs).
+        out_dir (str): The directory where the maps are saved as map_0000.ber, map_0001.ber, ...
+        algorithm (str): The name of the generation algorithm in ALGORITHMS.
+        seed (int): Seed of the first map, map i uses seed + i (default: random).
+        cache (MapCache): The cache of seeded maps (default: no cache).
+        max_attempts (int), timeout (float): The budget of each map, see generate_valid_map.
+        rejections (RejectionStats): Receives the outcomes of the attempts of all the maps (default: not recorded).
+        pack (str): Save the maps in this pack (see map_pack.py) instead of out_dir, map i has id i. The cache is not used.
+        append (bool): Add the maps after those of an existing pack, map i then has id i + the number of maps already there.
+        targets (dict), search_steps (int): The difficulty of each map, see generate_valid_map.
+    Returns:
+        dict: The number of maps, the total number of attempts, the number of cache hits, the elapsed time and the maps per second.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    writer = None
+    if pack:
+        from map_pack import MapPackWriter
+        writer = MapPackWriter(pack, append)
+        out_dir, cache = None, None
+    else:
+        os.makedirs(out_dir, exist_ok=True)
+    tasks = [(i, count, width, height, coin_rate, wall_rate, algorithm, out_dir, seed, cache, max_attempts, timeout, rejections is not None,
+              targets, search_steps) for i in range(count)]
+
+    start = time.perf_counter()
+    total_attempts = hits = 0
+    pool = None
+    try:
+        if jobs == 1:
+            results = map(_batch_job, tasks)
+        else:
+            # Imported here, multiprocessing is not needed to generate a single map
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(max_workers=jobs, initializer=_seed_worker)
+            # Several maps per task amortize the IPC cost on small maps, the pool stays busy on large ones
+            results = pool.map(_batch_job, tasks, chunksize=max(1, count // (jobs * 8)))
+        # The results come in the order of the maps, packed maps are written as they arrive
+        for index, (attempts, hit, map_stats, cells) in enumerate(results):
+            total_attempts += attempts
+            hits += hit
+            if rejections is not None and map_stats is not None:
+                rejections.merge(map_stats)
+            if writer is not None:
+                writer.add_cells(width, height, cells, coin_rate, wall_rate, algorithm, seed + index if seed is not None else None)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+        if writer is not None:
+            writer.close()
+    elapsed = time.perf_counter() - start
+
+    stats = {
+        "maps": count,
+        "attempts": total_attempts,
+        "cache_hits": hits,
+        "seconds": elapsed,
+        "maps_per_second": count / elapsed if elapsed > 0 else float("inf"),
+    }
+    generated = count - hits
+    attempts_per_map = f"{total_attempts / generated:.1f} attempts/map" if generated else "no map generated"
+    print(f"{count} maps generated in {pack or out_dir} with {jobs} job(s) ({algorithm}): "
+          f"{elapsed:.2f}s, {stats['maps_per_second']:.1f} maps/s, {attempts_per_map}"
+          + (f", {hits} cache hit(s)" if cache and seed is not None else ""))
+    return stats
 
 # ======================================================================================================================
-# MAIN FUNCTION
+# LARGE MAPS
 # ======================================================================================================================
 
-def main(width=20, height=10, coin_rate="10", wall_rate="10", path="maps/map.ber"):
+# Maximum width and height of a map in large-map mode
+LARGE_MAP_LIMIT = 10000
+
+def main_large(width=1000, height=1000, coin_rate="10", wall_rate="10", path="maps/map.ber", seed=None, cache=None, profile=None,
+               verbose=False):
+    """
+    Generates a large map with generate_map_buffer and saves it. Instead of generating new maps
+    until one is valid, which would almost never end on large maps, the map is repaired in place
+    (a valid map is left unchanged), so the reachable area is only explored once.
+    """
+    timed = profile.call if profile else _call
+    key = cache.key("large", width, height, coin_rate, wall_rate, seed) if cache and seed is not None else None
+    if key and timed("cache", cache.fetch, key, path):
+        if profile:
+            profile.accepted = True
+        print(f"Map loaded from the cache and saved to {path}")
+        return
+    if seed is not None:
+        seed_generators(seed)
+    attempts = 0
     while True:
-        map_data = generate_map(width, height, coin_rate, wall_rate)
-        if validate_map(map_data):
-            save_map_to_file(map_data, path)
-            print("Map generated and saved to map.ber")
+        attempts += 1
+        if profile:
+            profile.attempts = attempts
+        map_data = timed("generate", generate_map_buffer, width, height, coin_rate, wall_rate)
+        if timed("repair", repair_map, map_data):
             break
-        else:
-            print("Error: The generated map is invalid. Generating a new map...")
+        if verbose:
+            print("Error: The player cannot reach anything. Generating a new map...")
+    timed("save", save_map_to_file, map_data, path)
+    if key:
+        timed("cache", cache.store, key, path)
+    if profile:
+        profile.accepted = True
+    print(f"Map generated and saved to {path}" + (f" after {attempts} attempts" if attempts > 1 else ""))
+
+# ======================================================================================================================
+# MAIN FUNCTION
+# ======================================================================================================================
+
+def main(width=20, height=10, coin_rate="10", wall_rate="10", path="maps/map.ber", algorithm="random", seed=None, cache=None,
+         max_attempts=None, timeout=None, profile=None, verbose=False, rejections=None, targets=None, search_steps=DEFAULT_SEARCH_STEPS):
+    """
+    Generates maps until one is valid and saves it to path.
+    Args:
+        profile (Profile): Records the time of each phase, the attempts and their rejection reasons (default: not profiled).
+        rejections (RejectionStats): Records the outcome and the time of every attempt (default: the profile's, if any).
+        verbose (bool): Print a line for every invalid map. Off by default, printing slows down the loop.
+        targets (dict): Difficulty targets the valid map is then made to meet, see make_harder (default: none).
+        search_steps (int): The budget of make_harder.
+    """
+    timed = profile.call if profile else _call
+    if rejections is None and profile:
+        rejections = profile.rejections
+    key = cache.key(cache_label(algorithm, targets), width, height, coin_rate, wall_rate, seed) if cache and seed is not None else None
+    if key and timed("cache", cache.fetch, key, path):
+        if profile:
+            profile.accepted = True
+        print(f"Map loaded from the cache and saved to {path}")
+        return
+
+    def attempted(attempt, reason):
+        if profile:
+            profile.attempts = attempt
+        if verbose and reason != VALID:
+            print(f"Error: The generated map is invalid ({reason}). Generating a new map...")
+
+    map_data, attempts = generate_valid_map(width, height, coin_rate, wall_rate, algorithm, seed, max_attempts, timeout, rejections,
+                                            call=timed, on_attempt=attempted)
+    difficulty = timed("difficulty", make_harder, map_data, targets, search_steps) if targets else None
+    timed("save", save_map_to_file, map_data, path)
+    if key:
+        timed("cache", cache.store, key, path)
+    if profile:
+        profile.accepted = True
+    print(f"Map generated and saved to {path} after {attempts} attempt(s)"
+          + (" (" + ", ".join(f"{measure} {value}" for measure, value in difficulty.items()) + ")" if difficulty else ""))
 
 def check_invalid_args(args):
     if args.width < 3:
         raise argparse.ArgumentTypeError("Width must be greater than or equal to 3")
     if args.height < 3:
         raise argparse.ArgumentTypeError("Height must be greater than or equal to 3")
-    if args.width > 150:
-        raise argparse.ArgumentTypeError("Width must be less than or equal to 150, otherwise the map is too large")
-    if args.height > 150:
-        raise argparse.ArgumentTypeError("Height must be less than or equal to 150, otherwise the map is too large")
+    if (args.width - 2) * (args.height - 2) < MIN_INNER_CELLS:
+        raise argparse.ArgumentTypeError(f"A {args.width}x{args.height} map is too small, the inside of its walls must hold at least "
+                                         f"{MIN_INNER_CELLS} tiles (a player, an exit and a coin)")
+    limit = LARGE_MAP_LIMIT if args.large else 150
+    if args.width > limit:
+        raise argparse.ArgumentTypeError(f"Width must be less than or equal to {limit}, otherwise the map is too large")
+    if args.height > limit:
+        raise argparse.ArgumentTypeError(f"Height must be less than or equal to {limit}, otherwise the map is too large")
     if (int(args.coins) < 0 or int(args.coins) > 100):
         raise argparse.ArgumentTypeError("Coin percentage must be between 0 and 100")
     if int(args.walls) < 0 or int(args.walls) > 99:
         raise argparse.ArgumentTypeError("Wall percentage must be between 0 and 99, 100 is not allowed")
+    if args.count < 1:
+        raise argparse.ArgumentTypeError("Count must be greater than or equal to 1")
+    if args.jobs is not None and args.jobs < 1:
+        raise argparse.ArgumentTypeError("Jobs must be greater than or equal to 1")
+    if args.large and (args.count > 1 or args.out_dir):
+        raise argparse.ArgumentTypeError("Large-map mode generates a single map, it cannot be used with batch mode")
+    if args.seed is not None and args.seed < 0:
+        raise argparse.ArgumentTypeError("Seed must be greater than or equal to 0")
+    if args.cache_size < 0:
+        raise argparse.ArgumentTypeError("Cache size must be greater than or equal to 0")
+    if args.max_attempts is not None and args.max_attempts < 1:
+        raise argparse.ArgumentTypeError("Max attempts must be greater than or equal to 1")
+    if args.timeout is not None and args.timeout <= 0:
+        raise argparse.ArgumentTypeError("Timeout must be greater than 0")
+    if args.min_exit_distance < 0 or args.min_route_length < 0 or args.search_steps < 1:
+        raise argparse.ArgumentTypeError("Difficulty targets must be positive and search steps at least 1")
+    if (args.min_exit_distance or args.min_route_length) and args.large:
+        raise argparse.ArgumentTypeError("Difficulty targets cannot be used in large-map mode")
+    if args.pack and (args.large or args.out_dir):
+        raise argparse.ArgumentTypeError("A pack is written by batch mode, it cannot be used with large-map mode or an output directory")
+    if args.append and not args.pack:
+        raise argparse.ArgumentTypeError("--append adds maps to a pack, it needs --pack")
+    if args.solve and (args.large or args.count > 1 or args.out_dir or args.pack):
+        raise argparse.ArgumentTypeError("--solve works on a single map, it cannot be used with large-map or batch mode")
+    if (args.rejections or args.rejections_out) and args.large:
+        raise argparse.ArgumentTypeError("Large-map mode repairs maps instead of rejecting them, it has no rejections to report")
+    if (args.profile or args.profile_json or args.cprofile) and (args.count > 1 or args.out_dir or args.pack):
+        raise argparse.ArgumentTypeError("Profiling is for a single map, the maps of batch mode are generated in worker processes")
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Map generator for the so_long game.")
@@ -190,6 +457,31 @@ if __name__ == "__main__":
     parser.add_argument("-c", "--coins", type=str, default="10", help="Percentage or 'all' for coins (default: 10)")
     parser.add_argument("-w", "--walls", type=str, default="10", help="Percentage of walls (default: 10)")
     parser.add_argument("-p", "--path", type=str, default="maps/map.ber", help="Path to the save file (default: maps/map.ber)")
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="random", help="Generation algorithm: 'random' retries until the map is valid, 'constructive' is always valid, "
+                        "'numpy' draws the same maps as 'random' with vectorized NumPy code, faster on large maps (needs numpy) (default: random)")
+    parser.add_argument("-n", "--count", type=int, default=1, help="Number of maps to generate in batch mode (default: 1)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes for batch mode (default: number of CPUs)")
+    parser.add_argument("-o", "--out-dir", type=str, default=None, help="Output directory for batch mode (default: maps)")
+    parser.add_argument("--pack", type=str, default=None, help="Batch mode: save the maps in a single pack file instead of one .ber file each (see map_pack.py)")
+    parser.add_argument("--append", action="store_true", help="Add the maps to an existing pack instead of replacing it")
+    parser.add_argument("-L", "--large", action="store_true", help=f"Large-map mode: up to {LARGE_MAP_LIMIT}x{LARGE_MAP_LIMIT}, one byte per cell")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Seed of the generation, the same seed and options give the same map (default: random)")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_CACHE_DIR, help=f"Directory of the cache of seeded maps (default: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--cache-size", type=int, default=DEFAULT_CACHE_SIZE // (1024 * 1024), help="Maximum size of the cache in MB, the least recently used maps are deleted (default: %(default)s)")
+    parser.add_argument("--no-cache", action="store_true", help="Always generate seeded maps instead of reading them from the cache")
+    parser.add_argument("--min-exit-distance", type=int, default=0, help="Make each map harder until the shortest path from the player to the exit is at least this long")
+    parser.add_argument("--min-route-length", type=int, default=0, help="Make each map harder until collecting every coin then exiting takes at least this many steps")
+    parser.add_argument("--search-steps", type=int, default=DEFAULT_SEARCH_STEPS, help=f"Changes tried per map to reach the difficulty targets (default: {DEFAULT_SEARCH_STEPS})")
+    parser.add_argument("--solve", action="store_true", help="Print the minimum number of moves to collect every coin and reach the exit of the map (see map_solver.py)")
+    parser.add_argument("--infeasible", choices=("fail", "constructive", "ignore"), default="fail", help="When almost no map is valid with the parameters: fail, switch to the constructive algorithm, or generate anyway (default: fail)")
+    parser.add_argument("--max-attempts", type=int, default=None, help="Give up after this many invalid maps, per map (default: no limit)")
+    parser.add_argument("--timeout", type=float, default=None, help="Give up after this many seconds, per map (default: no limit)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print a line for every invalid map, with the reason it was rejected")
+    parser.add_argument("--rejections", action="store_true", help="Print how many attempts were rejected for each reason and the time they took")
+    parser.add_argument("--rejections-out", type=str, default=None, help="Export the rejection histogram to this file (.csv, JSON otherwise), implies --rejections")
+    parser.add_argument("--profile", action="store_true", help="Print the time and calls of each phase, the attempts and the peak memory")
+    parser.add_argument("--profile-json", type=str, default=None, help="Save the profile as JSON to this file ('-' for the standard output), implies --profile")
+    parser.add_argument("--cprofile", type=str, default=None, help="Run under cProfile and dump the statistics to this .prof file, implies --profile")
     args = parser.parse_args()
 
     try:
@@ -199,5 +491,50 @@ if __name__ == "__main__":
         parser.print_help()
         print("Generating a default map instead in maps/map.ber.")
         main()
+        raise SystemExit(1)
 
-    main(width=args.width, height=args.height, coin_rate=args.coins, wall_rate=args.walls, path=args.path)
\ No newline at end of file
+    cache = None if args.no_cache else MapCache(args.cache_dir, args.cache_size * 1024 * 1024)
+    targets = difficulty_targets(args.min_exit_distance, args.min_route_length)
+    profile = Profile() if args.profile or args.profile_json or args.cprofile else None
+    rejections = (profile.rejections if profile else RejectionStats()) if args.rejections or args.rejections_out else None
+    profiler = None
+    if profile:
+        profile.start()
+    if args.cprofile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        if args.large:
+            main_large(width=args.width, height=args.height, coin_rate=args.coins, wall_rate=args.walls, path=args.path,
+                       seed=args.seed, cache=cache, profile=profile, verbose=args.verbose)
+        elif args.count > 1 or args.out_dir or args.pack:
+            algorithm = choose_algorithm(args.width, args.height, args.coins, args.walls, args.algorithm, args.infeasible)
+            batch_main(args.count, jobs=args.jobs, width=args.width, height=args.height,
+                       coin_rate=args.coins, wall_rate=args.walls, out_dir=args.out_dir or "maps", algorithm=algorithm,
+                       seed=args.seed, cache=cache, max_attempts=args.max_attempts, timeout=args.timeout, rejections=rejections,
+                       pack=args.pack, append=args.append, targets=targets, search_steps=args.search_steps)
+        else:
+            algorithm = choose_algorithm(args.width, args.height, args.coins, args.walls, args.algorithm, args.infeasible)
+            main(width=args.width, height=args.height, coin_rate=args.coins, wall_rate=args.walls, path=args.path, algorithm=algorithm,
+                 seed=args.seed, cache=cache, max_attempts=args.max_attempts, timeout=args.timeout, profile=profile, verbose=args.verbose,
+                 rejections=rejections, targets=targets, search_steps=args.search_steps)
+            if args.solve:
+                from map_solver import describe, solve_map
+                # The matrices live next to the maps, in the same cache directory and under the same size limit
+                matrices = None if args.no_cache else MapCache(os.path.join(args.cache_dir, "matrices"), args.cache_size * 1024 * 1024,
+                                                               suffix=".dist")
+                print(f"Shortest route: {describe(solve_map(load_map_from_file(args.path), cache=matrices))}")
+    except (ValueError, TimeoutError) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.cprofile)
+            print(f"cProfile statistics saved to {args.cprofile} (python -m pstats {args.cprofile})")
+        if profile:
+            profile.stop()
+            write_profile(profile, args.profile_json)
+        if rejections is not None:
+            write_rejections(rejections, args.rejections_out)
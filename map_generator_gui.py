@@ -1,172 +1,182 @@
-import random
-from copy import deepcopy
+from collections import OrderedDict
+import hashlib
+import os
+import threading
+import time
 import tkinter as tk
 from tkinter import filedialog, messagebox
-import ttkbootstrap as ttkb
-from map_editor import open_map_editor
+from acceptance import INFEASIBLE_RATE, acceptance_rate, expected_attempts
+from map_core import ALGORITHMS, COIN, EMPTY, WALL, RejectionStats, generate_attempts, save_map_to_file, seed_generators
+
+# ttkbootstrap is imported when the window is created, PIL when a map is shown and the editor when
+# "Edit Map" is clicked, so importing this file stays fast and needs no display
 
 # ======================================================================================================================
-# Generate a valid map for the so_long game
+# BACKGROUND GENERATION
 # ======================================================================================================================
 
-# Fonction pour générer une carte valide
-def generate_map(width, height, coin_rate, wall_rate):
-	"""
-	Generates a 2D map for a game with specified dimensions and rates for coins and walls.
-	Args:
-		width (int): The width of the map.
-		height (int): The height of the map.
-		coin_rate (int): The percentage chance to place a coin in an empty space.
-		wall_rate (int): The percentage chance to place a wall in an empty space.
-	Returns:
-		list: A 2D list representing the generated map, where:
-			'1' represents a wall,
-			'0' represents an empty space,
-			'E' represents the exit,
-			'P' represents the player start position,
-			'C' represents a coin.
-	"""
-	map_data = [['1' for _ in range(width)] for _ in range(height)]
-
-	for y in range(1, height - 1):
-		for x in range(1, width - 1):
-			map_data[y][x] = '0'
-
-	# Place exit and player randomly on the map
-	exit_placed = False
-	player_placed = False
-
-	while not exit_placed or not player_placed:
-		for y in range(1, height - 1):
-			for x in range(1, width - 1):
-				if map_data[y][x] == '0':
-					if not exit_placed and random.random() < 0.05:
-						map_data[y][x] = 'E'
-						exit_placed = True
-					elif not player_placed and random.random() < 0.05:
-						map_data[y][x] = 'P'
-						player_placed = True
-
-	# Place coins randomly based on coin_rate
-	coin_rate = int(coin_rate) / 100
-	for y in range(1, height - 1):
-		for x in range(1, width - 1):
-			if map_data[y][x] == '0' and random.random() < coin_rate:
-				map_data[y][x] = 'C'
-
-	# If coins haven't already taken all the space
-	# Place walls randomly based on wall_rate
-	wall_rate = int(wall_rate) / 100
-	for y in range(1, height - 1):
-		for x in range(1, width - 1):
-			if map_data[y][x] == '0' and random.random() < wall_rate:
-				map_data[y][x] = '1'
-
-	return map_data
-
-def flood_fill(map_data, x, y, visited, target):
-	"""
-	Perform a flood fill algorithm to count the number of target cells in a 2D map.
-	Args:
-		map_data (list of list of str): The 2D map represented as a list of lists of strings.
-		x (int): The starting x-coordinate for the flood fill.
-		y (int): The starting y-coordinate for the flood fill.
-		visited (list of list of bool): A 2D list to keep track of visited cells.
-		target (str): The target character to count in the map.
-	Returns:
-		int: The count of target cells found in the map.
-	"""
-	stack = [(x, y)]
-	count = 0
-
-	while stack:
-		cx, cy = stack.pop()
-		if cx < 0 or cy < 0 or cy >= len(map_data) or cx >= len(map_data[0]):
-			continue
-		if visited[cy][cx] or map_data[cy][cx] == '1':
-			continue
+# Maps with at least this many cells are generated on all the cores
+PARALLEL_GENERATION_CELLS = 64 * 64
 
-		visited[cy][cx] = True
-		if map_data[cy][cx] == target:
-			count += 1
+# Length of one chunk of attempts: the longest wait after Cancel is clicked
+GENERATION_CHUNK_SECONDS = 0.1
 
-		stack.append((cx + 1, cy))
-		stack.append((cx - 1, cy))
-		stack.append((cx, cy + 1))
-		stack.append((cx, cy - 1))
+# Interval between two updates of the progress in the interface
+GENERATION_POLL_MS = 100
 
-	return count
+def _generate_chunk(width, height, coin_rate, wall_rate, algorithm, max_attempts, max_seconds):
+	""" One chunk of attempts, with the reasons its maps were rejected (sent back from worker processes) """
+	stats = RejectionStats()
+	attempts, map_data = generate_attempts(width, height, coin_rate, wall_rate, algorithm, max_attempts, max_seconds, stats)
+	return attempts, map_data, stats
 
-def validate_map(map_data):
+class BackgroundGeneration:
 	"""
-	Validates a game map to ensure it meets specific criteria.
-	Args:
-		map_data (list of list of str): The game map represented as a 2D list of strings.
-	Returns:
-		bool: True if the map is valid, False otherwise.
-	The validation checks include:
-	- The map must be surrounded by walls ('1').
-	- The map must contain exactly one player ('P'), one exit ('E'), and at least one collectible ('C').
-	- All collectibles must be reachable from the player's starting position.
-	- The exit must be reachable from the player's starting position.
+	Generates maps until one is valid in a background thread, so the window stays responsive.
+	The attempts run in short chunks (_generate_chunk), in the thread itself or in a pool of
+	processes that always has one chunk per process in flight. Cancelling stops between two chunks.
+	The interface reads attempts, elapsed, map_data and done from its main loop (with after()),
+	the thread never touches Tk. rejections holds the reasons the maps were rejected, read it once done.
 	"""
-	height = len(map_data)
-	width = len(map_data[0])
 
-	# Check if the map is surrounded by walls
-	if any(map_data[0][x] != '1' or map_data[-1][x] != '1' for x in range(width)):
-		return False
-	if any(row[0] != '1' or row[-1] != '1' for row in map_data):
-		return False
-
-	# Check for exactly one player, one exit, and at least one collectible
-	player_count = sum(row.count('P') for row in map_data)
-	exit_count = sum(row.count('E') for row in map_data)
-	collectible_count = sum(row.count('C') for row in map_data)
-
-	if player_count != 1 or exit_count != 1 or collectible_count < 1:
-		return False
-
-	# Check if all collectibles are reachable from the player's starting position
-	visited = [[False for _ in range(width)] for _ in range(height)]
-	player_pos = [(y, x) for y in range(height) for x in range(width) if map_data[y][x] == 'P'][0]
-
-	reachable_collectibles = flood_fill(deepcopy(map_data), player_pos[1], player_pos[0], visited, 'C')
-	if reachable_collectibles < collectible_count:
-		return False
-
-	# Check if the exit is reachable from the player's starting position
-	visited = [[False for _ in range(width)] for _ in range(height)]
-	exit_accessible = flood_fill(deepcopy(map_data), player_pos[1], player_pos[0], visited, 'E') > 0
-
-	return exit_accessible
+	def __init__(self, width, height, coin_rate, wall_rate, algorithm="random", max_attempts=5000, jobs=1):
+		self.args = (width, height, coin_rate, wall_rate, algorithm)
+		self.max_attempts = max_attempts
+		self.jobs = jobs
+		self.attempts = 0
+		self.rejections = RejectionStats()
+		self.map_data = None
+		self.error = None
+		self.done = False
+		self._cancel = threading.Event()
+		self._start = None
+		self._end = None
+		self._thread = threading.Thread(target=self._run, daemon=True)
+
+	@property
+	def cancelled(self):
+		return self._cancel.is_set()
+
+	@property
+	def elapsed(self):
+		"""Seconds since the generation started, until it ended."""
+		if self._start is None:
+			return 0.0
+		return (self._end or time.perf_counter()) - self._start
+
+	@property
+	def attempts_per_second(self):
+		elapsed = self.elapsed
+		return self.attempts / elapsed if elapsed > 0 else 0.0
+
+	def start(self):
+		self._start = time.perf_counter()
+		self._thread.start()
+		return self
+
+	def cancel(self):
+		self._cancel.set()
+
+	def _run(self):
+		try:
+			if self.jobs > 1:
+				self._run_pool()
+			else:
+				while not self.done_searching():
+					self._add(*_generate_chunk(*self.args, self.max_attempts - self.attempts, GENERATION_CHUNK_SECONDS))
+		except Exception as e:
+			self.error = e
+		finally:
+			self._end = time.perf_counter()
+			self.done = True
+
+	def _run_pool(self):
+		import multiprocessing
+		from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+		# Spawned, not forked: a fork of this thread would copy the Tk state and the locks held by the other threads
+		context = multiprocessing.get_context("spawn")
+		with ProcessPoolExecutor(max_workers=self.jobs, mp_context=context, initializer=seed_generators) as pool:
+			pending = set()
+			while True:
+				# Keep one chunk per process in flight, without going over the maximum number of attempts
+				while not self.done_searching() and len(pending) < self.jobs:
+					pending.add(pool.submit(_generate_chunk, *self.args, self.max_attempts - self.attempts, GENERATION_CHUNK_SECONDS))
+				if not pending:
+					break
+				finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+				for future in finished:
+					self._add(*future.result())
+				if self.map_data is not None or self.cancelled:
+					for future in pending:
+						future.cancel()
+					break
+
+	def done_searching(self):
+		return self.map_data is not None or self.cancelled or self.attempts >= self.max_attempts
+
+	def _add(self, attempts, map_data, stats):
+		self.attempts = min(self.attempts + attempts, self.max_attempts)
+		self.rejections.merge(stats)
+		if map_data is not None and self.map_data is None:
+			self.map_data = map_data
 
 # ======================================================================================================================
-# SAVE MAP TO FILE
+# INTERFACE GRAPH
 # ======================================================================================================================
 
-def save_map_to_file(map_data, filename="maps/map.ber"):
-	with open(filename, "w") as file:
-		for row in map_data:
-			file.write("".join(row) + "\n")
+# Zoom levels of the map visualization in pixels per cell, and the largest image it renders
+VISUALIZATION_ZOOM_LEVELS = (2, 4, 8, 12, 20, 30)
+VISUALIZATION_MAX_IMAGE_SIZE = 4500
 
+# Images shown by show_map_in_new_window, reused when the same map is shown again at the same zoom
+_MAP_IMAGE_CACHE_SIZE = 8
+_map_images = OrderedDict()
 
-# ======================================================================================================================
-# INTERFACE GRAPH
-# ======================================================================================================================
+def map_image(map_data, cell_size):
+	"""
+	Render a map to a Tk image, or reuse the image rendered earlier for the same tiles and zoom.
+	Args:
+		map_data (Grid): The map.
+		cell_size (int): The size of a cell in pixels.
+	Returns:
+		ImageTk.PhotoImage: The image of the map.
+	"""
+	from PIL import ImageTk
+	from map_render import render_map
+
+	key = (hashlib.blake2b(map_data.cells, digest_size=16).digest(), map_data.width, cell_size)
+	image = _map_images.get(key)
+	if image is None:
+		image = ImageTk.PhotoImage(render_map(map_data, cell_size, outline="black"))
+		_map_images[key] = image
+		if len(_map_images) > _MAP_IMAGE_CACHE_SIZE:
+			_map_images.popitem(last=False)
+	else:
+		_map_images.move_to_end(key)
+	return image
 
 # Show the generated map in a new window
 def show_map_in_new_window(map_data):
-	def draw_map(canvas, map_data):
-		color_map = {'P': 'midnightblue', 'E': 'firebrick', 'C': 'gold', '1': 'darkgray', '0': 'darkslategray'}
-		canvas.delete("all")
-		for y, row in enumerate(map_data):
-			for x, cell in enumerate(row):
-				color = color_map.get(cell, 'black')
-				canvas.create_rectangle(
-					x * 20, y * 20, (x + 1) * 20, (y + 1) * 20,
-					fill=color, outline="black"
-				)
+	def show_zoom(level):
+		""" Show the map image at a zoom level, keeping the center of the view in place """
+		nonlocal zoom_level
+		old_size = VISUALIZATION_ZOOM_LEVELS[zoom_level]
+		center_x = (canvas.canvasx(0) + canvas.winfo_width() / 2) / old_size
+		center_y = (canvas.canvasy(0) + canvas.winfo_height() / 2) / old_size
+		zoom_level = level
+		cell_size = VISUALIZATION_ZOOM_LEVELS[level]
+		image = map_image(map_data, cell_size)
+		canvas.itemconfigure(image_item, image=image)
+		canvas.image = image
+		canvas.config(scrollregion=(0, 0, image.width(), image.height()))
+		canvas.xview_moveto(max(0, center_x * cell_size - canvas.winfo_width() / 2) / image.width())
+		canvas.yview_moveto(max(0, center_y * cell_size - canvas.winfo_height() / 2) / image.height())
+		zoom_label.config(text=f"{cell_size} px")
+
+	def zoom(step):
+		level = zoom_level + step
+		if 0 <= level < len(VISUALIZATION_ZOOM_LEVELS) and max_cells * VISUALIZATION_ZOOM_LEVELS[level] <= VISUALIZATION_MAX_IMAGE_SIZE:
+			show_zoom(level)
 
 	def on_mouse_wheel(event):
 		canvas.yview_scroll(-1 * (event.delta // 120), "units")
@@ -174,11 +184,21 @@ def show_map_in_new_window(map_data):
 	def on_shift_mouse_wheel(event):
 		canvas.xview_scroll(-1 * (event.delta // 120), "units")
 
+	def on_control_mouse_wheel(event):
+		zoom(1 if event.delta > 0 else -1)
+
 	map_window = tk.Toplevel()
 	map_window.title("Map Visualization")
 
-	canvas_width = len(map_data[0]) * 20
-	canvas_height = len(map_data) * 20
+	# Start at 20 pixels per cell, less if the image would be too large
+	max_cells = max(map_data.width, map_data.height)
+	zoom_level = VISUALIZATION_ZOOM_LEVELS.index(20)
+	while zoom_level > 0 and max_cells * VISUALIZATION_ZOOM_LEVELS[zoom_level] > VISUALIZATION_MAX_IMAGE_SIZE:
+		zoom_level -= 1
+	cell_size = VISUALIZATION_ZOOM_LEVELS[zoom_level]
+
+	canvas_width = map_data.width * cell_size
+	canvas_height = map_data.height * cell_size
 
 	base_width = min(canvas_width, 800)
 	base_height = min(canvas_height, 600)
@@ -186,6 +206,13 @@ def show_map_in_new_window(map_data):
 	window_width = base_width + 20 if canvas_width > 800 else base_width
 	window_height = base_height + 20 if canvas_height > 600 else base_height
 
+	toolbar = tk.Frame(map_window)
+	toolbar.pack(side=tk.TOP, fill=tk.X)
+	tk.Button(toolbar, text="-", width=2, command=lambda: zoom(-1)).pack(side=tk.LEFT)
+	zoom_label = tk.Label(toolbar, text=f"{cell_size} px", width=6)
+	zoom_label.pack(side=tk.LEFT)
+	tk.Button(toolbar, text="+", width=2, command=lambda: zoom(1)).pack(side=tk.LEFT)
+
 	frame = tk.Frame(map_window)
 	frame.pack(fill=tk.BOTH, expand=True)
 
@@ -201,12 +228,17 @@ def show_map_in_new_window(map_data):
 	canvas.config(xscrollcommand=h_scrollbar.set, yscrollcommand=v_scrollbar.set)
 	canvas.config(scrollregion=(0, 0, canvas_width, canvas_height))
 
-	draw_map(canvas, map_data)
+	# The whole map is a single image item, the reference on the canvas keeps the image alive
+	canvas.image = map_image(map_data, cell_size)
+	image_item = canvas.create_image(0, 0, image=canvas.image, anchor=tk.NW)
 
 	canvas.bind("<MouseWheel>", on_mouse_wheel)
 	canvas.bind("<Shift-MouseWheel>", on_shift_mouse_wheel)
+	canvas.bind("<Control-MouseWheel>", on_control_mouse_wheel)
+	canvas.bind("<Control-Button-4>", lambda event: zoom(1))
+	canvas.bind("<Control-Button-5>", lambda event: zoom(-1))
 
-	map_window.geometry(f"{window_width+4}x{window_height+4}")
+	map_window.geometry(f"{window_width+4}x{window_height+34}")
 
 def validate_arguments(width, height, wall_rate, debug=False):
 	"""
@@ -238,9 +270,12 @@ def validate_arguments(width, height, wall_rate, debug=False):
 
 # Graphical User Interface
 def gui():
+	import ttkbootstrap as ttkb
+
 	def generate_action():
-		nonlocal map_data
+		nonlocal generation
 		try:
+			algorithm = algorithm_combobox.get()
 			width = width_entry.get()
 			height = height_entry.get()
 			coins = coins_entry.get()
@@ -274,36 +309,80 @@ def gui():
 
 			# Validate arguments considering the debug mode
 			if validate_arguments(width, height, walls, debug=debug_mode.get()):
-				try:
-					iterations = 0
-					while iterations < (max_iterations if max_iterations else 5000):
-						map_data = generate_map(width, height, coins, walls)
-						if print_iterations.get() and debug_mode.get():
-							print(f"Iteration {iterations}")
-						if validate_map(map_data):
-							save_map_to_file(map_data, path)
-							status_label.config(text="Map generated successfully.", bootstyle="success")
-							visualize_button.config(state=tk.NORMAL)
-							edit_button.config(state=tk.NORMAL)
-							show_map_in_new_window(map_data)
-							if print_map_in_terminal.get() and debug_mode.get():
-								show_map_in_terminal(map_data)
-							if print_map_stats.get() and debug_mode.get():
-								show_stats(map_data)
-							break
-						else:
-							iterations += 1
-							if iterations >= (max_iterations if max_iterations else 5000):
-								status_label.config(text="Max iterations reached.", bootstyle="danger")
-								break
-							status_label.config(text=f"Invalid map, trying again... (Attempt {iterations}/{max_iterations})", bootstyle="warning")
-				except TimeoutError as e:
-					messagebox.showerror("Error", str(e))
+				# Parameters for which almost no map is valid would only spin until the maximum number of attempts
+				rate = acceptance_rate(width, height, coins, walls, algorithm)
+				if rate is not None and rate < INFEASIBLE_RATE:
+					odds = f"about 1 map in {expected_attempts(rate):.0f} is valid" if rate > 0 else "almost no map is valid"
+					answer = messagebox.askyesnocancel("Infeasible parameters",
+						f"With these parameters, {odds}.\n\n"
+						f"Yes: switch to the constructive algorithm (always valid).\n"
+						f"No: try anyway (up to {max_iterations or 5000} attempts).")
+					if answer is None:
+						return
+					if answer:
+						algorithm = "constructive"
+						algorithm_combobox.set(algorithm)
+
+				# Large maps use all the cores, the constructive algorithm is valid on the first attempt anyway
+				jobs = 1
+				if width * height >= PARALLEL_GENERATION_CELLS and algorithm != "constructive":
+					jobs = os.cpu_count() or 1
+				generation = BackgroundGeneration(width, height, coins, walls, algorithm, max_iterations or 5000, jobs).start()
+				generate_button.config(state=tk.DISABLED)
+				cancel_button.config(state=tk.NORMAL)
+				root.after(GENERATION_POLL_MS, poll_generation, generation, path)
 			else:
 				messagebox.showerror("Error", "The provided arguments are invalid.")
 		except Exception as e:
 			messagebox.showerror("Error", f"An error occurred: {e}")
 
+	def poll_generation(generation, path, printed=0):
+		""" Show the progress of the background generation, and the map once it is done """
+		nonlocal map_data
+		# The attempts arrive in chunks: print the count when it changed, not on every poll
+		attempts = generation.attempts
+		if print_iterations.get() and debug_mode.get() and attempts != printed:
+			print(f"Iteration {attempts}")
+			printed = attempts
+		if not generation.done:
+			status_label.config(text=f"Generating... attempt {attempts}/{generation.max_attempts}, "
+								f"{generation.attempts_per_second:.0f} attempts/s, {generation.elapsed:.1f}s", bootstyle="warning")
+			root.after(GENERATION_POLL_MS, poll_generation, generation, path, printed)
+			return
+
+		generate_button.config(state=tk.NORMAL)
+		cancel_button.config(state=tk.DISABLED)
+		export_rejections_button.config(state=tk.NORMAL)
+		if print_map_stats.get() and debug_mode.get():
+			show_rejection_stats(generation.rejections)
+		timing = f"{generation.attempts} attempt(s) in {generation.elapsed:.1f}s"
+		if generation.error is not None:
+			status_label.config(text="Generation failed.", bootstyle="danger")
+			messagebox.showerror("Error", f"An error occurred: {generation.error}")
+		elif generation.map_data is not None:
+			map_data = generation.map_data
+			try:
+				save_map_to_file(map_data, path)
+				status_label.config(text=f"Map generated successfully ({timing}).", bootstyle="success")
+			except Exception as e:
+				status_label.config(text=f"Map generated but not saved ({timing}).", bootstyle="danger")
+				messagebox.showerror("Error", f"The map could not be saved to {path}: {e}")
+			visualize_button.config(state=tk.NORMAL)
+			edit_button.config(state=tk.NORMAL)
+			show_map_in_new_window(map_data)
+			if print_map_in_terminal.get() and debug_mode.get():
+				show_map_in_terminal(map_data)
+			if print_map_stats.get() and debug_mode.get():
+				show_stats(map_data)
+		elif generation.cancelled:
+			status_label.config(text=f"Generation cancelled ({timing}).", bootstyle="secondary")
+		else:
+			status_label.config(text=f"Max iterations reached ({timing}).", bootstyle="danger")
+
+	def cancel_action():
+		if generation is not None:
+			generation.cancel()
+
 	def browse_action():
 		file_path = filedialog.asksaveasfilename(
 			defaultextension=".ber",
@@ -318,39 +397,54 @@ def gui():
 
 	def show_stats(map_data):
 		""" Affiche les statistiques de la carte générée """
-		num_coins = sum(row.count('C') for row in map_data)
-		num_walls = sum(row.count('1') for row in map_data)
-		num_empty = sum(row.count('0') for row in map_data)
+		num_coins = map_data.count(COIN)
+		num_walls = map_data.count(WALL)
+		num_empty = map_data.count(EMPTY)
 		print(f"Coins: {num_coins}")
 		print(f"Walls: {num_walls}")
 		print(f"Empty spaces: {num_empty}")
 		show_debug_stats(map_data)
 
 	def show_debug_stats(map_data):
-		player_pos = None
-		exit_pos = None
-		for y, row in enumerate(map_data):
-			for x, cell in enumerate(row):
-				if cell == 'P':
-					player_pos = (x, y)
-				if cell == 'E':
-					exit_pos = (x, y)
+		player_pos = map_data.player
+		exit_pos = map_data.exit
 		if player_pos and exit_pos:
 			print(f"Player position: {player_pos}")
 			print(f"Exit position: {exit_pos}")
 		else:
 			print("Player or Exit not found in map.")
 
+	def show_rejection_stats(rejections):
+		""" Print why the generated maps were rejected: attempts and time per reason """
+		print(f"Rejections: {rejections.report()}")
+
+	def export_rejections_action():
+		if generation is None:
+			return
+		file_path = filedialog.asksaveasfilename(
+			defaultextension=".json",
+			filetypes=[("JSON", "*.json"), ("CSV", "*.csv")],
+		)
+		if file_path:
+			try:
+				generation.rejections.save(file_path)
+			except OSError as e:
+				messagebox.showerror("Error", f"Could not export the rejections: {e}")
+
 	def show_map_in_terminal(map_data):
 		""" Display the map in the terminal with characters 1, 0, C, P, E """
 		print("Map in terminal:")
-		for row in map_data:
+		for row in map_data.lines():
 			print(' '.join(row))
 
+	def edit_action():
+		from map_editor import open_map_editor
+		open_map_editor(map_data)
+
 	# Create the main window
 	root = ttkb.Window(themename="vapor")
 	root.title("So_long Map Generator")
-	root.geometry("400x400")
+	root.geometry("400x440")
 	root.resizable(True, True)
 
 	# Add the input fields
@@ -386,32 +480,42 @@ def gui():
 	browse_button = ttkb.Button(root, text="Browse", command=browse_action, bootstyle="info-outline")
 	browse_button.grid(row=4, column=2, padx=10, pady=5)
 
+	ttkb.Label(root, text="Algorithm :").grid(row=5, column=0, padx=10, pady=5, sticky="w")
+	algorithm_combobox = ttkb.Combobox(root, values=list(ALGORITHMS), state="readonly", width=18)
+	algorithm_combobox.set("random")
+	algorithm_combobox.grid(row=5, column=1, padx=10, pady=5)
+
 	map_data = None
+	generation = None
 
 	# Generate button
 	generate_button = ttkb.Button(root, text="Generate", command=generate_action, bootstyle="success-outline", width=12)
-	generate_button.grid(row=5, column=0, padx=10, pady=5, sticky="ew")
+	generate_button.grid(row=6, column=0, padx=10, pady=5, sticky="ew")
 
 	# Visualize button
 	visualize_button = ttkb.Button(root, text="Visualize", state=tk.DISABLED, command=lambda: show_map_in_new_window(map_data), bootstyle="info-outline", width=12)
-	visualize_button.grid(row=5, column=1, padx=10, pady=5, sticky="ew")
+	visualize_button.grid(row=6, column=1, padx=10, pady=5, sticky="ew")
 
 	# Quit button
 	quit_button = ttkb.Button(root, text="Quit", command=quit_action, bootstyle="danger-outline", width=12)
-	quit_button.grid(row=5, column=2, padx=10, pady=5, sticky="ew")
+	quit_button.grid(row=6, column=2, padx=10, pady=5, sticky="ew")
+
+	# Cancel button, enabled while a map is being generated
+	cancel_button = ttkb.Button(root, text="Cancel", state=tk.DISABLED, command=cancel_action, bootstyle="warning-outline", width=12)
+	cancel_button.grid(row=7, column=0, padx=10, pady=5, sticky="ew")
 
 	# Edit Map button
-	edit_button = ttkb.Button(root, text="Edit Map", state=tk.DISABLED, command=lambda: open_map_editor(map_data), bootstyle="primary-outline", width=12)
-	edit_button.grid(row=6, column=1, padx=10, pady=5, sticky="ew")
+	edit_button = ttkb.Button(root, text="Edit Map", state=tk.DISABLED, command=edit_action, bootstyle="primary-outline", width=12)
+	edit_button.grid(row=7, column=1, padx=10, pady=5, sticky="ew")
 
 	# Status label
 	status_label = ttkb.Label(root, text="Ready.", bootstyle="secondary", anchor="w")
-	status_label.grid(row=7, column=0, columnspan=3, pady=5)
+	status_label.grid(row=8, column=0, columnspan=3, pady=5)
 
 	# Debug mode checkbox
 	debug_mode = tk.BooleanVar()  # This variable will track if debug mode is enabled
 	debug_checkbox = ttkb.Checkbutton(root, text="Enable Debug Mode", variable=debug_mode)
-	debug_checkbox.grid(row=8, column=0, columnspan=3, pady=5)
+	debug_checkbox.grid(row=9, column=0, columnspan=3, pady=5)
 
 	# Max iterations label and entry (hidden by default)
 	max_iterations_label = ttkb.Label(root, text="Max Iterations :")
@@ -437,26 +541,32 @@ def gui():
 	print_map_stats_checkbox = ttkb.Checkbutton(root, text="Show Map Stats ", variable=print_map_stats)
 	print_map_stats_checkbox.grid_forget()
 
+	# Export the rejection reasons of the last generation when debug mode is enabled (hidden by default)
+	export_rejections_button = ttkb.Button(root, text="Export Rejections", state=tk.DISABLED, command=export_rejections_action, bootstyle="secondary-outline")
+	export_rejections_button.grid_forget()
+
 	# Show or hide max iterations input based on the debug mode
 	def toggle_debug_mode():
 		if debug_mode.get():
-			max_iterations_label.grid(row=12, column=0, padx=10, pady=5, sticky="w")
-			max_iterations_entry.grid(row=12, column=1, padx=10, pady=5, sticky="ew")
-			print_map_stats_checkbox.grid(row=10, column=0, padx=10, pady=5, sticky="w", columnspan=2)
-			print_map_in_terminal_checkbox.grid(row=11, column=0, padx=10, pady=5, sticky="w", columnspan=2)
-			print_iterations_checkbox.grid(row=9, column=0, padx=10, pady=5, sticky="w", columnspan=2)
+			max_iterations_label.grid(row=13, column=0, padx=10, pady=5, sticky="w")
+			max_iterations_entry.grid(row=13, column=1, padx=10, pady=5, sticky="ew")
+			print_map_stats_checkbox.grid(row=11, column=0, padx=10, pady=5, sticky="w", columnspan=2)
+			print_map_in_terminal_checkbox.grid(row=12, column=0, padx=10, pady=5, sticky="w", columnspan=2)
+			print_iterations_checkbox.grid(row=10, column=0, padx=10, pady=5, sticky="w", columnspan=2)
+			export_rejections_button.grid(row=14, column=0, padx=10, pady=5, sticky="ew", columnspan=2)
 
 			# Resize the window to accommodate debug mode fields
-			root.geometry("400x500")  # Resize the window to make space for debug elements
+			root.geometry("400x580")  # Resize the window to make space for debug elements
 		else:
 			max_iterations_label.grid_forget()
 			max_iterations_entry.grid_forget()
 			print_iterations_checkbox.grid_forget()
 			print_map_in_terminal_checkbox.grid_forget()
 			print_map_stats_checkbox.grid_forget()
+			export_rejections_button.grid_forget()
 
 			# Resize the window back to its original size when debug mode is off
-			root.geometry("400x400")
+			root.geometry("400x440")
 
 	# Link the checkbox to toggle debug mode
 	debug_checkbox.config(command=toggle_debug_mode)
@@ -468,8 +578,8 @@ def gui():
 	root.grid_columnconfigure(3, weight=1)
 
 
-	root.grid_rowconfigure(5, weight=0)
 	root.grid_rowconfigure(6, weight=0)
+	root.grid_rowconfigure(7, weight=0)
 
 	root.mainloop()
 
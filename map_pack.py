@@ -0,0 +1,245 @@
+import argparse
+import mmap
+import os
+import struct
+import sys
+
+from map_core import Grid, load_map_from_file, save_map_to_file
+from map_render import find_map_files
+
+# ======================================================================================================================
+# FORMAT
+# ======================================================================================================================
+#
+# A pack holds many maps in one file:
+#   header  PACK_MAGIC, version (u16), 6 reserved bytes
+#   maps    the tiles of each map, width * height bytes, one map after the other
+#   index   one _ENTRY per map: offset of its tiles, width, height, coin and wall rates, algorithm, seed
+#   footer  offset of the index, number of maps, INDEX_MAGIC
+# Every entry has the same size, so the entry of map i is read directly at index offset + i * _ENTRY.size.
+# Unknown rates and seeds are stored as -1. Integers are little-endian.
+
+PACK_MAGIC = b"BERPACK\0"
+INDEX_MAGIC = b"BERINDEX"
+PACK_VERSION = 1
+
+_HEADER = struct.Struct("<8sH6x")
+_ENTRY = struct.Struct("<QIIhhB3xq")
+_FOOTER = struct.Struct("<QQ8s")
+
+# Code of the algorithm stored in an entry (0: unknown). The codes are part of the format: never
+# change or reuse one, a new algorithm gets the next free code.
+ALGORITHM_CODES = {None: 0, "random": 1, "constructive": 2, "numpy": 3, "large": 4}
+PACK_ALGORITHMS = {code: algorithm for algorithm, code in ALGORITHM_CODES.items()}
+
+class PackError(ValueError):
+    """A file that is not a pack, or a pack that is truncated."""
+
+# ======================================================================================================================
+# WRITE
+# ======================================================================================================================
+
+class MapPackWriter:
+    """
+    Appends maps to a pack, the index is written when the writer is closed (use it in a with block).
+    Args:
+        path (str): The path of the pack.
+        append (bool): Add the maps after those of an existing pack instead of replacing it.
+    """
+
+    def __init__(self, path, append=False):
+        self.path = path
+        self.entries = []
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        if append and os.path.exists(path):
+            with MapPack(path) as pack:
+                self.entries = [pack.entry(i) for i in range(len(pack))]
+                end = pack.index_offset
+            self.file = open(path, "r+b")
+            # The maps stay, the old index is overwritten by the next map or the new index
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file = open(path, "wb")
+            self.file.write(_HEADER.pack(PACK_MAGIC, PACK_VERSION))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, map_data, coin_rate=None, wall_rate=None, algorithm=None, seed=None):
+        """
+        Appends a map.
+        Args:
+            map_data (Grid): The map.
+            coin_rate, wall_rate (int): The percentages it was generated with (default: unknown).
+            algorithm (str): The name of the algorithm it was generated with, see ALGORITHM_CODES (default: unknown).
+            seed (int): The seed it was generated with (default: unknown).
+        Returns:
+            int: The id of the map in the pack.
+        """
+        return self.add_cells(map_data.width, map_data.height, map_data.cells, coin_rate, wall_rate, algorithm, seed)
+
+    def add_cells(self, width, height, cells, coin_rate=None, wall_rate=None, algorithm=None, seed=None):
+        """Appends a map given as its dimensions and width * height tiles (bytes-like), see add."""
+        if len(cells) != width * height:
+            raise ValueError(f"A {width}x{height} map needs {width * height} tiles, got {len(cells)}.")
+        if algorithm not in ALGORITHM_CODES:
+            raise ValueError(f"Algorithm {algorithm!r} has no code in the pack format, add it to ALGORITHM_CODES.")
+        offset = self.file.tell()
+        self.file.write(cells)
+        self.entries.append((offset, width, height,
+                             -1 if coin_rate is None else int(coin_rate), -1 if wall_rate is None else int(wall_rate),
+                             ALGORITHM_CODES[algorithm], -1 if seed is None else int(seed)))
+        return len(self.entries) - 1
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        self.file.write(b"".join(_ENTRY.pack(*entry) for entry in self.entries))
+        self.file.write(_FOOTER.pack(index_offset, len(self.entries), INDEX_MAGIC))
+        self.file.close()
+
+# ======================================================================================================================
+# READ
+# ======================================================================================================================
+
+class MapPack:
+    """
+    Reads a pack through a memory map: opening it only reads the header and the footer, and map i is
+    found from its index entry, so any map is read in constant time without parsing the others.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            size = os.fstat(self._file.fileno()).st_size
+            if size < _HEADER.size + _FOOTER.size:
+                raise PackError(f"{path} is not a map pack (too small).")
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, version = _HEADER.unpack_from(self._map, 0)
+            if magic != PACK_MAGIC:
+                raise PackError(f"{path} is not a map pack.")
+            if version > PACK_VERSION:
+                raise PackError(f"{path} is a version {version} pack, this version reads up to version {PACK_VERSION}.")
+            self.index_offset, self.count, magic = _FOOTER.unpack_from(self._map, size - _FOOTER.size)
+            if magic != INDEX_MAGIC or self.index_offset + self.count * _ENTRY.size != size - _FOOTER.size:
+                raise PackError(f"{path} has no index, it was not closed properly.")
+        except ValueError:  # PackError, or an empty file that cannot be mapped
+            self.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def entry(self, map_id):
+        """The raw index entry of a map: offset, width, height, coin rate, wall rate, algorithm code and seed."""
+        if not 0 <= map_id < self.count:
+            raise IndexError(f"Map {map_id} is not in the pack ({self.count} maps).")
+        return _ENTRY.unpack_from(self._map, self.index_offset + map_id * _ENTRY.size)
+
+    def info(self, map_id):
+        """The dimensions and the generation parameters of a map (None when unknown)."""
+        _, width, height, coin_rate, wall_rate, algorithm, seed = self.entry(map_id)
+        return {
+            "id": map_id,
+            "width": width,
+            "height": height,
+            "coin_rate": None if coin_rate < 0 else coin_rate,
+            "wall_rate": None if wall_rate < 0 else wall_rate,
+            "algorithm": PACK_ALGORITHMS.get(algorithm),
+            "seed": None if seed < 0 else seed,
+        }
+
+    def cells(self, map_id):
+        """The tiles of a map as a read-only view of the file, without copying them (release it before closing the pack)."""
+        offset, width, height = self.entry(map_id)[:3]
+        return memoryview(self._map)[offset:offset + width * height]
+
+    def __getitem__(self, map_id):
+        """The map as a Grid (a copy of its tiles)."""
+        offset, width, height = self.entry(map_id)[:3]
+        return Grid(width, height, self._map[offset:offset + width * height])
+
+    def __iter__(self):
+        for map_id in range(self.count):
+            yield self[map_id]
+
+    def export(self, map_id, path):
+        """Saves a map of the pack as a .ber file."""
+        save_map_to_file(self[map_id], path)
+
+# ======================================================================================================================
+# COMMAND LINE
+# ======================================================================================================================
+
+def pack_main(paths, output, append=False):
+    """Packs .ber files (files and directories, searched recursively) in the order they are found. Returns the number of failures."""
+    failed = 0
+    with MapPackWriter(output, append) as writer:
+        first = len(writer)
+        for map_path, _ in find_map_files(paths):
+            try:
+                writer.add(load_map_from_file(map_path))
+            except (OSError, ValueError) as e:
+                failed += 1
+                print(f"Error: {map_path}: {e}", file=sys.stderr)
+        print(f"{len(writer) - first} map(s) added to {output} ({len(writer)} in total)" + (f", {failed} failed" if failed else ""))
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Store many so_long maps in a single indexed file.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack = commands.add_parser("pack", help="Pack .ber files")
+    pack.add_argument("paths", nargs="+", help=".ber files or directories (searched recursively)")
+    pack.add_argument("-o", "--output", type=str, required=True, help="Path of the pack")
+    pack.add_argument("-a", "--append", action="store_true", help="Add the maps to an existing pack")
+    listing = commands.add_parser("list", help="List the maps of a pack")
+    listing.add_argument("pack", help="Path of the pack")
+    export = commands.add_parser("export", help="Save maps of a pack as .ber files")
+    export.add_argument("pack", help="Path of the pack")
+    export.add_argument("ids", nargs="*", type=int, help="Ids of the maps (default: all)")
+    export.add_argument("-o", "--out-dir", type=str, default="maps", help="Directory of the .ber files (default: maps)")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "pack":
+            raise SystemExit(1 if pack_main(args.paths, args.output, args.append) else 0)
+        with MapPack(args.pack) as map_pack:
+            if args.command == "list":
+                print(f"{'id':>8} {'size':>11} {'coins':>5} {'walls':>5} {'algorithm':>12} {'seed':>10}")
+                for map_id in range(len(map_pack)):
+                    info = map_pack.info(map_id)
+                    print(f"{map_id:>8} {info['width']:>5}x{info['height']:<5} {info['coin_rate'] if info['coin_rate'] is not None else '-':>5} "
+                          f"{info['wall_rate'] if info['wall_rate'] is not None else '-':>5} {info['algorithm'] or '-':>12} "
+                          f"{info['seed'] if info['seed'] is not None else '-':>10}")
+            else:
+                ids = args.ids or range(len(map_pack))
+                digits = max(4, len(str(len(map_pack) - 1)))
+                for map_id in ids:
+                    map_pack.export(map_id, os.path.join(args.out_dir, f"map_{map_id:0{digits}d}.ber"))
+                print(f"{len(ids)} map(s) exported to {args.out_dir}")
+    except (OSError, PackError, IndexError) as e:
+        print(f"Error: {e}")
+        raise SystemExit(1)
@@ -0,0 +1,231 @@
+import argparse
+import os
+import sys
+import time
+from collections import Counter
+
+from map_core import COIN, EMPTY, EXIT, PLAYER, WALL, load_map_from_file
+
+# PIL is imported by the functions that render, so the colors can be imported without it
+
+# Colors of the tiles, the same as in the editor
+TILE_COLORS = {PLAYER: 'midnightblue', EXIT: 'firebrick', COIN: 'gold', WALL: 'darkgray', EMPTY: 'darkslategray'}
+
+# ======================================================================================================================
+# RENDER A MAP TO AN IMAGE
+# ======================================================================================================================
+
+def render_map(map_data, cell_size=1, colors=TILE_COLORS, default="black", outline=None):
+    """
+    Render a map to an image in one pass over the grid: the tiles are translated to palette indexes
+    with a byte lookup table, the image is built from those bytes then scaled up to the cell size.
+    Args:
+        map_data (Grid): The map.
+        cell_size (int): The size of a cell in pixels.
+        colors (dict): The color of each tile (names or #rrggbb).
+        default (str): The color of the tiles that are not in colors.
+        outline (str): The color of the lines between cells, drawn when cells are at least 4 pixels (default: none).
+    Returns:
+        PIL.Image.Image: A palette image of width * cell_size by height * cell_size pixels.
+    """
+    from PIL import Image, ImageColor, ImageDraw
+
+    # Palette index 0 is the default color, then one index per tile, then the outline
+    palette = [default, *colors.values(), outline or default]
+    lookup = bytearray(256)
+    for index, tile in enumerate(colors, 1):
+        lookup[ord(tile)] = index
+
+    width, height = map_data.width, map_data.height
+    image = Image.frombytes("P", (width, height), bytes(map_data.cells.translate(lookup)))
+    image.putpalette([channel for color in palette for channel in ImageColor.getrgb(color)[:3]])
+    if cell_size > 1:
+        image = image.resize((width * cell_size, height * cell_size), Image.NEAREST)
+    if outline and cell_size >= 4:
+        draw = ImageDraw.Draw(image)
+        line = len(palette) - 1
+        right, bottom = width * cell_size - 1, height * cell_size - 1
+        for x in [*range(0, right, cell_size), right]:
+            draw.line([(x, 0), (x, bottom)], fill=line)
+        for y in [*range(0, bottom, cell_size), bottom]:
+            draw.line([(0, y), (right, y)], fill=line)
+    return image
+
+def thumbnail_map(map_data, size, colors=TILE_COLORS, default="black"):
+    """
+    Render a map to fit in a size x size square: whole pixels per cell for small maps, scaled down
+    (nearest neighbour, so the tile colors stay exact) for maps larger than the square.
+    """
+    from PIL import Image
+
+    cell_size = max(1, size // max(map_data.width, map_data.height))
+    image = render_map(map_data, cell_size, colors, default)
+    if image.width > size or image.height > size:
+        scale = size / max(image.width, image.height)
+        image = image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.NEAREST)
+    return image
+
+# ======================================================================================================================
+# BULK EXPORT
+# ======================================================================================================================
+
+def find_map_files(paths):
+    """
+    List the .ber files to export. A map is named after its path relative to the directory it was
+    found in, or its file name; maps that would get the same image name keep their whole path.
+    Args:
+        paths (list): .ber files and directories, searched recursively.
+    Returns:
+        list: (path of the map, path of its image relative to the output directory) pairs, with
+            distinct image paths.
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, names in sorted(os.walk(path)):
+                for name in sorted(names):
+                    if name.endswith(".ber"):
+                        map_path = os.path.join(directory, name)
+                        files.append((map_path, os.path.splitext(os.path.relpath(map_path, path))[0] + ".png"))
+        else:
+            files.append((path, os.path.splitext(os.path.basename(path))[0] + ".png"))
+    return _unique_image_names(files)
+
+def _path_image_name(map_path):
+    # The path of the map from the working directory, or from the root when it is outside
+    path = os.path.relpath(map_path)
+    if path.startswith(os.pardir):
+        path = os.path.splitdrive(os.path.abspath(map_path))[1].lstrip(os.sep)
+    return os.path.splitext(path)[0] + ".png"
+
+def _unique_image_names(files):
+    # a/map.ber and b/map.ber, or the same relative path in two directories, would overwrite each
+    # other's image: those take the path of the map, and a number if even that is taken
+    counts = Counter(name for _, name in files)
+    unique, used = [], set()
+    for map_path, name in files:
+        if counts[name] > 1:
+            name = _path_image_name(map_path)
+        base, number = os.path.splitext(name)[0], 1
+        while name in used:
+            number += 1
+            name = f"{base}_{number}.png"
+        used.add(name)
+        unique.append((map_path, name))
+    return unique
+
+def _export_job(job):
+    map_path, png_path, cell_size, grid, thumb_size = job
+    try:
+        map_data = load_map_from_file(map_path)
+        if png_path:
+            directory = os.path.dirname(png_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            render_map(map_data, cell_size, outline="black" if grid else None).save(png_path)
+        if thumb_size:
+            # Only the bytes of the thumbnail go back to the parent, which builds the contact sheet
+            thumb = thumbnail_map(map_data, thumb_size)
+            return map_path, None, (thumb.size, thumb.tobytes(), thumb.getpalette())
+        return map_path, None, None
+    except (OSError, ValueError) as e:
+        return map_path, str(e), None
+
+def contact_sheet(thumbnails, size, columns=8, labels=None, padding=4, background="black"):
+    """
+    Assemble thumbnails in a single image, row by row.
+    Args:
+        thumbnails (list): The thumbnails (PIL images), each at most size x size.
+        size (int): The size of the square of each thumbnail.
+        columns (int): The number of thumbnails per row.
+        labels (list): A text written under each thumbnail (default: none).
+    Returns:
+        PIL.Image.Image: The contact sheet.
+    """
+    from PIL import Image, ImageDraw
+
+    label_height = 14 if labels else 0
+    columns = max(1, min(columns, len(thumbnails)))
+    rows = (len(thumbnails) + columns - 1) // columns
+    cell_width, cell_height = size + padding, size + label_height + padding
+    sheet = Image.new("RGB", (columns * cell_width + padding, rows * cell_height + padding), background)
+    draw = ImageDraw.Draw(sheet)
+    for i, thumb in enumerate(thumbnails):
+        x = padding + (i % columns) * cell_width
+        y = padding + (i // columns) * cell_height
+        sheet.paste(thumb.convert("RGB"), (x + (size - thumb.width) // 2, y + (size - thumb.height) // 2))
+        if labels:
+            draw.text((x, y + size + 1), labels[i][:size // 6], fill="white")
+    return sheet
+
+def export_main(paths, out_dir=None, cell_size=8, grid=False, sheet=None, thumb_size=128, columns=8, jobs=None):
+    """
+    Render .ber files to PNG images and/or a contact sheet, without a display, over a pool of processes.
+    Args:
+        paths (list): .ber files and directories.
+        out_dir (str): The directory of the PNG images (default: no image per map).
+        cell_size (int): The size of a cell in pixels in the PNG images.
+        grid (bool): Draw lines between the cells.
+        sheet (str): The path of the contact sheet (default: no contact sheet).
+        thumb_size (int): The size of each thumbnail of the contact sheet.
+        columns (int): The number of thumbnails per row of the contact sheet.
+        jobs (int): The number of worker processes (default: number of CPUs).
+    Returns:
+        int: The number of maps that could not be exported.
+    """
+    from PIL import Image
+
+    files = find_map_files(paths)
+    tasks = [(map_path, os.path.join(out_dir, png_name) if out_dir else None, cell_size, grid, thumb_size if sheet else 0)
+             for map_path, png_name in files]
+    jobs = jobs or os.cpu_count() or 1
+
+    start = time.perf_counter()
+    if jobs == 1 or len(tasks) <= 1:
+        results = list(map(_export_job, tasks))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_export_job, tasks, chunksize=max(1, len(tasks) // (jobs * 8))))
+
+    failed = 0
+    thumbnails, labels = [], []
+    for map_path, error, thumb in results:
+        if error:
+            failed += 1
+            print(f"Error: {map_path}: {error}", file=sys.stderr)
+        elif thumb:
+            (width, height), data, palette = thumb
+            image = Image.frombytes("P", (width, height), data)
+            image.putpalette(palette)
+            thumbnails.append(image)
+            labels.append(os.path.basename(map_path))
+    if sheet and thumbnails:
+        directory = os.path.dirname(sheet)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        contact_sheet(thumbnails, thumb_size, columns, labels).save(sheet)
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(results) - failed} map(s) exported with {jobs} job(s) in {elapsed:.2f}s"
+          + (f" to {out_dir}" if out_dir else "") + (f", contact sheet saved to {sheet}" if sheet and thumbnails else "")
+          + (f", {failed} failed" if failed else ""))
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export so_long maps (.ber) to PNG images, without a display.")
+    parser.add_argument("paths", nargs="+", help=".ber files or directories (searched recursively)")
+    parser.add_argument("-o", "--out-dir", type=str, default=None, help="Directory of the PNG images (default: png, or none with --sheet)")
+    parser.add_argument("-s", "--cell-size", type=int, default=8, help="Size of a cell in pixels (default: 8)")
+    parser.add_argument("-g", "--grid", action="store_true", help="Draw lines between the cells (cells of 4 pixels or more)")
+    parser.add_argument("--sheet", type=str, default=None, help="Path of a contact sheet with a thumbnail of every map")
+    parser.add_argument("--thumb-size", type=int, default=128, help="Size of the thumbnails of the contact sheet (default: 128)")
+    parser.add_argument("--columns", type=int, default=8, help="Thumbnails per row of the contact sheet (default: 8)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: number of CPUs)")
+    args = parser.parse_args()
+
+    if args.cell_size < 1 or args.thumb_size < 1 or args.columns < 1 or (args.jobs is not None and args.jobs < 1):
+        parser.error("cell size, thumbnail size, columns and jobs must be greater than or equal to 1")
+    out_dir = args.out_dir if args.out_dir or args.sheet else "png"
+    failed = export_main(args.paths, out_dir, args.cell_size, args.grid, args.sheet, args.thumb_size, args.columns, args.jobs)
+    raise SystemExit(1 if failed else 0)
@@ -0,0 +1,347 @@
+import argparse
+import json
+import os
+import signal
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from acceptance import INFEASIBLE_RATE, acceptance_rate
+from map_core import ALGORITHMS, check_map_size, seed_generators
+from map_generator_cli import generate_valid_map
+
+# Default number of valid maps kept ready per configuration
+DEFAULT_POOL_SIZE = 8
+
+# Most configurations served at once, each one keeps its own pool of maps
+DEFAULT_MAX_CONFIGS = 32
+
+# Seconds a request waits for a map when its pool is empty
+DEFAULT_WAIT = 30.0
+
+# Seconds a worker may spend on one map before giving up on it. It is only checked between two attempts,
+# the parameters are checked before any job is started so that every attempt ends (see MapPools.config).
+MAP_TIMEOUT = 60.0
+
+# Dimensions and percentages accepted in a request, the limits of map_generator_cli.py
+MAX_SIDE = 150
+
+# ======================================================================================================================
+# POOLS OF VALID MAPS
+# ======================================================================================================================
+
+def _pool_job(config):
+    width, height, coin_rate, wall_rate, algorithm = config
+    return generate_valid_map(width, height, coin_rate, wall_rate, algorithm, timeout=MAP_TIMEOUT)[0]
+
+class MapPool:
+    """
+    Valid maps of one (width, height, coin_rate, wall_rate, algorithm) configuration, generated ahead
+    by the worker processes of an executor. Taking a map starts the generation of a new one, so the
+    pool refills as it drains and holds at most capacity maps, ready or being generated.
+    """
+
+    def __init__(self, config, executor, capacity=DEFAULT_POOL_SIZE):
+        self.config = config
+        self.executor = executor
+        self.capacity = capacity
+        self.maps = deque()
+        self.in_flight = 0
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self.error = None
+        self.wait_seconds = 0.0
+        # Reentrant: a future that is already done runs its callback in the thread that adds it
+        self._ready = threading.Condition(threading.RLock())
+
+    def refill(self):
+        """Starts generating maps until the ready and pending maps reach the capacity."""
+        with self._ready:
+            while len(self.maps) + self.in_flight < self.capacity:
+                self.in_flight += 1
+                self.executor.submit(_pool_job, self.config).add_done_callback(self._done)
+
+    def _done(self, future):
+        with self._ready:
+            self.in_flight -= 1
+            if future.cancelled():
+                pass
+            elif future.exception() is not None:
+                self.failures += 1
+                self.error = future.exception()
+            else:
+                self.generated += 1
+                self.maps.append(future.result())
+            self._ready.notify_all()
+
+    def take(self, wait=DEFAULT_WAIT):
+        """
+        Takes a valid map, waiting for one to be generated if the pool is empty.
+        Args:
+            wait (float): The maximum number of seconds to wait.
+        Returns:
+            tuple: The map (Grid) and whether it was ready (a hit) or had to be waited for (a miss).
+        Raises:
+            TimeoutError: If no map was generated in time.
+            RuntimeError: If the generation of every pending map failed.
+        """
+        start = time.perf_counter()
+        with self._ready:
+            hit = bool(self.maps)
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+                self.refill()
+                while not self.maps:
+                    if not self.in_flight:
+                        raise RuntimeError(f"The generation failed: {self.error}")
+                    remaining = wait - (time.perf_counter() - start)
+                    if remaining <= 0 or not self._ready.wait(remaining):
+                        raise TimeoutError(f"No map was generated in {wait:g}s.")
+            map_data = self.maps.popleft()
+            self.wait_seconds += time.perf_counter() - start
+            self.refill()
+        return map_data, hit
+
+    def metrics(self):
+        with self._ready:
+            served = self.hits + self.misses
+            width, height, coin_rate, wall_rate, algorithm = self.config
+            return {
+                "width": width,
+                "height": height,
+                "coin_rate": int(coin_rate),
+                "wall_rate": int(wall_rate),
+                "algorithm": algorithm,
+                "ready": len(self.maps),
+                "in_flight": self.in_flight,
+                "capacity": self.capacity,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / served if served else None,
+                "generated": self.generated,
+                "failures": self.failures,
+                "mean_wait_ms": self.wait_seconds / served * 1000 if served else None,
+            }
+
+class MapPools:
+    """
+    The pools of every configuration requested so far, created on first request, sharing one pool of
+    worker processes. At most max_configs configurations are served.
+    """
+
+    def __init__(self, jobs=None, pool_size=DEFAULT_POOL_SIZE, max_configs=DEFAULT_MAX_CONFIGS):
+        from concurrent.futures import ProcessPoolExecutor
+        self.jobs = jobs or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs, initializer=seed_generators)
+        self.pool_size = pool_size
+        self.max_configs = max_configs
+        self.pools = {}
+        self.started = time.time()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def config(width, height, coin_rate, wall_rate, algorithm="random"):
+        """
+        Checks the parameters of a configuration, as map_generator_cli.py does.
+        Returns:
+            tuple: The configuration (width, height, coin_rate, wall_rate, algorithm).
+        Raises:
+            ValueError: If a parameter is out of range or almost no map is valid with the parameters.
+        """
+        width, height, coin_rate, wall_rate = int(width), int(height), int(coin_rate), int(wall_rate)
+        if not (3 <= width <= MAX_SIDE and 3 <= height <= MAX_SIDE):
+            raise ValueError(f"Width and height must be between 3 and {MAX_SIDE}")
+        if not 0 <= coin_rate <= 100:
+            raise ValueError("Coin percentage must be between 0 and 100")
+        if not 0 <= wall_rate <= 99:
+            raise ValueError("Wall percentage must be between 0 and 99")
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"Unknown algorithm {algorithm!r}, use one of: {', '.join(ALGORITHMS)}")
+        # A map too small to ever be valid would keep its workers busy for good, whatever the budget
+        check_map_size(width, height)
+        # Parameters for which almost no map is valid would keep a worker busy until MAP_TIMEOUT, see choose_algorithm
+        rate = acceptance_rate(width, height, coin_rate, wall_rate, algorithm)
+        if rate is not None and rate < INFEASIBLE_RATE:
+            raise ValueError(f"With a {width}x{height} map, {coin_rate}% coins and {wall_rate}% walls, almost no map is valid: "
+                             f"lower the wall percentage or use algorithm=constructive")
+        # The generators take the percentages as strings, like the command line gives them
+        return width, height, str(coin_rate), str(wall_rate), algorithm
+
+    def pool(self, config):
+        """The pool of a configuration (see config), created and filled on first use."""
+        with self._lock:
+            pool = self.pools.get(config)
+            if pool is None:
+                if len(self.pools) >= self.max_configs:
+                    raise OverflowError(f"The server already serves {self.max_configs} configurations.")
+                pool = self.pools[config] = MapPool(config, self.executor, self.pool_size)
+                pool.refill()
+        return pool
+
+    def metrics(self):
+        with self._lock:
+            pools = list(self.pools.values())
+        metrics = [pool.metrics() for pool in pools]
+        return {
+            "uptime_seconds": time.time() - self.started,
+            "jobs": self.jobs,
+            "configurations": len(metrics),
+            "hits": sum(pool["hits"] for pool in metrics),
+            "misses": sum(pool["misses"] for pool in metrics),
+            "pools": metrics,
+        }
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+# ======================================================================================================================
+# HTTP SERVER
+# ======================================================================================================================
+#
+#   GET /map?width=20&height=10&coins=10&walls=10[&algorithm=random][&format=ber|json]
+#   GET /metrics
+#   GET /health
+
+class MapRequestHandler(BaseHTTPRequestHandler):
+    """Serves the maps of the server's MapPools (self.server.pools)."""
+
+    server_version = "so_long_maps/1"
+    quiet = False
+
+    def _send(self, status, body, content_type="application/json", headers=None):
+        if isinstance(body, (dict, list)):
+            body = json.dumps(body) + "\n"
+        body = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        if url.path == "/map":
+            self._send_map(query)
+        elif url.path == "/metrics":
+            self._send(200, self.server.pools.metrics())
+        elif url.path == "/health":
+            self._send(200, {"status": "ok"})
+        else:
+            self._send(404, {"error": f"Unknown path {url.path}, use /map, /metrics or /health"})
+
+    def _send_map(self, query):
+        pools = self.server.pools
+        try:
+            config = pools.config(query.get("width", 20), query.get("height", 10), query.get("coins", 10), query.get("walls", 10),
+                                  query.get("algorithm", "random"))
+            pool = pools.pool(config)
+            wait = float(query.get("wait", DEFAULT_WAIT))
+        except ValueError as e:
+            return self._send(400, {"error": str(e)})
+        except OverflowError as e:
+            return self._send(503, {"error": str(e)})
+        try:
+            map_data, hit = pool.take(wait)
+        except (TimeoutError, RuntimeError) as e:
+            return self._send(503, {"error": str(e)})
+        headers = {"X-Pool-Hit": "1" if hit else "0"}
+        if query.get("format") == "json":
+            self._send(200, {"width": map_data.width, "height": map_data.height, "rows": map_data.lines(), "hit": hit}, headers=headers)
+        else:
+            self._send(200, "".join(line + "\n" for line in map_data.lines()), "text/plain; charset=utf-8", headers)
+
+    def address_string(self):
+        # Unix socket clients have no address
+        return self.client_address[0] if self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """ThreadingHTTPServer on a Unix socket instead of a TCP port."""
+
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+def _stop(signum, frame):
+    # A service manager stops the server with SIGTERM, shut down as on Ctrl+C
+    raise KeyboardInterrupt
+
+def serve(host="127.0.0.1", port=8765, unix_socket=None, jobs=None, pool_size=DEFAULT_POOL_SIZE, max_configs=DEFAULT_MAX_CONFIGS,
+          warm=(), quiet=False):
+    """
+    Serves valid maps over HTTP until interrupted.
+    Args:
+        host (str), port (int): The address of the server.
+        unix_socket (str): Listen on this Unix socket instead of host and port.
+        jobs (int): The number of worker processes generating the maps (default: number of CPUs).
+        pool_size (int): The number of maps kept ready per configuration.
+        max_configs (int): The most configurations served at once.
+        warm (list): Configurations (see MapPools.config) whose pools are filled before the first request.
+        quiet (bool): Do not log the requests.
+    """
+    pools = MapPools(jobs, pool_size, max_configs)
+    for config in warm:
+        pools.pool(config)
+    handler = type("Handler", (MapRequestHandler,), {"quiet": quiet})
+    if unix_socket:
+        if os.path.exists(unix_socket):
+            os.remove(unix_socket)
+        server = UnixHTTPServer(unix_socket, handler)
+        address = unix_socket
+    else:
+        server = ThreadingHTTPServer((host, port), handler)
+        address = f"http://{host}:{server.server_port}"
+    server.pools = pools
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"Serving maps on {address} with {pools.jobs} job(s), {pool_size} map(s) ready per configuration")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        pools.close()
+        if unix_socket and os.path.exists(unix_socket):
+            os.remove(unix_socket)
+
+def parse_warm(value):
+    """A configuration given as WIDTHxHEIGHT:COINS:WALLS[:ALGORITHM] on the command line."""
+    try:
+        size, coin_rate, wall_rate, *algorithm = value.split(":")
+        width, height = size.lower().split("x")
+        return MapPools.config(width, height, coin_rate, wall_rate, *algorithm)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(f"{value}: {e} (expected WIDTHxHEIGHT:COINS:WALLS[:ALGORITHM])")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve valid so_long maps over HTTP, from pools generated ahead per configuration.")
+    parser.add_argument("--host", type=str, default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument("--unix-socket", type=str, default=None, help="Listen on this Unix socket instead of a port")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes generating the maps (default: number of CPUs)")
+    parser.add_argument("--pool-size", type=int, default=DEFAULT_POOL_SIZE, help=f"Maps kept ready per configuration (default: {DEFAULT_POOL_SIZE})")
+    parser.add_argument("--max-configs", type=int, default=DEFAULT_MAX_CONFIGS, help=f"Most configurations served at once (default: {DEFAULT_MAX_CONFIGS})")
+    parser.add_argument("--warm", type=parse_warm, action="append", default=[], help="Fill the pool of WIDTHxHEIGHT:COINS:WALLS[:ALGORITHM] at start-up (repeatable)")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not log the requests")
+    args = parser.parse_args()
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("jobs must be greater than or equal to 1")
+    if args.pool_size < 1 or args.max_configs < 1:
+        parser.error("pool size and max configs must be greater than or equal to 1")
+    serve(args.host, args.port, args.unix_socket, args.jobs, args.pool_size, args.max_configs, args.warm, args.quiet)
@@ -0,0 +1,318 @@
+import argparse
+import hashlib
+import json
+import os
+import struct
+import sys
+import time
+from array import array
+from collections import OrderedDict
+
+from map_cache import DEFAULT_CACHE_DIR, MapCache
+from map_core import (ALGORITHMS, COIN, EXIT, PLAYER, VALID, distance_field, generate_attempts, load_map_from_file,
+                      save_map_to_file, seed_generators, validate_map_reason)
+from map_render import find_map_files
+
+# Part of every matrix key: bump it when the layout of a cached matrix changes
+MATRIX_VERSION = 1
+
+# Default location of the on-disk matrices and number of matrices kept in memory
+DEFAULT_MATRIX_DIR = os.path.join(DEFAULT_CACHE_DIR, "matrices")
+MEMORY_MATRICES = 32
+
+# Up to this number of coins the route is solved exactly (the exact search grows as 2^coins * coins^2)
+EXACT_COIN_LIMIT = 16
+
+# Seconds given to the search of a route once the distance matrix is known
+DEFAULT_TIME_BUDGET = 5.0
+
+_COUNT = struct.Struct("<I")
+
+# Matrices of the maps solved by this process, least recently used first
+_matrices = OrderedDict()
+
+# ======================================================================================================================
+# DISTANCE MATRIX
+# ======================================================================================================================
+#
+# The points of a map are the player, the coins in reading order, then the exit: point 0 is the player,
+# points 1 to k the k coins and point k + 1 the exit. matrix[a][b] is the number of moves from a to b.
+
+def matrix_key(grid):
+    """Returns the hash identifying a map (its width and tiles), under which its matrix is cached."""
+    digest = hashlib.sha256(_COUNT.pack(MATRIX_VERSION) + _COUNT.pack(grid.width))
+    digest.update(grid.cells)
+    return digest.hexdigest()
+
+def _pack_matrix(points, matrix):
+    data = array('i', points)
+    for row in matrix:
+        data.extend(row)
+    return _COUNT.pack(len(points)) + data.tobytes()
+
+def _unpack_matrix(data):
+    count = _COUNT.unpack_from(data)[0]
+    values = array('i')
+    values.frombytes(data[_COUNT.size:])
+    if len(values) != count * (count + 1):
+        return None
+    matrix = [values[i:i + count].tolist() for i in range(count, len(values), count)]
+    return values[:count].tolist(), matrix
+
+def distance_matrix(grid, cache=None):
+    """
+    Computes the number of moves between every pair of points of a valid map, with one breadth-first
+    search per point. Matrices are kept in memory for the last MEMORY_MATRICES maps and, with a cache,
+    on disk, so solving the same map again does not repeat the searches.
+    Args:
+        grid (Grid): The map, it must be valid.
+        cache (MapCache): On-disk cache of the matrices (default: memory only).
+    Returns:
+        tuple: The flat indexes of the points (player, coins, exit) and the matrix, a list of rows.
+    """
+    key = matrix_key(grid)
+    entry = _matrices.get(key)
+    if entry is None and cache is not None:
+        data = cache.read(key)
+        entry = _unpack_matrix(data) if data else None
+    if entry is None:
+        coin = ord(COIN)
+        points = [grid.find(PLAYER), *(i for i, tile in enumerate(grid.cells) if tile == coin), grid.find(EXIT)]
+        matrix = []
+        for point in points:
+            field = distance_field(grid, point)
+            matrix.append([field[other] for other in points])
+        entry = points, matrix
+        if cache is not None:
+            cache.write(key, _pack_matrix(points, matrix))
+    _matrices[key] = entry
+    _matrices.move_to_end(key)
+    while len(_matrices) > MEMORY_MATRICES:
+        _matrices.popitem(last=False)
+    return entry
+
+# ======================================================================================================================
+# SEARCH
+# ======================================================================================================================
+
+def route_length(matrix, route):
+    """Number of moves of a route, a list of points starting at the player and ending at the exit."""
+    return sum(matrix[a][b] for a, b in zip(route, route[1:]))
+
+def _held_karp(matrix, deadline):
+    """
+    Exact shortest route by dynamic programming over the sets of collected coins: best[set, c] is the
+    shortest walk from the player collecting the coins of set and ending on coin c.
+    Returns the route, or None if the deadline passed first.
+    """
+    k = len(matrix) - 2
+    coins = [row[1:k + 1] for row in matrix[1:k + 1]]
+    full = 1 << k
+    unknown = sys.maxsize
+    best = [unknown] * (full * k)
+    parent = bytearray(full * k)
+    for c in range(k):
+        best[(1 << c) * k + c] = matrix[0][c + 1]
+    for collected in range(1, full):
+        if deadline is not None and not collected & 0xff and time.perf_counter() > deadline:
+            return None
+        left = [c for c in range(k) if not collected >> c & 1]
+        base = collected * k
+        for c in range(k):
+            moves = best[base + c]
+            if moves == unknown:  # c is not in the set, or the set cannot end on it
+                continue
+            row = coins[c]
+            for n in left:
+                index = (collected | 1 << n) * k + n
+                if moves + row[n] < best[index]:
+                    best[index] = moves + row[n]
+                    parent[index] = c
+    base = (full - 1) * k
+    _, last = min((best[base + c] + matrix[c + 1][k + 1], c) for c in range(k))
+    route = []
+    collected = full - 1
+    while collected:
+        route.append(last + 1)
+        previous = parent[collected * k + last]
+        collected ^= 1 << last
+        last = previous
+    return [0, *reversed(route), k + 1]
+
+def _nearest_neighbour(matrix):
+    """Route walking to the nearest coin left, then to the exit."""
+    k = len(matrix) - 2
+    left = set(range(1, k + 1))
+    route = [0]
+    while left:
+        row = matrix[route[-1]]
+        route.append(min(left, key=row.__getitem__))
+        left.discard(route[-1])
+    route.append(k + 1)
+    return route
+
+def _two_opt(matrix, route, deadline):
+    """
+    Shortens a route in place by reversing the parts of it that cross (2-opt), the player and the
+    exit stay at both ends. Stops when no reversal helps or at the deadline.
+    Returns:
+        bool: True if no reversal could shorten the route any more.
+    """
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(route) - 2):
+            if deadline is not None and time.perf_counter() > deadline:
+                return False
+            a, b = route[i - 1], route[i]
+            row_a, row_b = matrix[a], matrix[b]
+            ab = row_a[b]
+            for j in range(i + 1, len(route) - 1):
+                c, d = route[j], route[j + 1]
+                # Moves between points are the same both ways, so the reversed part keeps its length
+                if row_a[c] + row_b[d] < ab + matrix[c][d]:
+                    route[i:j + 1] = route[j:i - 1:-1]
+                    b = route[i]
+                    row_b, ab = matrix[b], row_a[b]
+                    improved = True
+    return True
+
+def lower_bound(matrix, deadline=None):
+    """
+    A number of moves no route can beat: the weight of a minimum spanning tree of the points (a route
+    is a spanning tree), and the shortest detour through the farthest coin. If the deadline passes
+    before the tree is built, only the detour is used.
+    """
+    k = len(matrix) - 2
+    player, exit_index = matrix[0], k + 1
+    bound = max((player[c] + matrix[c][exit_index] for c in range(1, k + 1)), default=player[exit_index])
+    # Prim's algorithm on the full matrix
+    closest = list(player)
+    left = list(range(1, k + 2))
+    tree = 0
+    while left:
+        if deadline is not None and time.perf_counter() > deadline:
+            return bound
+        point = min(left, key=closest.__getitem__)
+        left.remove(point)
+        tree += closest[point]
+        row = matrix[point]
+        for other in left:
+            if row[other] < closest[other]:
+                closest[other] = row[other]
+    return max(bound, tree)
+
+def solve_route(matrix, time_budget=DEFAULT_TIME_BUDGET, exact_limit=EXACT_COIN_LIMIT):
+    """
+    Searches the shortest route from the player through every coin to the exit.
+    Up to exact_limit coins the route is searched exactly; with more coins, or when the exact search
+    runs out of time, a nearest-coin route is shortened with 2-opt within the time budget and compared
+    with a lower bound.
+    Args:
+        matrix (list): The distance matrix of distance_matrix.
+        time_budget (float): Seconds given to the search (None: no limit).
+        exact_limit (int): The largest number of coins solved exactly.
+    Returns:
+        dict: moves, route (points visited in order), optimal (True when moves is proven minimal),
+            lower_bound (None for exact routes) and method ('exact' or 'heuristic').
+    """
+    deadline = time.perf_counter() + time_budget if time_budget is not None else None
+    k = len(matrix) - 2
+    if k <= exact_limit:
+        route = _held_karp(matrix, deadline) if k else [0, 1]
+        if route is not None:
+            return {"moves": route_length(matrix, route), "route": route, "optimal": True, "lower_bound": None, "method": "exact"}
+    route = _nearest_neighbour(matrix)
+    _two_opt(matrix, route, deadline)
+    moves = route_length(matrix, route)
+    bound = lower_bound(matrix, deadline)
+    return {"moves": moves, "route": route, "optimal": moves == bound, "lower_bound": bound, "method": "heuristic"}
+
+def solve_map(grid, time_budget=DEFAULT_TIME_BUDGET, exact_limit=EXACT_COIN_LIMIT, cache=None):
+    """
+    Minimum number of moves to collect every coin of a map and reach the exit.
+    Args:
+        grid (Grid): The map.
+        time_budget (float): Seconds given to the search, once the distance matrix is known (None: no limit).
+        exact_limit (int): The largest number of coins solved exactly.
+        cache (MapCache): On-disk cache of the distance matrices (default: memory only).
+    Returns:
+        dict: The result of solve_route plus coins, the route as (x, y) positions and the seconds taken.
+    Raises:
+        ValueError: If the map is not valid.
+    """
+    start = time.perf_counter()
+    reason = validate_map_reason(grid)
+    if reason != VALID:
+        raise ValueError(f"The map is not valid ({reason}).")
+    points, matrix = distance_matrix(grid, cache)
+    result = solve_route(matrix, time_budget, exact_limit)
+    result["coins"] = len(points) - 2
+    result["route"] = [(points[p] % grid.width, points[p] // grid.width) for p in result["route"]]
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def describe(result):
+    """One line summary of a result of solve_map."""
+    if result["optimal"]:
+        how = f"optimal, {result['method']}"
+    else:
+        how = f"heuristic, at least {result['lower_bound']}"
+    return f"{result['moves']} moves ({how}, {result['coins']} coins, {result['seconds']:.2f}s)"
+
+# ======================================================================================================================
+# COMMAND LINE
+# ======================================================================================================================
+
+def solver_main(paths, time_budget, exact_limit, cache, as_json=False):
+    """Solves .ber files (files and directories, searched recursively) and prints one line per map. Returns the number of failures."""
+    failed = 0
+    for map_path, _ in find_map_files(paths):
+        try:
+            result = solve_map(load_map_from_file(map_path), time_budget, exact_limit, cache)
+        except (OSError, ValueError) as e:
+            failed += 1
+            print(json.dumps({"path": map_path, "error": str(e)}) if as_json else f"Error: {map_path}: {e}")
+            continue
+        print(json.dumps(dict(result, path=map_path)) if as_json else f"{map_path}: {describe(result)}")
+    return failed
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minimum number of moves to collect every coin of a so_long map and reach the exit.")
+    parser.add_argument("paths", nargs="*", help=".ber files or directories (default: solve a generated map)")
+    parser.add_argument("-W", "--width", type=int, default=20, help="Width of the generated map (default: 20)")
+    parser.add_argument("-H", "--height", type=int, default=10, help="Height of the generated map (default: 10)")
+    parser.add_argument("-c", "--coins", type=int, default=5, help="Percentage of coins of the generated map (default: 5)")
+    parser.add_argument("-w", "--walls", type=int, default=10, help="Percentage of walls of the generated map (default: 10)")
+    parser.add_argument("-a", "--algorithm", choices=ALGORITHMS, default="random", help="Generation algorithm (default: random)")
+    parser.add_argument("-s", "--seed", type=int, default=None, help="Seed of the generated map")
+    parser.add_argument("-o", "--output", type=str, default=None, help="Save the generated map to a .ber file")
+    parser.add_argument("-t", "--time-budget", type=float, default=DEFAULT_TIME_BUDGET, help=f"Seconds of search per map (default: {DEFAULT_TIME_BUDGET})")
+    parser.add_argument("--exact-limit", type=int, default=EXACT_COIN_LIMIT, help=f"Most coins solved exactly (default: {EXACT_COIN_LIMIT})")
+    parser.add_argument("--json", action="store_true", help="Print one JSON object per map")
+    parser.add_argument("--no-cache", action="store_true", help="Do not keep the distance matrices on disk")
+    parser.add_argument("--cache-dir", type=str, default=DEFAULT_MATRIX_DIR, help=f"Directory of the distance matrices (default: {DEFAULT_MATRIX_DIR})")
+    args = parser.parse_args()
+
+    if args.time_budget <= 0:
+        parser.error("time budget must be greater than 0")
+    if args.exact_limit < 0:
+        parser.error("exact limit must be greater than or equal to 0")
+    cache = None if args.no_cache else MapCache(args.cache_dir, suffix=".dist")
+
+    if args.paths:
+        raise SystemExit(1 if solver_main(args.paths, args.time_budget, args.exact_limit, cache, args.json) else 0)
+
+    seed_generators(args.seed)
+    attempts, map_data = generate_attempts(args.width, args.height, str(args.coins), str(args.walls), args.algorithm, max_attempts=10000)
+    if map_data is None:
+        print(f"Error: no valid map found in {attempts} attempts, try fewer walls or a larger map.")
+        raise SystemExit(1)
+    if args.output:
+        save_map_to_file(map_data, args.output)
+    result = solve_map(map_data, args.time_budget, args.exact_limit, cache)
+    if args.json:
+        print(json.dumps(result))
+    else:
+        print("\n".join(map_data.lines()))
+        print(describe(result))
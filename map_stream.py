@@ -0,0 +1,123 @@
+import itertools
+import os
+from collections import deque
+
+from map_core import seed_generators
+from map_generator_cli import DEFAULT_SEARCH_STEPS, choose_algorithm, generate_valid_map
+
+# Seconds spent at most on each map of a stream by default, so a stream never waits forever
+DEFAULT_MAP_TIMEOUT = 60.0
+
+# ======================================================================================================================
+# STREAMS OF VALID MAPS
+# ======================================================================================================================
+#
+#   for map_data in iter_valid_maps(20, 10, 10, 10, count=100, prefetch=4):
+#       ...
+#   async for map_data in aiter_valid_maps(20, 10, 10, 10, prefetch=4):
+#       ...
+#
+# Maps are only generated when they are asked for. With prefetch, the next maps are generated ahead
+# in worker processes while the current one is used, so the wait for the next map is the time to
+# receive it rather than the time to generate and reject maps until one is valid.
+
+def _map_jobs(width, height, coin_rate, wall_rate, algorithm, count, seed, max_attempts, timeout, targets, search_steps):
+    # Map i of a seeded stream is the map of seed + i, the same map as in a seeded batch
+    for index in range(count) if count is not None else itertools.count():
+        map_seed = seed + index if seed is not None else None
+        yield (width, height, coin_rate, wall_rate, algorithm, map_seed, max_attempts, timeout, None, targets, search_steps)
+
+def _stream_job(job):
+    return generate_valid_map(*job)[0]
+
+def _worker_count(prefetch, jobs):
+    return max(1, min(prefetch, jobs or os.cpu_count() or 1))
+
+def iter_valid_maps(width, height, coin_rate, wall_rate, algorithm="random", count=None, seed=None, prefetch=0, jobs=None,
+                    max_attempts=None, timeout=DEFAULT_MAP_TIMEOUT, targets=None, search_steps=DEFAULT_SEARCH_STEPS, infeasible="fail"):
+    """
+    Returns an iterator of valid maps, generated one at a time when they are asked for. The parameters
+    are checked when it is called, so parameters for which almost no map is valid fail at once instead
+    of on the first map.
+    Args:
+        width (int): The width of the maps.
+        height (int): The height of the maps.
+        coin_rate (int): The percentage chance to place a coin in an empty space.
+        wall_rate (int): The percentage chance to place a wall in an empty space.
+        algorithm (str): The name of the generation algorithm in ALGORITHMS.
+        count (int): The number of maps (default: no end, stop iterating when done).
+        seed (int): Seed of the first map, map i uses seed + i (default: random).
+        prefetch (int): The number of maps generated ahead in worker processes (default: 0, every map
+            is generated in the calling process when it is asked for).
+        jobs (int): The number of worker processes when prefetching (default: prefetch, at most the number of CPUs).
+        max_attempts (int): The most maps generated to find each valid map (default: no limit).
+        timeout (float): The most seconds spent on each valid map (default: DEFAULT_MAP_TIMEOUT, None for no limit).
+        targets (dict), search_steps (int): The difficulty of each map, see generate_valid_map.
+        infeasible (str): What to do when almost no map is valid with the parameters, see choose_algorithm.
+    Returns:
+        iterator: The valid maps (Grid), in order (a seeded stream always yields the same maps).
+    Raises:
+        ValueError: If the map is too small, or almost no map is valid with the parameters and infeasible is 'fail'.
+        TimeoutError: While iterating, if a map was not found within its budget.
+    """
+    algorithm = choose_algorithm(width, height, coin_rate, wall_rate, algorithm, infeasible)
+    tasks = _map_jobs(width, height, coin_rate, wall_rate, algorithm, count, seed, max_attempts, timeout, targets, search_steps)
+    return _prefetched_maps(tasks, prefetch, jobs) if prefetch else _maps(tasks)
+
+def _maps(tasks):
+    for task in tasks:
+        yield _stream_job(task)
+
+def _prefetched_maps(tasks, prefetch, jobs):
+    # Imported here, multiprocessing is not needed without prefetching
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=_worker_count(prefetch, jobs), initializer=seed_generators)
+    try:
+        pending = deque(pool.submit(_stream_job, task) for task in itertools.islice(tasks, prefetch))
+        while pending:
+            map_data = pending.popleft().result()
+            # The next map starts before this one is handed over, so the workers stay busy while it is used
+            for task in itertools.islice(tasks, 1):
+                pending.append(pool.submit(_stream_job, task))
+            yield map_data
+    finally:
+        # Closing the stream early drops the maps that were not started
+        pool.shutdown(cancel_futures=True)
+
+def aiter_valid_maps(width, height, coin_rate, wall_rate, algorithm="random", count=None, seed=None, prefetch=0, jobs=None,
+                     max_attempts=None, timeout=DEFAULT_MAP_TIMEOUT, targets=None, search_steps=DEFAULT_SEARCH_STEPS, infeasible="fail"):
+    """
+    Asynchronous iter_valid_maps (same arguments, checked when it is called): the maps are generated
+    outside the event loop, in a thread without prefetching and in worker processes with it, so
+    waiting for a map never blocks the other tasks.
+    Returns:
+        async iterator: The valid maps (Grid), in order.
+    """
+    algorithm = choose_algorithm(width, height, coin_rate, wall_rate, algorithm, infeasible)
+    tasks = _map_jobs(width, height, coin_rate, wall_rate, algorithm, count, seed, max_attempts, timeout, targets, search_steps)
+    return _async_maps(tasks, prefetch, jobs)
+
+async def _async_maps(tasks, prefetch, jobs):
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    if not prefetch:
+        for task in tasks:
+            yield await loop.run_in_executor(None, _stream_job, task)
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=_worker_count(prefetch, jobs), initializer=seed_generators)
+    pending = deque()
+    try:
+        pending.extend(loop.run_in_executor(pool, _stream_job, task) for task in itertools.islice(tasks, prefetch))
+        while pending:
+            map_data = await pending.popleft()
+            for task in itertools.islice(tasks, 1):
+                pending.append(loop.run_in_executor(pool, _stream_job, task))
+            yield map_data
+    finally:
+        # Do not block the event loop on the maps still being generated
+        for future in pending:
+            future.cancel()
+        pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,122 @@
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+
+from map_core import TILES, VALID, MapFormatError, load_map_from_file, validate_map_reason
+from map_render import find_map_files
+
+# Outcomes of validate_file that are not checks of validate_map_reason
+REJECT_UNKNOWN_TILE = "unknown_tile"
+REJECT_UNREADABLE = "unreadable"
+
+# Columns of the results, in the order of the CSV output
+RESULT_FIELDS = ("path", "valid", "reason", "width", "height", "error")
+
+# ======================================================================================================================
+# VALIDATE FILES
+# ======================================================================================================================
+
+def validate_file(path):
+    """
+    Loads a .ber file and checks it with the rules of the game (validate_map_reason), plus the
+    characters of the file: only 0, 1, C, P and E are allowed.
+    Returns:
+        dict: path, valid, reason (VALID, a rejection reason, REJECT_UNKNOWN_TILE or REJECT_UNREADABLE),
+            width and height (None if the map could not be loaded) and error (why it could not be
+            loaded, with the line and column, else None).
+    """
+    try:
+        map_data = load_map_from_file(path, TILES)
+    except MapFormatError as e:
+        reason = REJECT_UNKNOWN_TILE if e.tile is not None else REJECT_UNREADABLE
+        return {"path": path, "valid": False, "reason": reason, "width": None, "height": None, "error": str(e)}
+    except OSError as e:
+        return {"path": path, "valid": False, "reason": REJECT_UNREADABLE, "width": None, "height": None, "error": str(e)}
+    reason = validate_map_reason(map_data)
+    return {"path": path, "valid": reason == VALID, "reason": reason, "width": map_data.width, "height": map_data.height,
+            "error": None}
+
+def _validate_chunk(paths):
+    # Several files per task, so the pool is not slowed down by one round trip per small map
+    return [validate_file(path) for path in paths]
+
+def iter_results(paths, jobs=None, chunk_size=None):
+    """
+    Validates files over a pool of processes and yields the results as they finish, so a large
+    corpus is reported while it is checked (the order is not the order of paths).
+    Args:
+        paths (list): The .ber files.
+        jobs (int): The number of worker processes (default: number of CPUs).
+        chunk_size (int): The number of files per task (default: chosen from the number of files and jobs).
+    Yields:
+        dict: The result of validate_file for each file.
+    """
+    jobs = jobs or os.cpu_count() or 1
+    if jobs == 1 or len(paths) <= 1:
+        for path in paths:
+            yield validate_file(path)
+        return
+    chunk_size = chunk_size or max(1, min(256, len(paths) // (jobs * 8)))
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = [pool.submit(_validate_chunk, paths[i:i + chunk_size]) for i in range(0, len(paths), chunk_size)]
+        for future in as_completed(futures):
+            yield from future.result()
+
+def validate_main(paths, output=sys.stdout, output_format="ndjson", jobs=None, invalid_only=False):
+    """
+    Validates every .ber file of paths and writes one result per file as NDJSON or CSV.
+    Args:
+        paths (list): .ber files and directories, searched recursively.
+        output (file): Where the results are written.
+        output_format (str): 'ndjson' (one JSON object per line) or 'csv'.
+        jobs (int): The number of worker processes (default: number of CPUs).
+        invalid_only (bool): Only write the results of invalid files.
+    Returns:
+        tuple: The number of files checked and the number of invalid files.
+    """
+    files = [path for path, _ in find_map_files(paths)]
+    writer = None
+    if output_format == "csv":
+        writer = csv.writer(output)
+        writer.writerow(RESULT_FIELDS)
+
+    start = time.perf_counter()
+    reasons = Counter()
+    for result in iter_results(files, jobs):
+        reasons[result["reason"]] += 1
+        if invalid_only and result["valid"]:
+            continue
+        if writer:
+            writer.writerow(result[field] for field in RESULT_FIELDS)
+        else:
+            output.write(json.dumps(result) + "\n")
+    output.flush()
+
+    elapsed = time.perf_counter() - start
+    invalid = len(files) - reasons[VALID]
+    details = ", ".join(f"{reason}: {count}" for reason, count in reasons.most_common() if reason != VALID)
+    print(f"{len(files)} map(s) checked in {elapsed:.2f}s, {invalid} invalid" + (f" ({details})" if details else ""), file=sys.stderr)
+    return len(files), invalid
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate so_long maps (.ber) in bulk, with the full rules of the game.")
+    parser.add_argument("paths", nargs="+", help=".ber files or directories (searched recursively)")
+    parser.add_argument("-f", "--format", choices=("ndjson", "csv"), default="ndjson", help="Format of the results (default: ndjson)")
+    parser.add_argument("-o", "--output", type=str, default=None, help="File of the results (default: standard output)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Worker processes (default: number of CPUs)")
+    parser.add_argument("--invalid-only", action="store_true", help="Only write the results of invalid maps")
+    args = parser.parse_args()
+
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("jobs must be greater than or equal to 1")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="") as file:
+            _, invalid = validate_main(args.paths, file, args.format, args.jobs, args.invalid_only)
+    else:
+        _, invalid = validate_main(args.paths, sys.stdout, args.format, args.jobs, args.invalid_only)
+    raise SystemExit(1 if invalid else 0)
@@ -0,0 +1,83 @@
+import math
+import os
+import tempfile
+import unittest
+
+from acceptance import INFEASIBLE_RATE, acceptance_rate, build_table, expected_attempts, load_table, measure_rate
+from map_core import seed_generators
+
+# rates[size][coin rate][wall rate] on two sizes, two coin rates and two wall rates
+TABLE = {
+    "sizes": [5, 20],
+    "coin_rates": [0, 10],
+    "wall_rates": [0, 50],
+    "rates": [[[1.0, 0.6], [1.0, 0.4]],
+              [[1.0, 0.2], [0.8, 0.0]]],
+}
+
+class AcceptanceRateTest(unittest.TestCase):
+
+    def test_table_points(self):
+        self.assertAlmostEqual(acceptance_rate(5, 5, 0, 50, table=TABLE), 0.6)
+        self.assertAlmostEqual(acceptance_rate(20, 20, 10, 0, table=TABLE), 0.8)
+        # Maps are read as squares of the same area
+        self.assertAlmostEqual(acceptance_rate(40, 10, 10, 0, table=TABLE), 0.8)
+
+    def test_interpolation(self):
+        # Rates linearly, sizes on a logarithmic scale
+        self.assertAlmostEqual(acceptance_rate(5, 5, 5, 25, table=TABLE), (1.0 + 0.6 + 1.0 + 0.4) / 4)
+        self.assertAlmostEqual(acceptance_rate(10, 10, 0, 50, table=TABLE), 0.6 + (0.2 - 0.6) * math.log(2) / math.log(4))
+
+    def test_outside_the_table(self):
+        # Below the table the first row is used, beyond it the last one (an upper bound)
+        self.assertAlmostEqual(acceptance_rate(4, 4, 0, 50, table=TABLE), 0.6)
+        self.assertAlmostEqual(acceptance_rate(500, 500, 10, 0, table=TABLE), 0.8)
+        self.assertAlmostEqual(acceptance_rate(20, 20, 100, 99, table=TABLE), 0.0)
+
+    def test_maps_too_small_are_never_valid(self):
+        for width, height in ((3, 3), (3, 4), (4, 3), (2, 10)):
+            with self.subTest(size=(width, height)):
+                self.assertEqual(acceptance_rate(width, height, 10, 0, table=TABLE), 0.0)
+                self.assertEqual(acceptance_rate(width, height, 10, 0, "constructive"), 0.0)
+        self.assertGreater(acceptance_rate(5, 3, 10, 0, table=TABLE), 0.0)
+
+    def test_constructive_is_always_valid(self):
+        self.assertEqual(acceptance_rate(150, 150, 10, 90, "constructive"), 1.0)
+
+    def test_no_table(self):
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(load_table(os.path.join(directory, "missing.json")))
+
+    def test_shipped_table(self):
+        table = load_table()
+        self.assertIsNotNone(table)
+        # Sampled rates are noisy, but walls make maps less likely to be valid
+        for size in (8, 30, 150):
+            rates = [acceptance_rate(size, size, 10, wall_rate) for wall_rate in range(0, 100, 5)]
+            self.assertTrue(all(0.0 <= rate <= 1.0 for rate in rates))
+            self.assertGreater(rates[0], rates[10])
+        self.assertLess(acceptance_rate(150, 150, 10, 90), INFEASIBLE_RATE)
+        self.assertGreater(acceptance_rate(20, 10, 10, 10), 0.5)
+
+    def test_shipped_table_matches_sampling(self):
+        seed_generators(11)
+        for size, coin_rate, wall_rate in ((12, 10, 20), (20, 10, 30), (30, 5, 25)):
+            with self.subTest(size=size, coin_rate=coin_rate, wall_rate=wall_rate):
+                measured, _ = measure_rate(size, coin_rate, wall_rate, min_accepted=400, max_samples=400)
+                self.assertAlmostEqual(acceptance_rate(size, size, coin_rate, wall_rate), measured, delta=0.1)
+
+    def test_build_table(self):
+        seed_generators(2)
+        table = build_table(sizes=(5, 8), coin_rates=(10,), wall_rates=(0, 99), min_accepted=5, max_samples=20, jobs=1)
+        rates = table["rates"]
+        self.assertEqual([len(rates), len(rates[0]), len(rates[0][0])], [2, 1, 2])
+        for size_rates in rates:
+            self.assertGreater(size_rates[0][0], size_rates[0][1])
+        self.assertEqual(acceptance_rate(8, 8, 10, 99, table=table), rates[1][0][1])
+
+    def test_expected_attempts(self):
+        self.assertEqual(expected_attempts(0.25), 4)
+        self.assertEqual(expected_attempts(0.0), math.inf)
+
+if __name__ == "__main__":
+    unittest.main()
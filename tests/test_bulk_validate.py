@@ -0,0 +1,87 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from map_core import REJECT_BORDER, REJECT_UNREACHABLE_COINS, VALID
+from map_validate import REJECT_UNKNOWN_TILE, REJECT_UNREADABLE, RESULT_FIELDS, iter_results, validate_file, validate_main
+
+# name -> content, expected reason
+FILES = {
+    "valid.ber": ("11111\n1PCE1\n11111\n", VALID),
+    "crlf.ber": ("11111\r\n1PCE1\r\n11111\r\n", VALID),
+    "border.ber": ("11111\n1PCE0\n11111\n", REJECT_BORDER),
+    "sub/unreachable.ber": ("1111111\n1PE1C01\n1111111\n", REJECT_UNREACHABLE_COINS),
+    "sub/unknown.ber": ("11111\n1PCE1\n1X001\n11111\n", REJECT_UNKNOWN_TILE),
+    "sub/deeper/ragged.ber": ("11111\n1PCE1\n1111\n", REJECT_UNREADABLE),
+    "empty.ber": ("", REJECT_UNREADABLE),
+}
+
+class ValidateFileTest(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = directory.name
+        for name, (content, _) in FILES.items():
+            path = os.path.join(self.root, name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "w", newline="") as file:
+                file.write(content)
+        # Not a map, skipped by the directory search
+        with open(os.path.join(self.root, "notes.txt"), "w") as file:
+            file.write("X")
+
+    def path(self, name):
+        return os.path.join(self.root, name)
+
+    def test_reasons(self):
+        for name, (_, reason) in FILES.items():
+            with self.subTest(name=name):
+                result = validate_file(self.path(name))
+                self.assertEqual(tuple(result), RESULT_FIELDS)
+                self.assertEqual(result["reason"], reason)
+                self.assertEqual(result["valid"], reason == VALID)
+
+    def test_details(self):
+        self.assertEqual(validate_file(self.path("valid.ber")),
+                         {"path": self.path("valid.ber"), "valid": True, "reason": VALID, "width": 5, "height": 3, "error": None})
+        unknown = validate_file(self.path("sub/unknown.ber"))
+        self.assertEqual((unknown["width"], unknown["height"]), (None, None))
+        self.assertTrue(unknown["error"].startswith("line 3, column 2: "))
+        self.assertTrue(validate_file(self.path("sub/deeper/ragged.ber"))["error"].startswith("line 3, column 5: "))
+
+    def test_missing_file(self):
+        result = validate_file(self.path("missing.ber"))
+        self.assertEqual(result["reason"], REJECT_UNREADABLE)
+        self.assertIsNotNone(result["error"])
+
+    def test_pool_gives_the_same_results(self):
+        paths = [self.path(name) for name in FILES] * 5
+        expected = sorted(json.dumps(validate_file(path)) for path in paths)
+        self.assertEqual(sorted(json.dumps(result) for result in iter_results(paths, jobs=2, chunk_size=3)), expected)
+
+    def test_main(self):
+        output, summary = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stderr(summary):
+            checked, invalid = validate_main([self.root], output, jobs=1)
+        self.assertEqual((checked, invalid), (len(FILES), 5))
+        results = [json.loads(line) for line in output.getvalue().splitlines()]
+        self.assertEqual(sorted(os.path.relpath(result["path"], self.root) for result in results),
+                         sorted(os.path.normpath(name) for name in FILES))
+        self.assertIn(f"{len(FILES)} map(s) checked", summary.getvalue())
+        self.assertIn(f"{REJECT_UNREADABLE}: 2", summary.getvalue())
+
+    def test_main_csv_invalid_only(self):
+        output = io.StringIO()
+        with contextlib.redirect_stderr(io.StringIO()):
+            validate_main([self.path("valid.ber"), self.path("sub")], output, "csv", jobs=1, invalid_only=True)
+        rows = list(csv.reader(io.StringIO(output.getvalue())))
+        self.assertEqual(tuple(rows[0]), RESULT_FIELDS)
+        self.assertEqual(sorted(row[2] for row in rows[1:]), sorted([REJECT_UNREACHABLE_COINS, REJECT_UNKNOWN_TILE, REJECT_UNREADABLE]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from map_cache import EVICT_TARGET, MapCache
+
+ENTRY = b"1" * 100
+
+class MapCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = MapCache(self.directory.name, max_bytes=10 * len(ENTRY))
+        # Entries written by the test are dated one second apart, oldest first
+        self.clock = time.time() - 1000
+
+    def write(self, key, cache=None):
+        cache = cache or self.cache
+        cache.write(key, ENTRY)
+        self.clock += 1
+        os.utime(cache.path(key), (self.clock, self.clock))
+
+    def cached(self, cache=None):
+        cache = cache or self.cache
+        return sorted(name[:-len(cache.suffix)] for name in os.listdir(cache.directory) if name.endswith(cache.suffix))
+
+    def test_store_and_fetch(self):
+        source = os.path.join(self.directory.name, "source.txt")
+        with open(source, "w") as file:
+            file.write("11111\n1PCE1\n11111\n")
+        key = MapCache.key("random", 5, 3, "10", "10", 7)
+        self.assertEqual(key, MapCache.key("random", "5", 3, 10, 10, 7))
+        destination = os.path.join(self.directory.name, "out", "map.ber")
+        self.assertFalse(self.cache.fetch(key, destination))
+        self.cache.store(key, source)
+        self.assertTrue(self.cache.fetch(key, destination))
+        with open(destination) as file:
+            self.assertEqual(file.read(), "11111\n1PCE1\n11111\n")
+
+    def test_eviction_keeps_the_most_recently_used(self):
+        for i in range(10):
+            self.write(f"k{i:02d}")
+        self.assertEqual(len(self.cached()), 10)
+        # Reading k00 makes it the most recently used entry
+        self.assertEqual(self.cache.read("k00"), ENTRY)
+        self.write("k10")
+        expected_size = int(self.cache.max_bytes * EVICT_TARGET)
+        kept = self.cached()
+        self.assertLessEqual(len(kept) * len(ENTRY), expected_size)
+        self.assertIn("k00", kept)
+        self.assertIn("k10", kept)
+        self.assertNotIn("k01", kept)
+        self.assertNotIn("k02", kept)
+
+    def test_size_stays_under_the_limit(self):
+        for i in range(100):
+            self.write(f"k{i:03d}")
+            self.assertLessEqual(len(self.cached()) * len(ENTRY), self.cache.max_bytes)
+        self.assertIn("k099", self.cached())
+
+    def test_directory_is_not_scanned_on_every_write(self):
+        cache = MapCache(self.directory.name, max_bytes=100 * len(ENTRY))
+        with mock.patch.object(MapCache, "evict", autospec=True, side_effect=MapCache.evict) as evict:
+            for i in range(400):
+                self.write(f"k{i:03d}", cache)
+        # The first write, then once every time the room left by an eviction (10 entries) is used up
+        self.assertLessEqual(evict.call_count, 1 + 300 // 10)
+        self.assertLessEqual(len(self.cached(cache)), 100)
+
+    def test_other_suffixes_are_separate(self):
+        matrices = MapCache(self.directory.name, max_bytes=2 * len(ENTRY), suffix=".dist")
+        for i in range(5):
+            self.write(f"m{i}")
+            self.write(f"d{i}", matrices)
+        self.assertEqual(self.cached(), [f"m{i}" for i in range(5)])
+        self.assertLessEqual(len(self.cached(matrices)), 2)
+        self.assertIn("d4", self.cached(matrices))
+        self.assertIsNone(matrices.read("m0"))
+
+if __name__ == "__main__":
+    unittest.main()
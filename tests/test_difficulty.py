@@ -0,0 +1,101 @@
+import random
+import unittest
+
+from map_core import (COIN, EMPTY, EXIT, PLAYER, WALL, DistanceFields, distance_field, generate_attempts, measure_difficulty,
+                      search_difficulty, seed_generators, validate_map)
+
+def greedy_route(grid):
+    """Route to the nearest coin left (first in reading order on ties), then to the exit, with full fields."""
+    left = sorted(i for i, tile in enumerate(grid.cells) if tile == ord(COIN))
+    position, length = grid.find(PLAYER), 0
+    while left:
+        field = distance_field(grid, position)
+        if any(field[i] < 0 for i in left):
+            return -1
+        position = min(left, key=lambda i: (field[i], i))
+        length += field[position]
+        left.remove(position)
+    last = distance_field(grid, grid.find(EXIT))[position]
+    return -1 if last < 0 else length + last
+
+class DistanceFieldsTest(unittest.TestCase):
+
+    def test_measures(self):
+        seed_generators(8)
+        for _ in range(20):
+            _, grid = generate_attempts(20, 12, 8, 25, max_attempts=None)
+            with self.subTest(rows=grid.lines()):
+                values = measure_difficulty(grid)
+                self.assertEqual(values["exit_distance"], distance_field(grid, grid.find(PLAYER))[grid.find(EXIT)])
+                self.assertEqual(values["route_length"], greedy_route(grid))
+
+    def test_after_carries_over_only_fields_that_are_still_right(self):
+        rng = random.Random(9)
+        seed_generators(9)
+        carried = dropped = 0
+        for _ in range(10):
+            _, grid = generate_attempts(18, 10, 10, 20, max_attempts=None)
+            fields = DistanceFields(grid)
+            measure_difficulty(grid, fields=fields)
+            for start in (grid.find(EXIT), *(i for i, tile in enumerate(grid.cells) if tile == ord(COIN))):
+                fields.field(start)
+            for _ in range(60):
+                # One or two cells inside the border opened or closed, or the exit swapped with a floor cell
+                if rng.random() < 0.2:
+                    target = rng.choice([i for i, tile in enumerate(grid.cells) if tile == ord(EMPTY)])
+                    changes = [(grid.find(EXIT), EMPTY), (target, EXIT)]
+                else:
+                    changes = []
+                    for _ in range(rng.randint(1, 2)):
+                        i = rng.randrange(1, grid.width - 1) + rng.randrange(1, grid.height - 1) * grid.width
+                        if grid.cells[i] in (ord(EMPTY), ord(WALL)) and i not in (j for j, _ in changes):
+                            changes.append((i, EMPTY if grid.cells[i] == ord(WALL) else WALL))
+                for i, tile in changes:
+                    grid.set_index(i, tile)
+                before = len(fields._fields)
+                fields = fields.after([i for i, _ in changes])
+                carried += len(fields._fields)
+                dropped += before - len(fields._fields)
+                for start, field in fields._fields.items():
+                    self.assertIn(chr(grid.cells[start]), (PLAYER, COIN, EXIT))
+                    self.assertEqual(field, distance_field(grid, start))
+                # The measures read the carried fields where they can, they must not change
+                fresh = measure_difficulty(grid)
+                self.assertEqual(measure_difficulty(grid, fields=fields), fresh)
+        # The fields are both reused and recomputed in the run
+        self.assertGreater(carried, 0)
+        self.assertGreater(dropped, 0)
+
+class SearchDifficultyTest(unittest.TestCase):
+
+    def search(self, seed, targets, steps=3000):
+        seed_generators(seed)
+        _, grid = generate_attempts(25, 12, 5, 15, max_attempts=None)
+        return grid, search_difficulty(grid, targets, steps)
+
+    def test_targets_are_met_on_a_valid_map(self):
+        for targets in ({"exit_distance": 30}, {"route_length": 90}, {"exit_distance": 25, "route_length": 80}):
+            with self.subTest(targets=targets):
+                grid, (met, values, steps) = self.search(1, targets)
+                self.assertTrue(met)
+                self.assertTrue(validate_map(grid))
+                self.assertEqual(values, measure_difficulty(grid, tuple(targets)))
+                for measure, target in targets.items():
+                    self.assertGreaterEqual(values[measure], target)
+                self.assertLessEqual(steps, 3000)
+
+    def test_unreachable_targets_use_the_budget(self):
+        grid, (met, values, steps) = self.search(2, {"exit_distance": 10000}, steps=200)
+        self.assertFalse(met)
+        self.assertEqual(steps, 200)
+        self.assertTrue(validate_map(grid))
+        self.assertEqual(values, measure_difficulty(grid, ("exit_distance",)))
+
+    def test_seeded_search_is_repeatable(self):
+        first, result = self.search(3, {"route_length": 100})
+        second, again = self.search(3, {"route_length": 100})
+        self.assertEqual(result, again)
+        self.assertEqual(first.cells, second.cells)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import tempfile
+import unittest
+
+from map_core import Grid, generate_map, load_map_from_file, seed_generators
+from map_pack import MapPack, MapPackWriter, PackError
+
+class MapPackTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "maps.pack")
+        seed_generators(7)
+        self.maps = [generate_map(width, height, 10, 20) for width, height in ((5, 5), (20, 10), (13, 7))]
+
+    def write(self, maps, append=False, **params):
+        with MapPackWriter(self.path, append) as writer:
+            return [writer.add(map_data, **params) for map_data in maps]
+
+    def test_round_trip(self):
+        self.assertEqual(self.write(self.maps[:2], coin_rate=10, wall_rate=20, algorithm="random", seed=7), [0, 1])
+        with MapPack(self.path) as pack:
+            self.assertEqual(len(pack), 2)
+            for map_id, map_data in enumerate(self.maps[:2]):
+                self.assertEqual(pack[map_id].cells, map_data.cells)
+                self.assertEqual(pack[map_id].lines(), map_data.lines())
+                with pack.cells(map_id) as cells:
+                    self.assertEqual(bytes(cells), bytes(map_data.cells))
+            self.assertEqual(pack.info(1), {"id": 1, "width": 20, "height": 10, "coin_rate": 10, "wall_rate": 20,
+                                            "algorithm": "random", "seed": 7})
+
+    def test_unknown_parameters(self):
+        self.write(self.maps[:1])
+        with MapPack(self.path) as pack:
+            self.assertEqual(pack.info(0), {"id": 0, "width": 5, "height": 5, "coin_rate": None, "wall_rate": None,
+                                            "algorithm": None, "seed": None})
+
+    def test_append(self):
+        self.write(self.maps[:2], algorithm="constructive")
+        self.assertEqual(self.write(self.maps[2:], append=True, algorithm="numpy"), [2])
+        with MapPack(self.path) as pack:
+            self.assertEqual([grid.cells for grid in pack], [map_data.cells for map_data in self.maps])
+            self.assertEqual([pack.info(i)["algorithm"] for i in range(len(pack))], ["constructive", "constructive", "numpy"])
+
+    def test_export(self):
+        self.write(self.maps)
+        path = os.path.join(self.directory.name, "out", "map.ber")
+        with MapPack(self.path) as pack:
+            pack.export(2, path)
+        self.assertEqual(load_map_from_file(path).cells, self.maps[2].cells)
+
+    def test_out_of_range(self):
+        self.write(self.maps[:1])
+        with MapPack(self.path) as pack, self.assertRaises(IndexError):
+            pack[1]
+
+    def test_bad_maps(self):
+        with MapPackWriter(self.path) as writer:
+            with self.assertRaises(ValueError):
+                writer.add_cells(5, 5, b"1" * 24)
+            with self.assertRaises(ValueError):
+                writer.add(Grid(3, 3), algorithm="unknown")
+            self.assertEqual(len(writer), 0)
+
+    def test_not_a_pack(self):
+        with open(self.path, "wb") as file:
+            file.write(b"11111\n1PCE1\n11111\n" * 4)
+        with self.assertRaises(PackError):
+            MapPack(self.path)
+
+    def test_unclosed_pack(self):
+        writer = MapPackWriter(self.path)
+        writer.add(self.maps[0])
+        writer.file.flush()
+        try:
+            with self.assertRaises(PackError):
+                MapPack(self.path)
+        finally:
+            writer.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+
+from map_core import TILES, Grid, MapFormatError, load_map_from_file, parse_map, save_map_to_file
+
+MAP = b"11111\n1PCE1\n11111\n"
+
+class ParseMapTest(unittest.TestCase):
+
+    def assertFormatError(self, data, line, column=None, tile=None):
+        with self.assertRaises(MapFormatError) as context:
+            parse_map(data, TILES)
+        error = context.exception
+        self.assertEqual((error.line, error.column, error.tile), (line, column, tile))
+        return error
+
+    def test_rectangle(self):
+        grid = parse_map(MAP, TILES)
+        self.assertEqual((grid.width, grid.height), (5, 3))
+        self.assertEqual(grid.lines(), ["11111", "1PCE1", "11111"])
+
+    def test_line_ends_and_trailing_space_give_the_same_map(self):
+        expected = parse_map(MAP).lines()
+        variants = [
+            MAP.rstrip(b"\n"),
+            MAP + b"\n\n",
+            MAP.replace(b"\n", b"\r\n"),
+            MAP.replace(b"\n", b"\r"),
+            b"\n\n" + MAP,
+            b"11111 \n1PCE1\t\n11111\r\n",
+            b"11111\n1PCE1  \n11111 \n",
+        ]
+        for data in variants:
+            with self.subTest(data=data):
+                self.assertEqual(parse_map(data, TILES).lines(), expected)
+
+    def test_short_row(self):
+        error = self.assertFormatError(b"11111\n1PC1\n11111\n", 2, 5)
+        self.assertIn("line 2, column 5", str(error))
+
+    def test_long_row(self):
+        self.assertFormatError(b"11111\n11111\n1PCE11\n11111\n", 3, 6)
+
+    def test_row_positions_count_leading_blank_lines(self):
+        self.assertFormatError(b"\n\n11111\n1PC1\n11111\n", 4, 5)
+
+    def test_empty_line_inside_the_map(self):
+        self.assertFormatError(b"11111\n1PCE1\n\n11111\n", 3)
+
+    def test_empty_map(self):
+        for data in (b"", b"\n\n", b" \r\n"):
+            with self.subTest(data=data):
+                self.assertFormatError(data, None)
+
+    def test_unknown_tile(self):
+        error = self.assertFormatError(b"11111\n1PCE1\n10X01\n11111\n", 3, 3, "X")
+        self.assertIsInstance(error, ValueError)
+
+    def test_unknown_tile_after_blank_lines_and_in_a_ragged_map(self):
+        self.assertFormatError(b"\n11111\n1PCEX\n11111\n", 3, 5, "X")
+        self.assertFormatError(b"11111 \n1P?E1\n11111\n", 2, 3, "?")
+
+    def test_any_tile_without_tiles(self):
+        self.assertEqual(parse_map(b"111\n1X1\n111\n").lines()[1], "1X1")
+
+    def test_file_round_trip(self):
+        grid = Grid.from_rows(["1111111", "1P0C0E1", "1111111"])
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "maps", "map.ber")
+            save_map_to_file(grid, path)
+            self.assertEqual(load_map_from_file(path, TILES).cells, grid.cells)
+
+if __name__ == "__main__":
+    unittest.main()
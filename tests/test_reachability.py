@@ -0,0 +1,57 @@
+import random
+import unittest
+
+from map_core import COIN, EMPTY, EXIT, PLAYER, WALL, Reachability, generate_map, seed_generators, validate_map
+
+class ReachabilityTest(unittest.TestCase):
+
+    def assertMatchesRecompute(self, reachability):
+        fresh = Reachability(reachability.grid.copy())
+        self.assertEqual(reachability.reached, fresh.reached)
+        self.assertEqual(reachability.reached_coins, fresh.reached_coins)
+        self.assertEqual(reachability.reached_exits, fresh.reached_exits)
+        self.assertEqual(reachability.player, fresh.player)
+        self.assertEqual(reachability.status(), fresh.status())
+        self.assertEqual(reachability.status()[0], validate_map(reachability.grid))
+
+    def test_random_edits(self):
+        rng = random.Random(5)
+        seed_generators(5)
+        # Mostly walls and floor, the edits that open and cut off areas
+        tiles = [WALL] * 6 + [EMPTY] * 6 + [COIN] * 2 + [EXIT, PLAYER]
+        for _ in range(30):
+            grid = generate_map(rng.randint(5, 16), rng.randint(5, 12), rng.randint(0, 30), rng.randint(10, 50))
+            reachability = Reachability(grid)
+            for _ in range(150):
+                # Mostly inside the border, sometimes on it
+                if rng.random() < 0.9:
+                    x, y = rng.randrange(1, grid.width - 1), rng.randrange(1, grid.height - 1)
+                else:
+                    x, y = rng.randrange(grid.width), rng.choice((0, grid.height - 1))
+                index = y * grid.width + x
+                before = bytearray(reachability.reached)
+                changed = reachability.set_tile(index, rng.choice(tiles))
+                if changed is not None:
+                    flipped = {i for i, (a, b) in enumerate(zip(before, reachability.reached)) if a != b}
+                    self.assertEqual(set(changed), flipped)
+                self.assertMatchesRecompute(reachability)
+
+    def test_cut_and_reopen_a_corridor(self):
+        grid = generate_map(9, 5, 0, 0)
+        for x in range(1, 8):
+            for y in range(1, 4):
+                grid[x, y] = EMPTY
+        grid[1, 2], grid[7, 2], grid[4, 1] = PLAYER, EXIT, COIN
+        reachability = Reachability(grid)
+        self.assertEqual(reachability.status(), (True, "The map is valid."))
+        # A wall across the map cuts off the exit, opening one cell of it joins the halves again
+        for y in range(1, 4):
+            reachability.set_tile(y * 9 + 5, WALL)
+        self.assertEqual(reachability.status(), (False, "The player cannot reach the exit."))
+        changed = reachability.set_tile(2 * 9 + 5, EMPTY)
+        self.assertEqual(set(changed), {y * 9 + x for x in (6, 7) for y in range(1, 4)} | {2 * 9 + 5})
+        self.assertMatchesRecompute(reachability)
+        self.assertTrue(reachability.status()[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import csv
+import json
+import os
+import tempfile
+import unittest
+
+from map_core import (REJECT_BORDER, REJECT_EXIT_COUNT, REJECT_NO_COINS, REJECT_PLAYER_COUNT, REJECT_UNREACHABLE_COINS,
+                      REJECT_UNREACHABLE_EXIT, VALID, Grid, RejectionStats, generate_attempts, seed_generators, validate_map_reason)
+
+# One map per outcome of validate_map_reason
+MAPS = {
+    VALID: ["11111", "1PCE1", "11111"],
+    REJECT_BORDER: ["11111", "1PCE0", "11111"],
+    REJECT_PLAYER_COUNT: ["11111", "1PCP1", "1E001", "11111"],
+    REJECT_EXIT_COUNT: ["111111", "1PC001", "111111"],
+    REJECT_NO_COINS: ["11111", "1P0E1", "11111"],
+    REJECT_UNREACHABLE_EXIT: ["1111111", "1PC1E01", "1111111"],
+    REJECT_UNREACHABLE_COINS: ["1111111", "1PE1C01", "1111111"],
+}
+
+class RejectionReasonTest(unittest.TestCase):
+
+    def test_reasons(self):
+        for reason, rows in MAPS.items():
+            with self.subTest(reason=reason):
+                self.assertEqual(validate_map_reason(Grid.from_rows(rows)), reason)
+
+    def test_unreachable_exit_comes_first(self):
+        self.assertEqual(validate_map_reason(Grid.from_rows(["11111111", "1P1C1E01", "11111111"])), REJECT_UNREACHABLE_EXIT)
+
+class RejectionStatsTest(unittest.TestCase):
+
+    def stats(self):
+        stats = RejectionStats()
+        for reason, seconds in ((REJECT_NO_COINS, 0.5), (REJECT_BORDER, 0.25), (REJECT_NO_COINS, 0.5), (VALID, 1.0)):
+            stats.add(reason, seconds)
+        return stats
+
+    def test_counts(self):
+        stats = self.stats()
+        self.assertEqual((stats.attempts, stats.rejected), (4, 3))
+        self.assertEqual(stats.rows(), [(REJECT_NO_COINS, 2, 0.5, 1.0, 500.0),
+                                        (REJECT_BORDER, 1, 0.25, 0.25, 250.0),
+                                        (VALID, 1, 0.25, 1.0, 1000.0)])
+
+    def test_merge(self):
+        stats, other = self.stats(), RejectionStats()
+        other.add(REJECT_BORDER, 0.75)
+        other.add(REJECT_UNREACHABLE_EXIT)
+        stats.merge(other)
+        self.assertEqual(stats.counts, {REJECT_NO_COINS: 2, REJECT_BORDER: 2, VALID: 1, REJECT_UNREACHABLE_EXIT: 1})
+        self.assertEqual(stats.seconds[REJECT_BORDER], 1.0)
+        self.assertEqual(stats.seconds[REJECT_UNREACHABLE_EXIT], 0.0)
+
+    def test_report(self):
+        lines = self.stats().report().splitlines()
+        self.assertEqual(lines[0], "4 attempt(s), 3 rejected")
+        self.assertEqual(lines[1].split(), [REJECT_NO_COINS, "2", "50.0%", "1.000s", "500.000", "ms/attempt"])
+        self.assertEqual(len(lines), 4)
+
+    def test_save(self):
+        stats = self.stats()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "out", "rejections.json")
+            stats.save(path)
+            with open(path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.assertEqual(data, stats.as_dict())
+            self.assertEqual(data["reasons"][REJECT_BORDER], {"count": 1, "share": 0.25, "seconds": 0.25, "mean_ms": 250.0})
+
+            path = os.path.join(directory, "rejections.CSV")
+            stats.save(path)
+            with open(path, encoding="utf-8", newline="") as file:
+                rows = list(csv.reader(file))
+            self.assertEqual(rows[0], ["reason", "count", "share", "seconds", "mean_ms"])
+            self.assertEqual([row[:2] for row in rows[1:]], [[REJECT_NO_COINS, "2"], [REJECT_BORDER, "1"], [VALID, "1"]])
+
+    def test_generation_records_every_attempt(self):
+        seed_generators(4)
+        stats = RejectionStats()
+        attempts, map_data = generate_attempts(30, 20, 10, 40, max_attempts=50, stats=stats)
+        self.assertEqual(stats.attempts, attempts)
+        self.assertEqual(stats.counts.get(VALID, 0), 0 if map_data is None else 1)
+        self.assertGreater(stats.rejected, 0)
+
+if __name__ == "__main__":
+    unittest.main()
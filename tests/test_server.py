@@ -0,0 +1,106 @@
+import threading
+import unittest
+from concurrent.futures import Future
+
+from map_core import Grid, validate_map
+from map_server import MapPool, MapPools
+
+CONFIG = (20, 10, "10", "10", "random")
+
+class ManualExecutor:
+    """Runs the submitted jobs only when the test says so, to control what a pool has ready."""
+
+    def __init__(self):
+        self.jobs = []
+
+    def submit(self, function, *args):
+        future = Future()
+        self.jobs.append((future, function, args))
+        return future
+
+    def run(self, count=None, error=None):
+        jobs, self.jobs = self.jobs[:count], self.jobs[count:] if count is not None else []
+        for future, function, args in jobs:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(function(*args))
+
+class MapPoolTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = ManualExecutor()
+        self.pool = MapPool(CONFIG, self.executor, capacity=3)
+
+    def test_refill_up_to_capacity(self):
+        self.pool.refill()
+        self.pool.refill()
+        self.assertEqual((len(self.executor.jobs), self.pool.in_flight), (3, 3))
+        self.executor.run()
+        self.assertEqual((len(self.pool.maps), self.pool.in_flight, self.pool.generated), (3, 0, 3))
+
+    def test_hit(self):
+        self.pool.refill()
+        self.executor.run()
+        map_data, hit = self.pool.take()
+        self.assertTrue(hit)
+        self.assertTrue(validate_map(map_data))
+        self.assertEqual((map_data.width, map_data.height), (20, 10))
+        # Taking a map starts the next one
+        self.assertEqual((len(self.pool.maps), self.pool.in_flight), (2, 1))
+
+    def test_miss_waits_for_a_map(self):
+        timer = threading.Timer(0.1, self.executor.run, (1,))
+        timer.start()
+        map_data, hit = self.pool.take(wait=10)
+        timer.join()
+        self.assertFalse(hit)
+        self.assertIsInstance(map_data, Grid)
+        metrics = self.pool.metrics()
+        self.assertEqual((metrics["hits"], metrics["misses"], metrics["hit_rate"]), (0, 1, 0.0))
+        self.assertEqual((metrics["width"], metrics["coin_rate"], metrics["algorithm"]), (20, 10, "random"))
+        self.assertEqual(metrics["ready"] + metrics["in_flight"], 3)
+        self.assertGreater(metrics["mean_wait_ms"], 50)
+
+    def test_timeout(self):
+        with self.assertRaises(TimeoutError):
+            self.pool.take(wait=0.05)
+        self.assertEqual(self.pool.in_flight, 3)
+
+    def test_failed_generation(self):
+        timer = threading.Timer(0.05, self.executor.run, kwargs={"error": TimeoutError("No valid map found in 60s")})
+        timer.start()
+        with self.assertRaisesRegex(RuntimeError, "No valid map found"):
+            self.pool.take(wait=10)
+        timer.join()
+        self.assertEqual(self.pool.metrics()["failures"], 3)
+
+class MapPoolsTest(unittest.TestCase):
+
+    def test_config(self):
+        self.assertEqual(MapPools.config("20", 10, 10, "10"), CONFIG)
+        self.assertEqual(MapPools.config(150, 150, 10, 90, "constructive"), (150, 150, "10", "90", "constructive"))
+
+    def test_config_errors(self):
+        for args, message in (((2, 10, 10, 10), "between 3"), ((151, 10, 10, 10), "between 3"), ((20, 10, 101, 10), "Coin"),
+                              ((20, 10, 10, 100), "Wall"), ((20, 10, 10, 10, "fast"), "Unknown algorithm"),
+                              ((3, 3, 10, 10), "too small"), ((4, 3, 10, 10, "constructive"), "too small"),
+                              ((150, 150, 10, 90), "almost no map is valid")):
+            with self.subTest(args=args):
+                with self.assertRaisesRegex(ValueError, message):
+                    MapPools.config(*args)
+
+    def test_pools(self):
+        pools = MapPools(jobs=1, pool_size=2, max_configs=1)
+        self.addCleanup(pools.close)
+        pool = pools.pool(CONFIG)
+        self.assertIs(pools.pool(CONFIG), pool)
+        map_data, _ = pool.take(wait=60)
+        self.assertTrue(validate_map(map_data))
+        with self.assertRaises(OverflowError):
+            pools.pool(MapPools.config(25, 10, 10, 10))
+        metrics = pools.metrics()
+        self.assertEqual((metrics["configurations"], metrics["hits"] + metrics["misses"]), (1, 1))
+
+if __name__ == "__main__":
+    unittest.main()
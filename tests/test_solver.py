@@ -0,0 +1,85 @@
+import itertools
+import random
+import unittest
+from collections import deque
+
+from map_core import Grid, generate_attempts, seed_generators
+from map_solver import solve_map
+
+# ======================================================================================================================
+# BRUTE FORCE
+# ======================================================================================================================
+
+def moves_between(rows, start):
+    """Moves from start to every cell reachable from it, walls block the way."""
+    distances = {start: 0}
+    queue = deque([start])
+    while queue:
+        x, y = queue.popleft()
+        for cell in ((x + 1, y), (x - 1, y), (x, y + 1), (x, y - 1)):
+            if cell not in distances and rows[cell[1]][cell[0]] != '1':
+                distances[cell] = distances[(x, y)] + 1
+                queue.append(cell)
+    return distances
+
+def brute_force(rows):
+    """Fewest moves to collect every coin and reach the exit, trying every order of the coins."""
+    cells = [(x, y) for y, row in enumerate(rows) for x, tile in enumerate(row)]
+    player = next(cell for cell in cells if rows[cell[1]][cell[0]] == 'P')
+    exit_ = next(cell for cell in cells if rows[cell[1]][cell[0]] == 'E')
+    coins = [cell for cell in cells if rows[cell[1]][cell[0]] == 'C']
+    moves = {cell: moves_between(rows, cell) for cell in [player, *coins]}
+    return min(sum(moves[a][b] for a, b in zip(route, route[1:]))
+               for route in ([player, *order, exit_] for order in itertools.permutations(coins)))
+
+def path_moves(rows, route):
+    return sum(moves_between(rows, a)[b] for a, b in zip(route, route[1:]))
+
+# ======================================================================================================================
+# TESTS
+# ======================================================================================================================
+
+class SolverOptimalityTest(unittest.TestCase):
+
+    def small_maps(self, count=40, max_coins=6):
+        rng = random.Random(3)
+        seed_generators(3)
+        maps = []
+        while len(maps) < count:
+            width, height = rng.randint(5, 12), rng.randint(5, 9)
+            _, grid = generate_attempts(width, height, rng.randint(3, 15), rng.randint(10, 35), max_attempts=None)
+            if grid.count('C') <= max_coins:
+                maps.append(grid)
+        return maps
+
+    def test_exact_routes_are_optimal(self):
+        for grid in self.small_maps():
+            rows = grid.lines()
+            with self.subTest(rows=rows):
+                result = solve_map(grid, time_budget=None)
+                self.assertEqual(result["method"], "exact")
+                self.assertTrue(result["optimal"])
+                self.assertEqual(result["moves"], brute_force(rows))
+                route = result["route"]
+                self.assertEqual((route[0], route[-1]), (grid.player, grid.exit))
+                self.assertEqual(sorted(route[1:-1]), sorted((x, y) for y, row in enumerate(rows) for x, tile in enumerate(row) if tile == 'C'))
+                self.assertEqual(path_moves(rows, route), result["moves"])
+
+    def test_heuristic_routes_are_bounded(self):
+        for grid in self.small_maps(count=20):
+            rows = grid.lines()
+            with self.subTest(rows=rows):
+                result = solve_map(grid, time_budget=None, exact_limit=0)
+                optimum = brute_force(rows)
+                self.assertEqual(result["method"], "heuristic")
+                self.assertGreaterEqual(result["moves"], optimum)
+                self.assertLessEqual(result["lower_bound"], optimum)
+                self.assertEqual(result["optimal"], result["moves"] == result["lower_bound"])
+                self.assertEqual(path_moves(rows, result["route"]), result["moves"])
+
+    def test_invalid_map(self):
+        with self.assertRaises(ValueError):
+            solve_map(Grid.from_rows(["11111", "1P0C1", "11111"]))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import asyncio
+import itertools
+import unittest
+
+from map_core import validate_map
+from map_generator_cli import generate_valid_map
+from map_stream import aiter_valid_maps, iter_valid_maps
+
+async def collect(stream, count=None):
+    maps = []
+    async for map_data in stream:
+        maps.append(map_data)
+        if len(maps) == count:
+            break
+    return maps
+
+class StreamTest(unittest.TestCase):
+
+    def expected(self, count, seed=40):
+        # Map i of a seeded stream is the map of seed + i
+        return [generate_valid_map(20, 10, 10, 10, seed=seed + i)[0].cells for i in range(count)]
+
+    def test_seeded_stream(self):
+        maps = list(iter_valid_maps(20, 10, 10, 10, count=4, seed=40))
+        self.assertEqual([map_data.cells for map_data in maps], self.expected(4))
+        self.assertTrue(all(validate_map(map_data) for map_data in maps))
+
+    def test_prefetch_gives_the_same_maps(self):
+        maps = iter_valid_maps(20, 10, 10, 10, count=4, seed=40, prefetch=2, jobs=2)
+        self.assertEqual([map_data.cells for map_data in maps], self.expected(4))
+
+    def test_endless_stream(self):
+        maps = itertools.islice(iter_valid_maps(20, 10, 10, 10, seed=40), 3)
+        self.assertEqual([map_data.cells for map_data in maps], self.expected(3))
+
+    def test_async_streams(self):
+        for prefetch in (0, 2):
+            with self.subTest(prefetch=prefetch):
+                maps = asyncio.run(collect(aiter_valid_maps(20, 10, 10, 10, count=3, seed=40, prefetch=prefetch)))
+                self.assertEqual([map_data.cells for map_data in maps], self.expected(3))
+        # Stopping an endless prefetched stream early does not wait for the maps in flight
+        maps = asyncio.run(collect(aiter_valid_maps(20, 10, 10, 10, seed=40, prefetch=2), count=2))
+        self.assertEqual([map_data.cells for map_data in maps], self.expected(2))
+
+    def test_parameters_are_checked_when_the_stream_is_created(self):
+        for stream in (iter_valid_maps, aiter_valid_maps):
+            with self.subTest(stream=stream.__name__):
+                # Raised by the call itself, before any map is asked for
+                with self.assertRaises(ValueError):
+                    stream(4, 3, 10, 10)
+                with self.assertRaises(ValueError):
+                    stream(100, 100, 10, 60)
+
+    def test_infeasible_parameters_can_switch_to_constructive(self):
+        maps = list(iter_valid_maps(60, 40, 10, 60, count=2, seed=1, infeasible="constructive"))
+        self.assertEqual(len(maps), 2)
+        self.assertTrue(all(validate_map(map_data) for map_data in maps))
+
+    def test_budget(self):
+        maps = iter_valid_maps(60, 40, 10, 40, max_attempts=2, infeasible="ignore", seed=5)
+        with self.assertRaises(TimeoutError):
+            next(maps)
+
+if __name__ == "__main__":
+    unittest.main()
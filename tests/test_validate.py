@@ -0,0 +1,120 @@
+import random
+import unittest
+from copy import deepcopy
+
+from map_core import ALGORITHMS, VALID, Grid, seed_generators, validate_map, validate_map_reason
+
+# ======================================================================================================================
+# REFERENCE VALIDATOR
+# ======================================================================================================================
+#
+# validate_map and flood_fill as they were before maps were held in a Grid, on lists of lists of characters.
+# The validator was rewritten for speed, it must still accept exactly the same maps.
+
+def flood_fill(map_data, x, y, visited, target):
+    stack = [(x, y)]
+    count = 0
+
+    while stack:
+        cx, cy = stack.pop()
+        if cx < 0 or cy < 0 or cy >= len(map_data) or cx >= len(map_data[0]):
+            continue
+        if visited[cy][cx] or map_data[cy][cx] == '1':
+            continue
+
+        visited[cy][cx] = True
+        if map_data[cy][cx] == target:
+            count += 1
+
+        stack.append((cx + 1, cy))
+        stack.append((cx - 1, cy))
+        stack.append((cx, cy + 1))
+        stack.append((cx, cy - 1))
+
+    return count
+
+def reference_validate_map(map_data):
+    height = len(map_data)
+    width = len(map_data[0])
+
+    if any(map_data[0][x] != '1' or map_data[-1][x] != '1' for x in range(width)):
+        return False
+    if any(row[0] != '1' or row[-1] != '1' for row in map_data):
+        return False
+
+    player_count = sum(row.count('P') for row in map_data)
+    exit_count = sum(row.count('E') for row in map_data)
+    collectible_count = sum(row.count('C') for row in map_data)
+
+    if player_count != 1 or exit_count != 1 or collectible_count < 1:
+        return False
+
+    visited = [[False for _ in range(width)] for _ in range(height)]
+    player_pos = [(y, x) for y in range(height) for x in range(width) if map_data[y][x] == 'P'][0]
+
+    reachable_collectibles = flood_fill(deepcopy(map_data), player_pos[1], player_pos[0], visited, 'C')
+    if reachable_collectibles < collectible_count:
+        return False
+
+    visited = [[False for _ in range(width)] for _ in range(height)]
+    exit_accessible = flood_fill(deepcopy(map_data), player_pos[1], player_pos[0], visited, 'E') > 0
+
+    return exit_accessible
+
+# ======================================================================================================================
+# TESTS
+# ======================================================================================================================
+
+def mutate(rows, rng):
+    """Breaks a map in one of the ways the validator checks: border, tiles inside the border or coins."""
+    height, width = len(rows), len(rows[0])
+    kind = rng.randrange(4)
+    if kind == 0:
+        # A hole in the border
+        x, y = rng.choice([(rng.randrange(width), rng.choice((0, height - 1))), (rng.choice((0, width - 1)), rng.randrange(height))])
+        rows[y][x] = rng.choice("0CPE")
+    elif kind in (1, 2):
+        # Tiles added or removed inside the border
+        for _ in range(rng.randint(1, 3)):
+            rows[rng.randrange(1, height - 1)][rng.randrange(1, width - 1)] = rng.choice("01CPE")
+    elif kind == 3:
+        # Every coin removed
+        for row in rows:
+            for x, tile in enumerate(row):
+                if tile == 'C':
+                    row[x] = '0'
+    return rows
+
+class ValidatorEquivalenceTest(unittest.TestCase):
+
+    def test_generated_and_broken_maps(self):
+        rng = random.Random(42)
+        seed_generators(42)
+        checked = {True: 0, False: 0}
+        for _ in range(3000):
+            width, height = rng.randint(3, 14), rng.randint(3, 10)
+            algorithm = rng.choice(["random", "constructive"]) if (width - 2) * (height - 2) >= 3 else None
+            if algorithm:
+                rows = ALGORITHMS[algorithm](width, height, rng.randint(0, 40), rng.randint(0, 60)).to_rows()
+            else:
+                rows = [['1'] * width for _ in range(height)]
+            if rng.random() < 0.5:
+                rows = mutate(rows, rng)
+            expected = reference_validate_map(rows)
+            grid = Grid.from_rows(rows)
+            with self.subTest(rows=["".join(row) for row in rows]):
+                self.assertEqual(validate_map(grid), expected)
+                self.assertEqual(validate_map_reason(grid) == VALID, expected)
+            checked[expected] += 1
+        # Both outcomes must be well covered for the comparison to mean something
+        self.assertGreater(min(checked.values()), 500)
+
+    def test_exit_does_not_block_the_way(self):
+        rows = ["11111",
+                "1PEC1",
+                "11111"]
+        self.assertTrue(reference_validate_map([list(row) for row in rows]))
+        self.assertTrue(validate_map(Grid.from_rows(rows)))
+
+if __name__ == "__main__":
+    unittest.main()